@@ -0,0 +1,287 @@
+# base_conocimiento/almacen_sqlite.py
+"""
+Almacén de casos en SQLite.
+
+Esquema:
+    casos     una fila por caso (las listas se guardan como JSON), en orden de alta
+    sintomas  (caso, orden, síntoma normalizado), una fila por síntoma
+
+con índices por síntoma, por riesgo y por id_caso. Al cargar la base solo se
+leen los campos ligeros: las estrategias y la recomendación general de cada
+caso se leen la primera vez que se usan (al mostrar o explicar el caso), por
+id_caso, así que siguen siendo válidas aunque guardar_base reescriba las filas.
+
+Uso (migrar la base JSON, diario incluido):
+    python -m base_conocimiento.almacen_sqlite
+    python -m base_conocimiento.almacen_sqlite base_conocimiento/casos.json base_conocimiento/casos.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, AlmacenCasos, cargar_base
+from base_conocimiento.modelos import BaseDeCasos, Caso, internar, internar_lista
+from motor_inferencia.representacion import normalizar_lista, normalizar_texto
+
+RUTA_SQLITE = os.path.join(os.path.dirname(__file__), "casos.db")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS casos (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_caso INTEGER,
+    posible_causa TEXT,
+    resultado TEXT,
+    riesgo TEXT,
+    riesgo_clave TEXT,
+    autoevaluaciones_sugeridas TEXT,
+    derivar_a TEXT,
+    estrategias TEXT,
+    recomendacion_general TEXT
+);
+CREATE TABLE IF NOT EXISTS sintomas (
+    pos INTEGER NOT NULL REFERENCES casos(pos) ON DELETE CASCADE,
+    orden INTEGER NOT NULL,
+    sintoma TEXT NOT NULL,
+    PRIMARY KEY (pos, orden)
+);
+CREATE INDEX IF NOT EXISTS idx_sintomas_sintoma ON sintomas(sintoma);
+CREATE INDEX IF NOT EXISTS idx_casos_riesgo ON casos(riesgo_clave);
+CREATE INDEX IF NOT EXISTS idx_casos_id ON casos(id_caso);
+"""
+
+_COLUMNAS_LIGERAS = "pos, id_caso, posible_causa, resultado, riesgo, autoevaluaciones_sugeridas, derivar_a"
+
+
+class CasoSQLite(Caso):
+    """
+    Caso leído de SQLite. `estrategias` y `recomendacion_general` no se leen
+    al cargar la base sino en el primer acceso (y se quedan en memoria).
+    Al serializarse se convierte en un Caso normal con todos sus campos.
+    """
+
+    __slots__ = ("_almacen", "_pos", "_detalle")
+
+    @classmethod
+    def desde_fila(cls, almacen: "AlmacenSQLite", fila: sqlite3.Row, sintomas: List[str]) -> "CasoSQLite":
+        caso = cls.__new__(cls)
+        caso._almacen = almacen
+        caso._pos = fila["pos"]
+        caso._detalle = None
+        caso.id_caso = fila["id_caso"]
+        caso.sintomas = sintomas
+        caso.posible_causa = internar(fila["posible_causa"])
+        caso.resultado = internar(fila["resultado"])
+        caso.riesgo = internar(fila["riesgo"])
+        caso.autoevaluaciones_sugeridas = internar_lista(json.loads(fila["autoevaluaciones_sugeridas"]))
+        caso.derivar_a = internar_lista(json.loads(fila["derivar_a"]))
+        return caso
+
+    def __reduce__(self):
+        return Caso.from_dict, (self.to_dict(),)
+
+    def _cargar_detalle(self) -> Dict:
+        if self._detalle is None:
+            self._detalle = self._almacen._leer_detalle(self._pos, self.id_caso)
+        return self._detalle
+
+    @property
+    def estrategias(self) -> List[str]:
+        return self._cargar_detalle()["estrategias"]
+
+    @estrategias.setter
+    def estrategias(self, valor: List[str]):
+        self._cargar_detalle()["estrategias"] = valor
+
+    @property
+    def recomendacion_general(self) -> str:
+        return self._cargar_detalle()["recomendacion_general"]
+
+    @recomendacion_general.setter
+    def recomendacion_general(self, valor: str):
+        self._cargar_detalle()["recomendacion_general"] = valor
+
+
+class AlmacenSQLite(AlmacenCasos):
+    """Almacén de casos sobre un archivo SQLite (una conexión por hilo y proceso)."""
+
+    def __init__(self, ruta: str = RUTA_SQLITE):
+        self.ruta = ruta
+        self._local = threading.local()
+
+    # La conexión no se serializa ni se hereda: cada proceso abre la suya
+    def __getstate__(self):
+        return {"ruta": self.ruta}
+
+    def __setstate__(self, estado):
+        self.ruta = estado["ruta"]
+        self._local = threading.local()
+
+    def _conexion(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            conexion = sqlite3.connect(self.ruta)
+            conexion.row_factory = sqlite3.Row
+            conexion.execute("PRAGMA foreign_keys = ON")
+            # WAL: varios procesos pueden leer mientras otro escribe
+            conexion.execute("PRAGMA journal_mode = WAL")
+            conexion.executescript(_ESQUEMA)
+            local.conexion, local.pid = conexion, os.getpid()
+        return local.conexion
+
+    # ------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------
+    def _casos_de(self, condicion: str = "", parametros: Iterable = ()) -> List[CasoSQLite]:
+        conexion = self._conexion()
+        filas = conexion.execute(
+            f"SELECT {_COLUMNAS_LIGERAS} FROM casos {condicion} ORDER BY pos", tuple(parametros)
+        ).fetchall()
+        if not filas:
+            return []
+        sintomas: Dict[int, List[str]] = {fila["pos"]: [] for fila in filas}
+        if condicion:
+            filas_sintomas = conexion.execute(
+                f"SELECT pos, sintoma FROM sintomas WHERE pos IN (SELECT pos FROM casos {condicion}) "
+                "ORDER BY pos, orden",
+                tuple(parametros)
+            )
+        else:
+            filas_sintomas = conexion.execute("SELECT pos, sintoma FROM sintomas ORDER BY pos, orden")
+        for pos, sintoma in filas_sintomas:
+            sintomas[pos].append(sintoma)
+        return [CasoSQLite.desde_fila(self, fila, sintomas[fila["pos"]]) for fila in filas]
+
+    def _leer_detalle(self, pos: int, id_caso: Optional[int]) -> Dict:
+        conexion = self._conexion()
+        fila = conexion.execute(
+            "SELECT estrategias, recomendacion_general FROM casos WHERE pos = ? AND id_caso IS ?", (pos, id_caso)
+        ).fetchone()
+        if fila is None and id_caso is not None:
+            # guardar_base reinserta todas las filas (con pos nuevas): se busca el caso por su id
+            fila = conexion.execute(
+                "SELECT estrategias, recomendacion_general FROM casos "
+                "WHERE pos = (SELECT MIN(pos) FROM casos WHERE id_caso = ?)", (id_caso,)
+            ).fetchone()
+        if fila is None:
+            raise LookupError(f"El caso {id_caso} ya no existe en {self.ruta}; vuelva a cargar la base.")
+        return {
+            "estrategias": internar_lista(json.loads(fila["estrategias"])),
+            "recomendacion_general": internar(fila["recomendacion_general"]),
+        }
+
+    def cargar(self) -> BaseDeCasos:
+        base = BaseDeCasos()
+        casos = {}
+        for caso in self._casos_de():
+            # Igual que buscar_por_id: de un id repetido vale la fila con menor pos
+            casos.setdefault(caso.id_caso, caso)
+        base.agregar_casos(casos.values())
+        return base
+
+    def buscar_por_id(self, id_caso: int) -> Optional[Caso]:
+        casos = self._casos_de("WHERE pos = (SELECT MIN(pos) FROM casos WHERE id_caso = ?)", (id_caso,))
+        return casos[0] if casos else None
+
+    def casos_con_sintoma(self, sintoma: str) -> List[Caso]:
+        return self._casos_de(
+            "WHERE pos IN (SELECT pos FROM sintomas WHERE sintoma = ?)", (normalizar_texto(sintoma),)
+        )
+
+    def casos_con_riesgo(self, riesgo: str) -> List[Caso]:
+        return self._casos_de("WHERE riesgo_clave = ?", (BaseDeCasos._clave_riesgo(riesgo),))
+
+    # ------------------------------------------------------
+    # Escritura (cada operación es una transacción)
+    # ------------------------------------------------------
+    @staticmethod
+    def _valores(datos: Dict) -> tuple:
+        return (
+            datos["id_caso"],
+            datos["posible_causa"],
+            datos["resultado"],
+            datos["riesgo"],
+            BaseDeCasos._clave_riesgo(datos["riesgo"]),
+            json.dumps(datos["autoevaluaciones_sugeridas"], ensure_ascii=False),
+            json.dumps(datos["derivar_a"], ensure_ascii=False),
+            json.dumps(datos["estrategias"], ensure_ascii=False),
+            datos["recomendacion_general"],
+        )
+
+    @staticmethod
+    def _escribir_sintomas(conexion: sqlite3.Connection, pos: int, sintomas: List[str]):
+        conexion.execute("DELETE FROM sintomas WHERE pos = ?", (pos,))
+        conexion.executemany(
+            "INSERT INTO sintomas (pos, orden, sintoma) VALUES (?, ?, ?)",
+            [(pos, orden, sintoma) for orden, sintoma in enumerate(normalizar_lista(sintomas))],
+        )
+
+    def _insertar(self, conexion: sqlite3.Connection, datos: Dict):
+        cursor = conexion.execute(
+            "INSERT INTO casos (id_caso, posible_causa, resultado, riesgo, riesgo_clave, "
+            "autoevaluaciones_sugeridas, derivar_a, estrategias, recomendacion_general) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._valores(datos),
+        )
+        self._escribir_sintomas(conexion, cursor.lastrowid, datos["sintomas"])
+
+    def agregar(self, caso: Caso):
+        conexion = self._conexion()
+        with conexion:
+            # IMMEDIATE: el cerrojo de escritura se toma antes de consultar los ids
+            conexion.execute("BEGIN IMMEDIATE")
+            if caso.id_caso is None:
+                caso.id_caso = conexion.execute(
+                    "SELECT COALESCE(MAX(id_caso), 0) + 1 FROM casos WHERE typeof(id_caso) = 'integer'"
+                ).fetchone()[0]
+            elif conexion.execute("SELECT 1 FROM casos WHERE id_caso = ?", (caso.id_caso,)).fetchone():
+                raise ValueError(f"Ya existe un caso guardado con id {caso.id_caso}.")
+            self._insertar(conexion, caso.to_dict())
+
+    def actualizar(self, caso: Caso):
+        conexion = self._conexion()
+        datos = caso.to_dict()
+        with conexion:
+            pos = conexion.execute("SELECT MIN(pos) FROM casos WHERE id_caso = ?", (datos["id_caso"],)).fetchone()[0]
+            if pos is None:
+                self._insertar(conexion, datos)
+                return
+            conexion.execute(
+                "UPDATE casos SET id_caso = ?, posible_causa = ?, resultado = ?, riesgo = ?, riesgo_clave = ?, "
+                "autoevaluaciones_sugeridas = ?, derivar_a = ?, estrategias = ?, recomendacion_general = ? "
+                "WHERE pos = ?",
+                self._valores(datos) + (pos,),
+            )
+            self._escribir_sintomas(conexion, pos, datos["sintomas"])
+
+    def guardar_base(self, base: BaseDeCasos):
+        # Se materializan antes de borrar: los casos perezosos aún pueden leer de la base
+        datos = [c.to_dict() for c in base.listar_casos()]
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute("DELETE FROM sintomas")
+            conexion.execute("DELETE FROM casos")
+            for d in datos:
+                self._insertar(conexion, d)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m base_conocimiento.almacen_sqlite",
+        description="Migra una base de casos JSON (con su diario) a SQLite."
+    )
+    parser.add_argument("origen", nargs="?", default=RUTA_ARCHIVO, help="Base de casos JSON")
+    parser.add_argument("destino", nargs="?", default=RUTA_SQLITE, help="Archivo SQLite de destino")
+    args = parser.parse_args(argv)
+
+    base = cargar_base(args.origen, usar_instantanea=False)
+    AlmacenSQLite(args.destino).guardar_base(base)
+    print(f"✅ {len(base.casos)} casos migrados a {args.destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,303 @@
 # base_conocimiento/almacenamiento.py
+import abc
+import contextlib
 import json
 import os
+from typing import Dict, Set, Tuple
+
 from base_conocimiento.modelos import Caso, BaseDeCasos   # usar import absoluto
 from motor_inferencia.representacion import normalizar_lista
 
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos, cada alta es una sola escritura en modo append
+    fcntl = None
+
 RUTA_ARCHIVO = os.path.join(os.path.dirname(__file__), "casos.json")
+EXTENSIONES_SQLITE = (".db", ".sqlite", ".sqlite3")
+
+# Tamaño del diario a partir del cual guardar_caso lo compacta en el archivo principal
+TAM_MAX_DIARIO = 256 * 1024
+
+
+def ruta_diario(ruta: str = RUTA_ARCHIVO) -> str:
+    """Diario de altas y cambios asociado a un archivo de casos (casos.json → casos.diario.jsonl)."""
+    return os.path.splitext(ruta)[0] + ".diario.jsonl"
+
+
+@contextlib.contextmanager
+def _bloqueo(ruta: str):
+    """Bloqueo exclusivo entre procesos sobre `ruta`.lock (no-op donde no hay fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    with open(ruta + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _escribir_atomico(data, ruta: str):
+    """Escribe el JSON en un temporal y lo renombra: el archivo nunca queda a medias."""
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
 
 def guardar_base(base: BaseDeCasos, ruta: str = RUTA_ARCHIVO):
+    """
+    Reescribe la base completa. El diario queda incorporado en el archivo
+    principal, así que se vacía.
+    """
+    if _es_sqlite(ruta):
+        abrir_almacen(ruta).guardar_base(base)
+        return
     data = [c.to_dict() for c in base.listar_casos()]
-    with open(ruta, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    diario = ruta_diario(ruta)
+    with _bloqueo(diario):
+        _escribir_atomico(data, ruta)
+        if os.path.exists(diario):
+            os.remove(diario)
 
-def cargar_base(ruta: str = RUTA_ARCHIVO) -> BaseDeCasos:
-    base = BaseDeCasos()
-    try:
-        with open(ruta, "r", encoding="utf-8") as f:
-            data = json.load(f)
+
+def cargar_base(ruta: str = RUTA_ARCHIVO, usar_instantanea: bool = True, usar_diario: bool = True) -> BaseDeCasos:
+    if _es_sqlite(ruta):
+        return abrir_almacen(ruta).cargar()
+
+    base = None
+    # ⚡ la base por defecto se toma de la instantánea compilada si está al día
+    if usar_instantanea and os.path.abspath(ruta) == os.path.abspath(RUTA_ARCHIVO):
+        from base_conocimiento.instantanea import cargar_base_compilada  # evita importación circular
+        base = cargar_base_compilada()
+
+    if base is None:
+        base = BaseDeCasos()
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            casos = {}
             for c in data:
                 # ✅ normalizar síntomas al cargar
                 caso = Caso.from_dict(c)
                 caso.sintomas = normalizar_lista(caso.sintomas)
-                base.agregar_caso(caso)
-    except FileNotFoundError:
-        print("⚠️ No se encontró la base de casos, se creará una nueva.")
+                if caso.id_caso in casos:
+                    print(f"⚠️ Caso con id repetido ({caso.id_caso}) en {ruta} ignorado; se conserva el primero.")
+                    continue
+                casos[caso.id_caso] = caso
+            base.agregar_casos(casos.values())
+        except FileNotFoundError:
+            print("⚠️ No se encontró la base de casos, se creará una nueva.")
+
+    if usar_diario:
+        reproducir_diario(base, ruta_diario(ruta))
     return base
 
+
+# ======================================================
+# Diario de casos (JSONL, solo se añade al final)
+# ======================================================
+# archivo principal → ((mtime_ns, tamaño), ids de sus casos)
+_IDS_ARCHIVO: Dict[str, Tuple[Tuple[int, int], Set]] = {}
+
+
+def _ids_archivo(ruta: str) -> Set:
+    """Ids de los casos del archivo principal (solo se relee si cambió en disco)."""
+    try:
+        info = os.stat(ruta)
+    except FileNotFoundError:
+        return set()
+    firma = (info.st_mtime_ns, info.st_size)
+    guardado = _IDS_ARCHIVO.get(ruta)
+    if guardado is None or guardado[0] != firma:
+        with open(ruta, "r", encoding="utf-8") as f:
+            ids = {c.get("id_caso") for c in json.load(f) if isinstance(c, dict)}
+        guardado = _IDS_ARCHIVO[ruta] = (firma, ids)
+    return guardado[1]
+
+
+def _ids_diario(diario: str) -> Set:
+    """Ids de los casos registrados en el diario (las líneas ilegibles se saltan)."""
+    ids = set()
+    if not os.path.exists(diario):
+        return ids
+    with open(diario, "r", encoding="utf-8") as f:
+        for linea in f:
+            try:
+                ids.add(json.loads(linea)["caso"]["id_caso"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return ids
+
+
+def registrar_caso(caso: Caso, ruta: str = RUTA_ARCHIVO, operacion: str = "agregar") -> int:
+    """
+    Añade el alta (o el cambio, con operacion="actualizar") de un caso al diario
+    y lo sincroniza con el disco. Devuelve el tamaño del diario en bytes.
+
+    Las altas se resuelven con el diario bloqueado, frente a lo ya guardado
+    (archivo principal + diario, también lo escrito por otros procesos): un
+    caso sin id_caso recibe el siguiente al mayor id entero, y uno con un id
+    que ya existe lanza ValueError.
+    """
+    diario = ruta_diario(ruta)
+    with _bloqueo(diario):
+        if operacion == "agregar":
+            ids = _ids_archivo(ruta) | _ids_diario(diario)
+            if caso.id_caso is None:
+                caso.id_caso = max((i for i in ids if isinstance(i, int)), default=0) + 1
+            elif caso.id_caso in ids:
+                raise ValueError(f"Ya existe un caso guardado con id {caso.id_caso}.")
+        linea = json.dumps({"op": operacion, "caso": caso.to_dict()}, ensure_ascii=False) + "\n"
+        fd = os.open(diario, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            tamano = os.fstat(fd).st_size
+            if tamano:
+                # Si una escritura anterior quedó cortada, se cierra su línea para no pegarse a ella
+                os.lseek(fd, tamano - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    linea = "\n" + linea
+            os.write(fd, linea.encode("utf-8"))
+            os.fsync(fd)
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+
+def reproducir_diario(base: BaseDeCasos, diario: str) -> int:
+    """
+    Aplica sobre `base` las entradas del diario, en orden. Es idempotente: un alta
+    idéntica a un caso ya presente se ignora, así que repetir el diario tras una
+    compactación interrumpida no duplica casos. Un alta con el id de un caso
+    distinto se aplica como actualización (nunca se crean ids repetidos).
+    Las entradas se acumulan (última versión de cada id) y se aplican con una
+    sola llamada a actualizar_casos, así que los índices se rehacen una vez.
+    Devuelve las entradas aplicadas.
+    """
+    if not os.path.exists(diario):
+        return 0
+    aplicadas = 0
+    # id → última versión; el orden es el de la primera aparición (el de las altas)
+    cambios: Dict[int, Caso] = {}
+    with open(diario, "r", encoding="utf-8") as f:
+        for n, linea in enumerate(f, start=1):
+            if not linea.strip():
+                continue
+            try:
+                entrada = json.loads(linea)
+                caso = Caso.from_dict(entrada["caso"])
+            except (ValueError, KeyError, TypeError) as e:
+                # Típicamente la última línea de una escritura interrumpida
+                print(f"⚠️ Entrada {n} del diario {diario} ignorada: {e}")
+                continue
+            caso.sintomas = normalizar_lista(caso.sintomas)
+            existente = cambios.get(caso.id_caso)
+            if existente is None:
+                existente = base.buscar_por_id(caso.id_caso)
+            if existente is not None and entrada.get("op") != "actualizar":
+                if existente.to_dict() == caso.to_dict():
+                    continue
+                print(f"⚠️ Entrada {n} del diario {diario}: el id {caso.id_caso} ya existe; "
+                      f"se aplica como actualización.")
+            cambios[caso.id_caso] = caso
+            aplicadas += 1
+    base.actualizar_casos(cambios.values())
+    return aplicadas
+
+
+def compactar(ruta: str = RUTA_ARCHIVO) -> int:
+    """
+    Incorpora el diario al archivo principal (escritura atómica con renombrado)
+    y lo vacía. Relee ambos del disco para incluir los casos de otros procesos.
+    Devuelve el número de casos del archivo resultante.
+    """
+    diario = ruta_diario(ruta)
+    with _bloqueo(diario):
+        base = cargar_base(ruta, usar_instantanea=False)
+        _escribir_atomico([c.to_dict() for c in base.listar_casos()], ruta)
+        if os.path.exists(diario):
+            os.remove(diario)
+    return len(base.casos)
+
+
+def guardar_caso(caso: Caso, ruta: str = RUTA_ARCHIVO, operacion: str = "agregar"):
+    """
+    Registra el caso en el diario y compacta cuando el diario supera TAM_MAX_DIARIO.
+    En un alta sin id_caso se le asigna uno libre (ver registrar_caso); si el id
+    ya existe lanza ValueError.
+    """
+    if _es_sqlite(ruta):
+        almacen = abrir_almacen(ruta)
+        if operacion == "actualizar":
+            almacen.actualizar(caso)
+        else:
+            almacen.agregar(caso)
+        return
+    if registrar_caso(caso, ruta, operacion) >= TAM_MAX_DIARIO:
+        compactar(ruta)
+
+
+# ======================================================
+# Almacenes intercambiables
+# ======================================================
+class AlmacenCasos(abc.ABC):
+    """
+    Interfaz común de los almacenes de casos. El almacén JSON (con diario) es el
+    predeterminado; almacen_sqlite.AlmacenSQLite guarda los casos en SQLite.
+    """
+
+    @abc.abstractmethod
+    def cargar(self) -> BaseDeCasos:
+        """Devuelve la base de casos completa."""
+
+    @abc.abstractmethod
+    def agregar(self, caso: Caso):
+        """Guarda un caso nuevo. Sin id_caso se le asigna uno libre; con un id existente, ValueError."""
+
+    @abc.abstractmethod
+    def actualizar(self, caso: Caso):
+        """Reemplaza el caso con el mismo ID (o lo agrega si no existe)."""
+
+    @abc.abstractmethod
+    def guardar_base(self, base: BaseDeCasos):
+        """Reemplaza todo el contenido del almacén por `base`."""
+
+
+class AlmacenJSON(AlmacenCasos):
+    """Casos en un archivo JSON más su diario de altas (ver guardar_caso y compactar)."""
+
+    def __init__(self, ruta: str = RUTA_ARCHIVO):
+        self.ruta = ruta
+
+    def cargar(self) -> BaseDeCasos:
+        return cargar_base(self.ruta)
+
+    def agregar(self, caso: Caso):
+        guardar_caso(caso, self.ruta)
+
+    def actualizar(self, caso: Caso):
+        guardar_caso(caso, self.ruta, operacion="actualizar")
+
+    def guardar_base(self, base: BaseDeCasos):
+        guardar_base(base, self.ruta)
+
+
+def _es_sqlite(ruta: str) -> bool:
+    return os.path.splitext(ruta)[1].lower() in EXTENSIONES_SQLITE
+
+
+def abrir_almacen(ruta: str = RUTA_ARCHIVO) -> AlmacenCasos:
+    """Devuelve el almacén adecuado según la extensión de `ruta` (.db/.sqlite → SQLite, otro → JSON)."""
+    if _es_sqlite(ruta):
+        from base_conocimiento.almacen_sqlite import AlmacenSQLite  # evita importación circular
+        return AlmacenSQLite(ruta)
+    return AlmacenJSON(ruta)
+
+
 def guardar_json(data, ruta):
     """Guarda cualquier estructura de datos en un JSON."""
     with open(ruta, "w", encoding="utf-8") as f:
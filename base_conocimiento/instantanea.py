@@ -0,0 +1,185 @@
+# base_conocimiento/instantanea.py
+"""
+Instantánea compilada de la base de conocimiento.
+
+Compilar lee los JSON fuente (casos y sinónimos), normaliza los casos, fusiona
+las tablas de sinónimos, construye los índices de búsqueda y guarda todo en un
+único archivo binario:
+
+    cabecera:  firma mágica · versión de formato · longitud · SHA-256 del contenido
+    contenido: pickle con la base de casos y su motor de recuperación, las tablas
+               de sinónimos con sus índices y las firmas de los JSON fuente
+
+Al arrancar, `cargar_base()` usa la instantánea (leída con mmap) si es válida y
+ninguno de los JSON es más reciente que ella; si no, carga los JSON como siempre.
+En ambos casos aplica después el diario de casos (casos.diario.jsonl).
+
+Uso:
+    python -m base_conocimiento.instantanea
+    python -m base_conocimiento.instantanea --equivalencias
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import sys
+import time
+from typing import Dict, Optional
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, cargar_base
+from base_conocimiento.modelos import BaseDeCasos
+from base_conocimiento.registro_sinonimos import (
+    REGISTRO, RUTA_SINONIMOS, RUTA_SINONIMOS_ENRIQUECIDO, TablaSinonimos, _firma_archivo
+)
+from motor_inferencia.recuperacion import obtener_motor, registrar_motor
+
+_DIRECTORIO = os.path.dirname(__file__)
+RUTA_INSTANTANEA = os.path.join(_DIRECTORIO, "conocimiento.bin")
+
+MAGIA = b"SEAPKB\x00\x00"
+# Incrementar al cambiar cualquier clase que se serializa (Caso, BaseDeCasos,
+# MotorRecuperacion, índices de sinónimos): invalida las instantáneas anteriores
+VERSION_FORMATO = 4
+_CABECERA = struct.Struct("<8sIQ32s")
+
+# Archivos de los que se deriva la instantánea (se guardan por nombre)
+FUENTES = (RUTA_ARCHIVO, RUTA_SINONIMOS, RUTA_SINONIMOS_ENRIQUECIDO)
+
+
+# ===== COMPILACIÓN =====
+def compilar(ruta: str = RUTA_INSTANTANEA, equivalencias: bool = False) -> Dict[str, float]:
+    """
+    Genera la instantánea desde los JSON fuente y la escribe de forma atómica.
+    Con `equivalencias` también precalcula la tabla completa síntoma × síntoma
+    del motor de recuperación (tarda, pero ahorra ese trabajo en cada consulta).
+    """
+    # Solo se necesitan al compilar; el arranque no debe importar el procesamiento de texto
+    from motor_inferencia.procesamiento import precargar_indices
+
+    # Las firmas se toman antes de leer: un cambio posterior invalidará la instantánea
+    fuentes = {os.path.basename(r): _firma_archivo(r) for r in FUENTES}
+    # El diario no entra en la instantánea: se sigue aplicando encima al cargar
+    base = cargar_base(RUTA_ARCHIVO, usar_instantanea=False, usar_diario=False)
+    precargar_indices(base)
+    motor = obtener_motor(base)
+    if equivalencias:
+        motor.precalcular_equivalencias()
+
+    tablas = []
+    for tabla in REGISTRO.tablas():
+        nombres = tuple(os.path.basename(r) for r in tabla.rutas)
+        if tabla.rutas != tuple(os.path.join(_DIRECTORIO, n) for n in nombres):
+            continue
+        if tabla.firmas != tuple(fuentes.get(n) for n in nombres):
+            continue
+        tablas.append((nombres, dict(tabla.entradas), tabla.derivados()))
+
+    contenido = pickle.dumps(
+        {"fuentes": fuentes, "base": base, "motor": motor, "tablas": tablas},
+        protocol=pickle.HIGHEST_PROTOCOL
+    )
+    cabecera = _CABECERA.pack(MAGIA, VERSION_FORMATO, len(contenido), hashlib.sha256(contenido).digest())
+
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(cabecera)
+        f.write(contenido)
+    os.replace(temporal, ruta)
+    return {
+        "casos": len(base.casos),
+        "tablas": len(tablas),
+        "sinonimos": sum(len(entradas) for _, entradas, _ in tablas),
+        "bytes": _CABECERA.size + len(contenido),
+    }
+
+
+# ===== CARGA =====
+def leer_instantanea(ruta: str = RUTA_INSTANTANEA) -> Optional[Dict]:
+    """
+    Lee y verifica (firma, versión, longitud y SHA-256) la instantánea mediante mmap.
+    Devuelve su contenido, o None si no existe o no es válida.
+    """
+    try:
+        with open(ruta, "rb") as f:
+            tamano = os.fstat(f.fileno()).st_size
+            if tamano < _CABECERA.size:
+                raise ValueError("archivo truncado")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                magia, version, longitud, resumen = _CABECERA.unpack_from(mapa)
+                if magia != MAGIA:
+                    raise ValueError("no es una instantánea de la base de conocimiento")
+                if version != VERSION_FORMATO:
+                    raise ValueError(f"versión de formato {version}, se esperaba {VERSION_FORMATO}")
+                if _CABECERA.size + longitud != tamano:
+                    raise ValueError("longitud incorrecta")
+                with memoryview(mapa) as vista, vista[_CABECERA.size:] as contenido:
+                    if hashlib.sha256(contenido).digest() != resumen:
+                        raise ValueError("la suma de verificación no coincide")
+                    return pickle.loads(contenido)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️ Instantánea {ruta} no válida ({e}); se cargan los JSON.")
+        return None
+
+
+def _fuente_modificada(fuentes: Dict) -> Optional[str]:
+    """Nombre del primer JSON fuente más reciente (o distinto) que la instantánea, o None."""
+    for ruta in FUENTES:
+        nombre = os.path.basename(ruta)
+        grabada = fuentes.get(nombre)
+        actual = _firma_archivo(ruta)
+        if grabada is None and actual is None:
+            continue
+        if grabada is None or actual is None or actual[1] != grabada[1] or actual[0] > grabada[0]:
+            return nombre
+    return None
+
+
+def cargar_base_compilada(ruta: str = RUTA_INSTANTANEA) -> Optional[BaseDeCasos]:
+    """
+    Devuelve la base de casos de la instantánea e instala sus tablas de sinónimos
+    e índices en el registro compartido. Devuelve None si no hay instantánea
+    utilizable o si algún JSON fuente es más reciente.
+    """
+    datos = leer_instantanea(ruta)
+    if datos is None:
+        return None
+    modificada = _fuente_modificada(datos["fuentes"])
+    if modificada is not None:
+        print(f"⚠️ {modificada} es más reciente que la instantánea compilada; se cargan los JSON "
+              f"(recompile con: python -m base_conocimiento.instantanea).")
+        return None
+
+    for nombres, entradas, derivados in datos["tablas"]:
+        rutas = tuple(os.path.join(_DIRECTORIO, n) for n in nombres)
+        firmas = tuple(_firma_archivo(r) for r in rutas)
+        REGISTRO.instalar(TablaSinonimos(entradas, rutas, firmas, derivados))
+    registrar_motor(datos["motor"])
+    return datos["base"]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m base_conocimiento.instantanea",
+        description="Compila casos, sinónimos e índices en una instantánea binaria para arrancar rápido."
+    )
+    parser.add_argument("-o", "--salida", default=RUTA_INSTANTANEA, help="Ruta de la instantánea")
+    parser.add_argument("--equivalencias", action="store_true",
+                        help="Precalcular también la tabla de equivalencias entre síntomas (lento)")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    stats = compilar(args.salida, equivalencias=args.equivalencias)
+    print(
+        f"✅ Instantánea compilada en {args.salida}: {stats['casos']} casos, "
+        f"{stats['sinonimos']} sinónimos en {stats['tablas']} tablas, "
+        f"{stats['bytes'] / 1e6:.1f} MB en {time.perf_counter() - inicio:.2f} s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
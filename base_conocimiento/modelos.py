@@ -1,14 +1,89 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, FrozenSet, Iterable, NamedTuple, Optional, Set, Tuple
 import json
 import os
+import threading
+
+from motor_inferencia.representacion import normalizar_lista, normalizar_texto
+
+
+class TablaCadenas:
+    """
+    Tabla compartida de cadenas: cada texto distinto (o tupla de textos) se guarda
+    una sola vez y recibe un id entero estable durante la vida del proceso. Los
+    casos guardan referencias a estas cadenas (o sus ids) en lugar de copias propias.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._textos: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._textos)
+
+    def id_de(self, texto: str) -> int:
+        """Id del texto, registrándolo si es la primera vez que aparece."""
+        id_texto = self._ids.get(texto)
+        if id_texto is None:
+            with self._lock:
+                id_texto = self._ids.get(texto)
+                if id_texto is None:
+                    id_texto = len(self._textos)
+                    self._textos.append(texto)
+                    self._ids[texto] = id_texto
+        return id_texto
+
+    def texto(self, id_texto: int) -> str:
+        return self._textos[id_texto]
+
+    def internar(self, texto: str) -> str:
+        """Devuelve la instancia compartida del texto."""
+        return self._textos[self.id_de(texto)]
+
+
+# Síntomas (con ids enteros para el motor) y resto de textos repetidos de los casos
+SINTOMAS = TablaCadenas()
+TEXTOS = TablaCadenas()
+
+
+def internar_lista(valores: Optional[List[str]]) -> Tuple[str, ...]:
+    """Tupla compartida con los textos de la lista: las listas repetidas se guardan una vez."""
+    return TEXTOS.internar(tuple(TEXTOS.internar(v) if isinstance(v, str) else v for v in valores or ()))
+
+
+def internar(valor: Optional[str]) -> Optional[str]:
+    """Instancia compartida del texto (lo que no es texto se devuelve tal cual)."""
+    return TEXTOS.internar(valor) if isinstance(valor, str) else valor
 
 
 class Caso:
     """
     Representa un caso psicológico almacenado en la base de conocimiento.
     Contiene síntomas, causa probable, estrategias de intervención, nivel de riesgo y recomendaciones generales.
+
+    Usa __slots__ y guarda los textos repetidos (riesgo, estrategias, recomendaciones...)
+    a través de tablas de cadenas compartidas; las listas de textos se guardan como
+    tuplas compartidas. Los síntomas se guardan como ids de SINTOMAS (`ids_sintomas`);
+    `sintomas` devuelve una tupla de textos (para cambiarlos hay que asignar la
+    lista completa, p. ej. caso.sintomas = [*caso.sintomas, "nuevo"]) y to_dict
+    devuelve listas.
+    Los síntomas normalizados se calculan una sola vez, al asignar los síntomas
+    (`sintomas_normalizados`), para que la inferencia no vuelva a normalizarlos.
     """
 
+    __slots__ = (
+        "id_caso",
+        "_ids_sintomas",
+        "_sintomas_normalizados",
+        "posible_causa",
+        "estrategias",
+        "resultado",
+        "autoevaluaciones_sugeridas",
+        "riesgo",
+        "derivar_a",
+        "recomendacion_general",
+    )
+
     def __init__(
         self,
         id_caso: int,
@@ -23,13 +98,49 @@ class Caso:
     ):
         self.id_caso = id_caso
         self.sintomas = sintomas
-        self.posible_causa = posible_causa
-        self.estrategias = estrategias
-        self.resultado = resultado or "No especificado"
-        self.autoevaluaciones_sugeridas = autoevaluaciones_sugeridas or []
-        self.riesgo = riesgo or "desconocido"
-        self.derivar_a = derivar_a or []
-        self.recomendacion_general = recomendacion_general or "Sin recomendación adicional."
+        self.posible_causa = internar(posible_causa)
+        self.estrategias = internar_lista(estrategias)
+        self.resultado = internar(resultado or "No especificado")
+        self.autoevaluaciones_sugeridas = internar_lista(autoevaluaciones_sugeridas)
+        self.riesgo = internar(riesgo or "desconocido")
+        self.derivar_a = internar_lista(derivar_a)
+        self.recomendacion_general = internar(recomendacion_general or "Sin recomendación adicional.")
+
+    @property
+    def sintomas(self) -> Tuple[str, ...]:
+        """
+        Síntomas del caso. Es una tupla: modificarla en sitio falla; para cambiar
+        los síntomas se asigna la lista completa (el setter recalcula los síntomas
+        normalizados). Los índices de una BaseDeCasos solo ven el cambio a través
+        de actualizar_caso.
+        """
+        texto = SINTOMAS.texto
+        return tuple(texto(i) for i in self._ids_sintomas)
+
+    @sintomas.setter
+    def sintomas(self, sintomas: Iterable[str]):
+        sintomas = list(sintomas)
+        self._ids_sintomas = tuple(SINTOMAS.id_de(s) for s in sintomas)
+        self._sintomas_normalizados = tuple(SINTOMAS.internar(s) for s in normalizar_lista(sintomas))
+
+    @property
+    def ids_sintomas(self) -> Tuple[int, ...]:
+        """Ids de los síntomas en la tabla compartida SINTOMAS, en el mismo orden."""
+        return self._ids_sintomas
+
+    @property
+    def sintomas_normalizados(self) -> Tuple[str, ...]:
+        """Síntomas normalizados (normalizar_lista), calculados al asignar los síntomas."""
+        return self._sintomas_normalizados
+
+    # Los ids solo valen dentro del proceso: al serializar se guardan los textos
+    def __getstate__(self):
+        return (self.id_caso, self.sintomas, self.posible_causa, self.estrategias, self.resultado,
+                self.autoevaluaciones_sugeridas, self.riesgo, self.derivar_a, self.recomendacion_general)
+
+    def __setstate__(self, estado):
+        (self.id_caso, self.sintomas, self.posible_causa, self.estrategias, self.resultado,
+         self.autoevaluaciones_sugeridas, self.riesgo, self.derivar_a, self.recomendacion_general) = estado
 
     # ======================================================
     # Conversiones entre objeto y diccionario
@@ -38,13 +149,13 @@ class Caso:
         """Convierte el caso a un diccionario compatible con JSON."""
         return {
             "id_caso": self.id_caso,
-            "sintomas": self.sintomas,
+            "sintomas": list(self.sintomas),
             "posible_causa": self.posible_causa,
-            "estrategias": self.estrategias,
+            "estrategias": list(self.estrategias),
             "resultado": self.resultado,
-            "autoevaluaciones_sugeridas": self.autoevaluaciones_sugeridas,
+            "autoevaluaciones_sugeridas": list(self.autoevaluaciones_sugeridas),
             "riesgo": self.riesgo,
-            "derivar_a": self.derivar_a,
+            "derivar_a": list(self.derivar_a),
             "recomendacion_general": self.recomendacion_general
         }
 
@@ -64,30 +175,188 @@ class Caso:
         )
 
 
+class _Indices(NamedTuple):
+    """Índices de una BaseDeCasos; se reemplazan enteros, nunca se modifican en sitio."""
+    por_id: Dict[int, Caso]
+    posicion: Dict[int, int]
+    # síntoma normalizado → ids; el orden de las claves es el de aparición
+    por_sintoma: Dict[str, FrozenSet[int]]
+    por_riesgo: Dict[str, FrozenSet[int]]
+
+
 class BaseDeCasos:
     """
     Contiene una colección de casos psicológicos.
     Permite buscarlos, listarlos, agregarlos y persistirlos en archivos JSON.
+    Mantiene índices por id, por síntoma normalizado y por nivel de riesgo,
+    actualizados al agregar casos o cargarlos desde JSON.
+
+    Los índices son de copia en escritura: cada modificación construye un
+    juego nuevo y lo publica con una sola asignación, así que las lecturas
+    desde otros hilos (p. ej. el servicio HTTP) nunca ven uno a medio cambiar.
+    Cada alta copia los diccionarios de índices; para cargas masivas, agregar_casos
+    (o actualizar_casos si también hay reemplazos).
     """
 
     def __init__(self):
         self.casos: List[Caso] = []
+        # Se incrementa en cada modificación; los índices derivados lo usan para invalidarse
+        self.version = 0
+        self._escritura = threading.Lock()
+        self._reindexar()
+
+    # El cerrojo no se serializa (la base se guarda en la instantánea compilada)
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado["_escritura"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._escritura = threading.Lock()
+
+    # ------------------------------------------------------
+    # Índices
+    # ------------------------------------------------------
+    def _reindexar(self):
+        """Reconstruye todos los índices a partir de la lista de casos."""
+        por_id: Dict[int, Caso] = {}
+        por_sintoma: Dict[str, Set[int]] = {}
+        por_riesgo: Dict[str, Set[int]] = {}
+        unicos = []
+        for caso in self.casos:
+            # La lista y los índices deben coincidir: de un id repetido se conserva el primero
+            if caso.id_caso in por_id:
+                print(f"⚠️ Caso con id repetido ({caso.id_caso}) descartado; se conserva el primero.")
+                continue
+            por_id[caso.id_caso] = caso
+            for sintoma in caso.sintomas_normalizados:
+                por_sintoma.setdefault(sintoma, set()).add(caso.id_caso)
+            por_riesgo.setdefault(self._clave_riesgo(caso.riesgo), set()).add(caso.id_caso)
+            unicos.append(caso)
+        if len(unicos) != len(self.casos):
+            self.casos = unicos
+        self._indices = _Indices(
+            por_id,
+            {id_caso: pos for pos, id_caso in enumerate(por_id)},
+            {sintoma: frozenset(ids) for sintoma, ids in por_sintoma.items()},
+            {riesgo: frozenset(ids) for riesgo, ids in por_riesgo.items()},
+        )
+
+    def _indexar(self, casos: List[Caso]):
+        """Publica índices nuevos que incluyen casos cuyos ids todavía no están en la base."""
+        indices = self._indices
+        por_id = dict(indices.por_id)
+        posicion = dict(indices.posicion)
+        nuevos_por_sintoma: Dict[str, Set[int]] = {}
+        nuevos_por_riesgo: Dict[str, Set[int]] = {}
+        for caso in casos:
+            por_id[caso.id_caso] = caso
+            posicion[caso.id_caso] = len(posicion)
+            for sintoma in caso.sintomas_normalizados:
+                nuevos_por_sintoma.setdefault(sintoma, set()).add(caso.id_caso)
+            nuevos_por_riesgo.setdefault(self._clave_riesgo(caso.riesgo), set()).add(caso.id_caso)
+        por_sintoma = dict(indices.por_sintoma)
+        for sintoma, ids in nuevos_por_sintoma.items():
+            por_sintoma[sintoma] = por_sintoma.get(sintoma, frozenset()) | ids
+        por_riesgo = dict(indices.por_riesgo)
+        for riesgo, ids in nuevos_por_riesgo.items():
+            por_riesgo[riesgo] = por_riesgo.get(riesgo, frozenset()) | ids
+        self._indices = _Indices(por_id, posicion, por_sintoma, por_riesgo)
+
+    @staticmethod
+    def _clave_riesgo(riesgo: Optional[str]) -> str:
+        return (riesgo or "desconocido").strip().lower()
+
+    @staticmethod
+    def _casos_de(indices: _Indices, ids: Iterable[int]) -> List[Caso]:
+        """Convierte ids en casos, en el orden en que están en la base."""
+        return [indices.por_id[i] for i in sorted(ids, key=indices.posicion.__getitem__)]
 
     # ------------------------------------------------------
     # Operaciones sobre la colección de casos
     # ------------------------------------------------------
     def agregar_caso(self, caso: Caso):
-        """Agrega un nuevo caso a la base."""
-        self.casos.append(caso)
+        """Agrega un nuevo caso a la base. Si su id ya existe lanza ValueError (use actualizar_caso)."""
+        self.agregar_casos([caso])
+
+    def agregar_casos(self, casos: Iterable[Caso]):
+        """
+        Agrega varios casos nuevos publicando los índices una sola vez (cargas masivas).
+        Si algún id ya existe o se repite lanza ValueError sin modificar la base.
+        """
+        casos = list(casos)
+        with self._escritura:
+            existentes = self._indices.por_id
+            nuevos: Set[int] = set()
+            for caso in casos:
+                if caso.id_caso in existentes or caso.id_caso in nuevos:
+                    raise ValueError(
+                        f"Ya existe un caso con id {caso.id_caso}; use actualizar_caso para reemplazarlo."
+                    )
+                nuevos.add(caso.id_caso)
+            if not casos:
+                return
+            self.casos.extend(casos)
+            self._indexar(casos)
+            self.version += 1
+
+    def actualizar_caso(self, caso: Caso):
+        """Reemplaza el caso con el mismo ID (manteniendo su posición); si no existe, lo agrega."""
+        self.actualizar_casos([caso])
+
+    def actualizar_casos(self, casos: Iterable[Caso]):
+        """
+        Reemplaza (manteniendo su posición) o agrega al final varios casos,
+        publicando los índices una sola vez. Si un id se repite vale el último caso.
+        """
+        with self._escritura:
+            por_id = self._indices.por_id
+            reemplazos: Dict[int, Caso] = {}
+            nuevos: Dict[int, Caso] = {}
+            for caso in casos:
+                (reemplazos if caso.id_caso in por_id else nuevos)[caso.id_caso] = caso
+            if not reemplazos and not nuevos:
+                return
+            if reemplazos:
+                # Lista nueva: los índices derivados detectan así que no fue solo un alta al final
+                self.casos = [reemplazos.get(c.id_caso, c) for c in self.casos] + list(nuevos.values())
+                self._reindexar()
+            else:
+                self.casos.extend(nuevos.values())
+                self._indexar(list(nuevos.values()))
+            self.version += 1
 
     def buscar_por_id(self, id_caso: int) -> Optional[Caso]:
         """Busca un caso por su ID."""
-        return next((c for c in self.casos if c.id_caso == id_caso), None)
+        return self._indices.por_id.get(id_caso)
 
     def listar_casos(self) -> List[Caso]:
         """Devuelve la lista completa de casos."""
         return self.casos
 
+    def sintomas_unicos(self) -> List[str]:
+        """Devuelve los síntomas normalizados distintos de todos los casos (sin leer disco)."""
+        return list(self._indices.por_sintoma)
+
+    def casos_con_sintoma(self, sintoma: str) -> List[Caso]:
+        """Casos que contienen el síntoma (comparado ya normalizado), en orden de la base."""
+        indices = self._indices
+        return self._casos_de(indices, indices.por_sintoma.get(normalizar_texto(sintoma), ()))
+
+    def casos_con_algun_sintoma(self, sintomas: Iterable[str]) -> List[Caso]:
+        """Casos que comparten al menos uno de los síntomas, en orden de la base."""
+        indices = self._indices
+        ids: Set[int] = set()
+        for sintoma in normalizar_lista(list(sintomas)):
+            ids |= indices.por_sintoma.get(sintoma, frozenset())
+        return self._casos_de(indices, ids)
+
+    def casos_con_riesgo(self, riesgo: str) -> List[Caso]:
+        """Casos con el nivel de riesgo indicado (sin distinguir mayúsculas)."""
+        indices = self._indices
+        return self._casos_de(indices, indices.por_riesgo.get(self._clave_riesgo(riesgo), ()))
+
     # ------------------------------------------------------
     # Persistencia en JSON
     # ------------------------------------------------------
@@ -101,11 +370,15 @@ class BaseDeCasos:
 
         # El archivo puede contener una lista o un solo caso
         if isinstance(datos, dict):
-            self.casos = [Caso.from_dict(datos)]
+            casos = [Caso.from_dict(datos)]
         elif isinstance(datos, list):
-            self.casos = [Caso.from_dict(item) for item in datos]
+            casos = [Caso.from_dict(item) for item in datos]
         else:
             raise ValueError("Formato de archivo JSON no reconocido.")
+        with self._escritura:
+            self.casos = casos
+            self._reindexar()
+            self.version += 1
 
     def guardar_a_json(self, ruta: str):
         """Guarda los casos actuales en un archivo JSON."""
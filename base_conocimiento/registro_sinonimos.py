@@ -0,0 +1,163 @@
+# base_conocimiento/registro_sinonimos.py
+import json
+import os
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+_DIRECTORIO = os.path.dirname(__file__)
+RUTA_SINONIMOS = os.path.join(_DIRECTORIO, "sinonimos_ontologia.json")
+RUTA_SINONIMOS_ENRIQUECIDO = os.path.join(_DIRECTORIO, "sinonimos_ontologia_enriquecido.json")
+
+# Orden de fusión por defecto: el enriquecido se aplica al final y tiene prioridad
+RUTAS_FUSION = (RUTA_SINONIMOS, RUTA_SINONIMOS_ENRIQUECIDO)
+
+Firma = Optional[Tuple[int, int]]
+
+
+def _firma_archivo(ruta: str) -> Firma:
+    """Devuelve (mtime_ns, tamaño) del archivo o None si no existe."""
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class TablaSinonimos:
+    """
+    Instantánea inmutable de una tabla de sinónimos (frase → síntoma canónico).
+    Se reemplaza completa al recargar, nunca se modifica en sitio, por lo que
+    los índices derivados de ella pueden guardarse junto a la instantánea.
+    """
+
+    def __init__(
+        self,
+        entradas: Dict[str, str],
+        rutas: Tuple[str, ...],
+        firmas: Tuple[Firma, ...],
+        derivados: Optional[Dict[str, Any]] = None
+    ):
+        self.entradas: Mapping[str, str] = MappingProxyType(entradas)
+        self.rutas = rutas
+        self.firmas = firmas
+        self._derivados: Dict[str, Any] = dict(derivados or {})
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entradas)
+
+    def derivado(self, nombre: str, constructor: Callable[["TablaSinonimos"], Any]) -> Any:
+        """
+        Devuelve la estructura derivada `nombre` (p. ej. un índice), construyéndola
+        una sola vez con `constructor(tabla)`. Se descarta junto con la instantánea.
+        """
+        valor = self._derivados.get(nombre)
+        if valor is None:
+            with self._lock:
+                valor = self._derivados.get(nombre)
+                if valor is None:
+                    valor = constructor(self)
+                    self._derivados[nombre] = valor
+        return valor
+
+    def derivados(self) -> Dict[str, Any]:
+        """Copia de las estructuras derivadas ya construidas (nombre → valor)."""
+        with self._lock:
+            return dict(self._derivados)
+
+
+class RegistroSinonimos:
+    """
+    Registro compartido y perezoso de tablas de sinónimos.
+    Cada archivo JSON se parsea una sola vez y solo se vuelve a leer si cambia
+    su fecha de modificación o su tamaño; `recargar()` fuerza la relectura.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._archivos: Dict[str, Tuple[Firma, Dict[str, str]]] = {}
+        self._tablas: Dict[Tuple[str, ...], TablaSinonimos] = {}
+
+    def _leer_archivo(self, ruta: str, firma: Firma) -> Optional[Dict[str, str]]:
+        """Lee un archivo de sinónimos reutilizando la copia en memoria si no cambió."""
+        if firma is None:
+            return None
+        en_memoria = self._archivos.get(ruta)
+        if en_memoria is not None and en_memoria[0] == firma:
+            return en_memoria[1]
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"❌ Error al cargar {ruta}: {e}")
+            return None
+        self._archivos[ruta] = (firma, data)
+        return data
+
+    def _construir(self, rutas: Tuple[str, ...], firmas: Tuple[Firma, ...]) -> TablaSinonimos:
+        entradas: Dict[str, str] = {}
+        cargados = []
+        for ruta, firma in zip(rutas, firmas):
+            data = self._leer_archivo(ruta, firma)
+            if data is None:
+                continue
+            entradas.update(data)
+            cargados.append(f"{ruta} ({len(data)} entradas)")
+
+        if not cargados:
+            print("⚠️ No se encontró ningún archivo de sinónimos.")
+        else:
+            print(f"✅ Sinónimos cargados y fusionados desde:\n   " + "\n   ".join(cargados))
+            print(f"📚 Total combinados: {len(entradas)} entradas únicas")
+        return TablaSinonimos(entradas, rutas, firmas)
+
+    def obtener(self, rutas: Sequence[str] = RUTAS_FUSION) -> TablaSinonimos:
+        """
+        Devuelve la tabla fusionada de `rutas` (las últimas tienen prioridad).
+        Solo se reconstruye si alguno de los archivos cambió en disco.
+        """
+        rutas = tuple(rutas)
+        firmas = tuple(_firma_archivo(r) for r in rutas)
+        tabla = self._tablas.get(rutas)
+        if tabla is not None and tabla.firmas == firmas:
+            return tabla
+        with self._lock:
+            tabla = self._tablas.get(rutas)
+            if tabla is None or tabla.firmas != firmas:
+                tabla = self._construir(rutas, firmas)
+                self._tablas[rutas] = tabla
+            return tabla
+
+    def tablas(self) -> Tuple[TablaSinonimos, ...]:
+        """Tablas construidas hasta ahora (pueden estar desactualizadas respecto al disco)."""
+        with self._lock:
+            return tuple(self._tablas.values())
+
+    def instalar(self, tabla: TablaSinonimos) -> None:
+        """
+        Registra una tabla construida fuera del registro (p. ej. desde una instantánea
+        compilada). Se usará mientras sus firmas coincidan con los archivos en disco.
+        """
+        with self._lock:
+            self._tablas[tabla.rutas] = tabla
+
+    def recargar(self) -> None:
+        """Descarta todas las tablas y archivos en memoria; la próxima consulta relee del disco."""
+        with self._lock:
+            self._archivos.clear()
+            self._tablas.clear()
+
+
+# Instancia única del proceso, compartida por la UI y el motor de inferencia
+REGISTRO = RegistroSinonimos()
+
+
+def obtener_sinonimos(rutas: Sequence[str] = RUTAS_FUSION) -> Mapping[str, str]:
+    """Atajo: devuelve el diccionario (de solo lectura) de la tabla de `rutas`."""
+    return REGISTRO.obtener(rutas).entradas
+
+
+def recargar_sinonimos() -> None:
+    """Fuerza la relectura de los archivos de sinónimos en la próxima consulta."""
+    REGISTRO.recargar()
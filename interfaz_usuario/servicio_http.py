@@ -0,0 +1,291 @@
+# interfaz_usuario/servicio_http.py
+"""
+Servicio HTTP/JSON local del sistema experto (asyncio, solo biblioteca estándar).
+
+Carga la base de casos, los sinónimos y los índices una sola vez al arrancar y
+los mantiene en memoria entre peticiones. El análisis (CPU) se ejecuta en un
+pool de hilos para no bloquear el bucle de eventos, con un límite de análisis
+simultáneos: si no se obtiene turno a tiempo se responde 503.
+
+Rutas:
+    POST /analyze  {"texto": "...", "umbral": 0.6, "explicar": true, "formato": "texto", "modo": "jaccard"}
+                   → síntomas canónicos, caso de razonar y explicación
+    POST /cases    {"sintomas": [...], "posible_causa": "...", ...}
+                   → agrega el caso (diario de casos) y devuelve su id (409 si el id ya existe)
+    GET  /health   → estado del servicio y métricas del pipeline
+    GET  /metrics  → métricas en formato de texto de Prometheus
+
+Uso:
+    python -m interfaz_usuario.servicio_http --puerto 8080
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, Union
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, cargar_base, guardar_caso
+from base_conocimiento.modelos import BaseDeCasos, Caso
+from modulo_explicacion.plantillas import FORMATOS
+from motor_inferencia.batch import inferir
+from motor_inferencia.cache_consultas import CACHE_CONSULTAS
+from motor_inferencia.cache_similitud import CACHE_SIMILITUD
+from motor_inferencia.instrumentacion import METRICAS, NIVELES_LOG, configurar_log
+from motor_inferencia.procesamiento import normalizar_sintomas, precargar_indices
+from motor_inferencia.razonador import MODOS_RECUPERACION
+
+MAX_CUERPO = 1024 * 1024          # bytes admitidos en el cuerpo de una petición
+MAX_CONCURRENTES = 8              # análisis simultáneos
+ESPERA_MAXIMA = 10.0              # segundos esperando turno antes de responder 503
+TIEMPO_LECTURA = 30.0             # segundos para recibir la petición completa
+
+# Campos de un caso nuevo que deben ser listas de cadenas / cadenas (si vienen)
+CAMPOS_LISTA = ("estrategias", "autoevaluaciones_sugeridas", "derivar_a")
+CAMPOS_TEXTO = ("resultado", "riesgo", "recomendacion_general")
+
+_MOTIVOS = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ServicioInferencia:
+    """Mantiene el motor caliente y atiende las peticiones HTTP."""
+
+    def __init__(
+        self,
+        base: BaseDeCasos,
+        ruta_casos: str = RUTA_ARCHIVO,
+        hilos: int = 4,
+        max_concurrentes: int = MAX_CONCURRENTES,
+        espera_maxima: float = ESPERA_MAXIMA,
+    ):
+        self.base = base
+        self.ruta_casos = ruta_casos
+        self.espera_maxima = espera_maxima
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="inferencia")
+        self._turnos = asyncio.Semaphore(max_concurrentes)
+        self._escritura = asyncio.Lock()
+        self.atendidas = 0
+
+    # ------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------
+    async def _en_ejecutor(self, funcion, *args):
+        """Ejecuta `funcion` en el pool respetando el límite de concurrencia."""
+        try:
+            await asyncio.wait_for(self._turnos.acquire(), timeout=self.espera_maxima)
+        except asyncio.TimeoutError:
+            raise ErrorHTTP(503, "Servicio saturado, intente de nuevo.")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._ejecutor, funcion, *args)
+        finally:
+            self._turnos.release()
+
+    async def analizar(self, datos: Dict) -> Tuple[int, Dict]:
+        texto = datos.get("texto")
+        if not isinstance(texto, str):
+            raise ErrorHTTP(400, "Se esperaba el campo 'texto' (cadena).")
+        try:
+            umbral = float(datos.get("umbral", 0.6))
+        except (TypeError, ValueError):
+            raise ErrorHTTP(400, "'umbral' debe ser numérico.")
+        if not math.isfinite(umbral) or not 0.0 <= umbral <= 1.0:
+            raise ErrorHTTP(400, "'umbral' debe estar entre 0 y 1.")
+        registro = {"id": datos.get("id"), "texto": texto}
+        explicar = datos.get("explicar", True)
+        if not isinstance(explicar, bool):
+            raise ErrorHTTP(400, "'explicar' debe ser true o false.")
+        formato = datos.get("formato", "texto")
+        if formato not in FORMATOS:
+            raise ErrorHTTP(400, f"'formato' debe ser uno de: {', '.join(FORMATOS)}.")
+        modo = datos.get("modo", "jaccard")
+        if modo not in MODOS_RECUPERACION:
+            raise ErrorHTTP(400, f"'modo' debe ser uno de: {', '.join(MODOS_RECUPERACION)}.")
+        return 200, await self._en_ejecutor(inferir, self.base, registro, umbral, explicar, formato, modo)
+
+    def _nuevo_caso(self, datos: Dict) -> Caso:
+        # Lo que se acepta aquí llega tal cual al diario: se valida antes de construir el caso
+        sintomas = datos.get("sintomas")
+        if not isinstance(sintomas, list) or not sintomas or not all(isinstance(s, str) for s in sintomas):
+            raise ErrorHTTP(400, "Se esperaba 'sintomas' (lista no vacía de cadenas).")
+        if not isinstance(datos.get("posible_causa"), str) or not datos["posible_causa"]:
+            raise ErrorHTTP(400, "Se esperaba 'posible_causa' (cadena no vacía).")
+        for campo in CAMPOS_LISTA:
+            valor = datos.get(campo)
+            if valor is not None and (not isinstance(valor, list) or not all(isinstance(v, str) for v in valor)):
+                raise ErrorHTTP(400, f"'{campo}' debe ser una lista de cadenas.")
+        for campo in CAMPOS_TEXTO:
+            if datos.get(campo) is not None and not isinstance(datos[campo], str):
+                raise ErrorHTTP(400, f"'{campo}' debe ser una cadena.")
+        id_caso = datos.get("id_caso")
+        if id_caso is not None and (not isinstance(id_caso, int) or isinstance(id_caso, bool)):
+            raise ErrorHTTP(400, "'id_caso' debe ser un entero.")
+        datos = dict(datos, sintomas=normalizar_sintomas(sintomas))
+        # Sin id_caso, guardar_caso asigna uno libre con el diario bloqueado (también frente a otros procesos)
+        if datos.get("id_caso") is not None and self.base.buscar_por_id(datos["id_caso"]) is not None:
+            raise ErrorHTTP(409, f"Ya existe un caso con id_caso {datos['id_caso']}.")
+        return Caso.from_dict(datos)
+
+    async def agregar_caso(self, datos: Dict) -> Tuple[int, Dict]:
+        async with self._escritura:
+            caso = self._nuevo_caso(datos)
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._ejecutor, guardar_caso, caso, self.ruta_casos)
+            except ValueError as e:
+                raise ErrorHTTP(409, str(e))
+            self.base.agregar_caso(caso)
+        return 201, {"id_caso": caso.id_caso}
+
+    async def estado(self, _datos: Dict) -> Tuple[int, Dict]:
+        return 200, {
+            "casos": len(self.base.casos),
+            "atendidas": self.atendidas,
+            "cache_consultas": CACHE_CONSULTAS.estadisticas(),
+            "metricas": METRICAS.instantanea(),
+        }
+
+    async def metricas(self, _datos: Dict) -> Tuple[int, str]:
+        return 200, METRICAS.texto_prometheus()
+
+    # ------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------
+    async def _leer_peticion(self, lector: asyncio.StreamReader) -> Optional[Tuple[str, str, bytes]]:
+        linea = await lector.readline()
+        if not linea:
+            return None
+        try:
+            metodo, ruta, _ = linea.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise ErrorHTTP(400, "Línea de petición inválida.")
+        cabeceras = {}
+        while True:
+            linea = await lector.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        try:
+            longitud = int(cabeceras.get("content-length", 0))
+        except ValueError:
+            raise ErrorHTTP(400, "Content-Length inválido.")
+        if longitud < 0:
+            raise ErrorHTTP(400, "Content-Length inválido.")
+        if longitud > MAX_CUERPO:
+            raise ErrorHTTP(413, "Cuerpo demasiado grande.")
+        cuerpo = await lector.readexactly(longitud) if longitud else b""
+        return metodo.upper(), ruta.split("?", 1)[0], cuerpo
+
+    async def _despachar(self, metodo: str, ruta: str, cuerpo: bytes) -> Tuple[int, Union[Dict, str]]:
+        rutas = {
+            "/analyze": ("POST", self.analizar),
+            "/cases": ("POST", self.agregar_caso),
+            "/health": ("GET", self.estado),
+            "/metrics": ("GET", self.metricas),
+        }
+        if ruta not in rutas:
+            raise ErrorHTTP(404, f"Ruta desconocida: {ruta}")
+        metodo_esperado, manejador = rutas[ruta]
+        if metodo != metodo_esperado:
+            raise ErrorHTTP(405, f"Use {metodo_esperado} en {ruta}.")
+        datos = {}
+        if cuerpo:
+            try:
+                datos = json.loads(cuerpo)
+            except ValueError as e:
+                raise ErrorHTTP(400, f"JSON inválido: {e}")
+            if not isinstance(datos, dict):
+                raise ErrorHTTP(400, "Se esperaba un objeto JSON.")
+        return await manejador(datos)
+
+    async def atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        """Atiende una conexión (una petición por conexión)."""
+        try:
+            try:
+                peticion = await asyncio.wait_for(self._leer_peticion(lector), timeout=TIEMPO_LECTURA)
+                if peticion is None:
+                    return
+                estado, respuesta = await self._despachar(*peticion)
+            except ErrorHTTP as e:
+                estado, respuesta = e.estado, {"error": str(e)}
+            except asyncio.TimeoutError:
+                estado, respuesta = 408, {"error": "Tiempo de lectura agotado."}
+            except asyncio.IncompleteReadError:
+                return
+            except Exception as e:
+                estado, respuesta = 500, {"error": f"{type(e).__name__}: {e}"}
+            self.atendidas += 1
+
+            if isinstance(respuesta, str):
+                cuerpo, tipo = respuesta.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                cuerpo = json.dumps(respuesta, ensure_ascii=False).encode("utf-8")
+                tipo = "application/json; charset=utf-8"
+            escritor.write(
+                f"HTTP/1.1 {estado} {_MOTIVOS.get(estado, '')}\r\n"
+                f"Content-Type: {tipo}\r\n"
+                f"Content-Length: {len(cuerpo)}\r\n"
+                f"Connection: close\r\n\r\n".encode("latin-1") + cuerpo
+            )
+            await escritor.drain()
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+
+    def cerrar(self):
+        self._ejecutor.shutdown(wait=True, cancel_futures=True)
+
+
+async def servir(host: str, puerto: int, ruta_casos: str, hilos: int, max_concurrentes: int):
+    # Todo se carga una sola vez: las peticiones encuentran el motor caliente
+    base = cargar_base(ruta_casos)
+    precargar_indices(base)
+    CACHE_SIMILITUD.cargar()
+
+    servicio = ServicioInferencia(base, ruta_casos, hilos=hilos, max_concurrentes=max_concurrentes)
+    servidor = await asyncio.start_server(servicio.atender, host, puerto)
+    print(f"✅ Servicio escuchando en http://{host}:{puerto} ({len(base.casos)} casos)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servicio.cerrar()
+        CACHE_SIMILITUD.guardar()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m interfaz_usuario.servicio_http",
+        description="Servicio HTTP/JSON local del sistema experto (/analyze, /cases, /health, /metrics)."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección de escucha")
+    parser.add_argument("--puerto", type=int, default=8080, help="Puerto de escucha")
+    parser.add_argument("--casos", default=RUTA_ARCHIVO, help="Ruta de la base de casos (JSON o SQLite .db)")
+    parser.add_argument("--hilos", type=int, default=4, help="Hilos del pool de análisis")
+    parser.add_argument("--max-concurrentes", type=int, default=MAX_CONCURRENTES,
+                        help="Análisis simultáneos antes de encolar (y responder 503 si la espera se alarga)")
+    parser.add_argument("--log-nivel", default="WARNING", choices=NIVELES_LOG,
+                        help="Nivel de los mensajes de diagnóstico (DEBUG = uno por fragmento analizado)")
+    args = parser.parse_args(argv)
+
+    configurar_log(args.log_nivel)
+    try:
+        asyncio.run(servir(args.host, args.puerto, args.casos, args.hilos, args.max_concurrentes))
+    except KeyboardInterrupt:
+        print("👋 Servicio detenido.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,84 +1,17 @@
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox, scrolledtext
-import json
-import re
-from difflib import SequenceMatcher
 
-from base_conocimiento.almacenamiento import cargar_base, guardar_base
+from base_conocimiento.almacenamiento import cargar_base, guardar_caso
 from base_conocimiento.modelos import Caso
 from motor_inferencia.razonador import razonar
-from modulo_explicacion.explicacion import ModuloExplicacion
-from motor_inferencia.semantic_helper import buscar_equivalente_semantico
-
-# ===== CONFIGURACIÓN GLOBAL =====
-RUTA_SINONIMOS = "base_conocimiento/sinonimos_ontologia_enriquecido.json"
-STOPWORDS = {"tengo", "me", "siento", "y", "a veces", "muy", "con", "el", "la", "los", "las", "de", "en", "por"}
-
-
-# ===== UTILIDADES DE PROCESAMIENTO =====
-def cargar_sinonimos(ruta=RUTA_SINONIMOS):
-    """Carga el archivo JSON de sinónimos."""
-    try:
-        with open(ruta, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-
-def buscar_sinonimo_aproximado(frase, sinonimos, umbral=0.7):
-    """
-    Busca el sinónimo más parecido a la frase dada.
-    Si la similitud supera el umbral, devuelve el valor del sinónimo.
-    En caso contrario, devuelve la frase original.
-    """
-    frase = frase.lower().strip()
-    mejor, sim_mejor = frase, 0
-    for key, val in sinonimos.items():
-        sim = SequenceMatcher(None, frase, key.lower()).ratio()
-        if sim > sim_mejor and sim >= umbral:
-            mejor, sim_mejor = val, sim
-    return mejor
-
-
-def normalizar_sintomas(sintomas):
-    """Normaliza una lista de síntomas usando el diccionario de sinónimos."""
-    sinonimos = cargar_sinonimos()
-    return [sinonimos.get(s.strip().lower(), s.strip().lower()) for s in sintomas if s.strip()]
-
-
-def procesar_sintomas_semi_libre(texto):
-    frases = re.split(r"[.,;]", texto.lower())
-    sinonimos = cargar_sinonimos()
-    sintomas = []
-    base_sintomas = list(sinonimos.values())  # para comparación semántica
-
-    for frase in frases:
-        frase = frase.strip()
-        if not frase or frase in STOPWORDS:
-            continue
-
-        # Exacta
-        if frase in sinonimos:
-            sintomas.append(sinonimos[frase])
-            continue
-
-        # Difusa (ya la tienes con buscar_sinonimo_aproximado)
-        aproximado = buscar_sinonimo_aproximado(frase, sinonimos, umbral=0.7)
-        if aproximado != frase:
-            sintomas.append(aproximado)
-            continue
-
-        # Semántica
-        coincidencias = buscar_equivalente_semantico(frase, umbral=0.5)
-        if coincidencias:
-            for _, encontrado, sim in coincidencias:
-                print(f"[SEMANTIC LOG] Coincidencia semántica: '{frase}' → '{encontrado}' (sim={sim:.2f})")
-                sintomas.append(encontrado)
-        else:
-            print(f"[SEMANTIC LOG] Sin coincidencia semántica para: '{frase}'")
-            sintomas.append(frase)  # mantener texto original
+from modulo_explicacion.plantillas import resumen_caso
+from motor_inferencia.cache_consultas import CACHE_CONSULTAS
+from motor_inferencia.cache_similitud import CACHE_SIMILITUD
+from motor_inferencia.procesamiento import normalizar_sintomas, precargar_indices, procesar_sintomas_semi_libre
 
-    return list(set(sintomas))
+INTERVALO_CONSULTA_MS = 50  # cada cuánto se revisa si terminó el análisis en segundo plano
 
 
 # ===== INTERFAZ PRINCIPAL =====
@@ -89,7 +22,15 @@ class SistemaExpertoApp(tk.Tk):
         self.minsize(900, 600)
         self.configure(bg="#F9FAFB")
         self.resizable(False, False)
-        self.base = cargar_base()
+        self.protocol("WM_DELETE_WINDOW", self.cerrar)
+
+        # El análisis corre en un hilo aparte para no congelar la ventana
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analisis")
+        self._consulta = None  # (futuro, evento de cancelación) de la consulta en curso
+        # La base, los sinónimos y los índices se cargan en ese mismo hilo mientras se
+        # muestra la ventana; un análisis pedido antes espera en la cola a que termine
+        self._carga = self._ejecutor.submit(self._cargar_conocimiento)
+        self.after(INTERVALO_CONSULTA_MS, self._revisar_carga)
 
         # ===== Estilos Modernos =====
         style = ttk.Style(self)
@@ -114,8 +55,81 @@ class SistemaExpertoApp(tk.Tk):
 
         self.iniciar_interfaz()
 
+    @staticmethod
+    def _cargar_conocimiento():
+        """Carga la base de casos, los sinónimos, los índices y la caché de similitudes (hilo de fondo)."""
+        base = cargar_base()
+        precargar_indices(base)
+        # Caché de similitudes de la sesión anterior (arranque en caliente)
+        CACHE_SIMILITUD.cargar()
+        return base
+
+    @property
+    def base(self):
+        """
+        Base de casos; si aún se está cargando, espera a que termine.
+        Solo para el hilo de análisis: en el hilo de Tk use `_base_cargada`.
+        """
+        return self._carga.result()
+
+    def _base_cargada(self):
+        """Base de casos si la carga terminó bien; None mientras carga o si falló (nunca bloquea ni lanza)."""
+        if not self._carga.done() or self._carga.cancelled() or self._carga.exception() is not None:
+            return None
+        return self._carga.result()
+
+    def _error_carga(self):
+        """Excepción de la carga inicial, o None si terminó bien o aún no termina."""
+        if not self._carga.done() or self._carga.cancelled():
+            return None
+        return self._carga.exception()
+
+    def _revisar_carga(self):
+        """Sondea (con after) la carga inicial y actualiza el aviso de la pantalla de inicio."""
+        if not self._carga.done():
+            self.after(INTERVALO_CONSULTA_MS, self._revisar_carga)
+            return
+        error = self._error_carga()
+        if error is not None:
+            messagebox.showerror("Error", f"No se pudo cargar la base de conocimiento: {error}")
+        self._mostrar_estado_carga()
+        self._habilitar_guardado()
+
+    def _mostrar_estado_carga(self):
+        etiqueta = getattr(self, "label_carga", None)
+        if etiqueta is None or not etiqueta.winfo_exists():
+            return
+        base = self._base_cargada()
+        if base is not None:
+            etiqueta.configure(text=f"✅ Base de conocimiento lista ({len(base.casos)} casos)")
+        elif not self._carga.done():
+            etiqueta.configure(text="⏳ Cargando la base de conocimiento...")
+        else:
+            etiqueta.configure(text="❌ No se pudo cargar la base de conocimiento")
+
+    def _habilitar_guardado(self):
+        """El botón "Guardar caso" solo se activa cuando la base está cargada."""
+        boton = getattr(self, "boton_guardar", None)
+        if boton is None or not boton.winfo_exists():
+            return
+        boton.state(["!disabled"] if self._base_cargada() is not None else ["disabled"])
+
+    def cerrar(self):
+        """Guarda la caché de similitudes y cierra la ventana."""
+        self.cancelar_consulta()
+        self._ejecutor.shutdown(wait=False, cancel_futures=True)
+        # Si la carga no terminó, la caché en memoria está incompleta: no se sobrescribe la guardada
+        if self._carga.done() and not self._carga.cancelled() and self._carga.exception() is None:
+            try:
+                CACHE_SIMILITUD.guardar()
+            except OSError as e:
+                print(f"⚠️ No se pudo guardar la caché de similitud: {e}")
+        self.destroy()
+
     def limpiar_frame(self):
         """Elimina widgets actuales de la ventana."""
+        # Un análisis pendiente ya no tiene dónde mostrarse
+        self.cancelar_consulta()
         for widget in self.winfo_children():
             widget.destroy()
 
@@ -132,6 +146,10 @@ class SistemaExpertoApp(tk.Tk):
         ttk.Button(frame, text="Soy Paciente", width=25, command=self.rol_paciente).pack(pady=5)
         ttk.Button(frame, text="Soy Psicólogo", width=25, command=self.rol_psicologo).pack(pady=5)
 
+        self.label_carga = ttk.Label(frame, text="", font=("Segoe UI", 10))
+        self.label_carga.pack(pady=(15, 0))
+        self._mostrar_estado_carga()
+
     # ===== PACIENTE =====
     def rol_paciente(self):
         self.limpiar_frame()
@@ -155,6 +173,9 @@ class SistemaExpertoApp(tk.Tk):
 
         ttk.Button(top_frame, text="Analizar", command=self.consultar_sintomas).pack(pady=(0, 15))
 
+        # Indicador de progreso: solo se muestra mientras hay un análisis en curso
+        self.progreso = ttk.Progressbar(top_frame, mode="indeterminate", length=300)
+
         # ===== SECCIÓN MEDIA =====
         middle_frame = ttk.Frame(container)
         middle_frame.pack(fill="both", expand=True, padx=20)
@@ -183,39 +204,104 @@ class SistemaExpertoApp(tk.Tk):
         ).pack(ipadx=12, ipady=6)
 
     def consultar_sintomas(self):
-        """Analiza los síntomas ingresados por el paciente."""
+        """Lanza en segundo plano el análisis de los síntomas ingresados por el paciente."""
         texto_usuario = self.entry_sintomas.get().strip()
-        sintomas_usuario = procesar_sintomas_semi_libre(texto_usuario)
+        # Una consulta nueva deja obsoleta la anterior
+        self.cancelar_consulta()
         self.text_resultado.delete(1.0, tk.END)
+        if self._error_carga() is not None:
+            self.text_resultado.insert(tk.END, "❌ No se pudo cargar la base de conocimiento; no es posible analizar.")
+            return
 
-        if not sintomas_usuario:
-            messagebox.showwarning("Advertencia", "Por favor, ingrese al menos un síntoma.")
+        cancelada = threading.Event()
+        futuro = self._ejecutor.submit(self._analizar, texto_usuario, cancelada)
+        self._consulta = (futuro, cancelada)
+        self.progreso.pack(pady=(0, 10))
+        self.progreso.start(15)
+        if not self._carga.done():
+            self.text_resultado.insert(tk.END, "⏳ Cargando la base de conocimiento; el análisis empezará al terminar...")
+        self.after(INTERVALO_CONSULTA_MS, self._revisar_consulta, futuro)
+
+    def cancelar_consulta(self):
+        """Descarta la consulta en curso (si aún no empezó, ni siquiera se ejecuta)."""
+        if self._consulta is None:
             return
+        futuro, cancelada = self._consulta
+        cancelada.set()
+        futuro.cancel()
+        self._consulta = None
+        self._detener_progreso()
+
+    def _detener_progreso(self):
+        progreso = getattr(self, "progreso", None)
+        if progreso is not None and progreso.winfo_exists():
+            progreso.stop()
+            progreso.pack_forget()
+
+    def _analizar(self, texto_usuario, cancelada):
+        """
+        Trabajo pesado del análisis (hilo de fondo): extrae los síntomas y razona.
+        Devuelve (síntomas, casos relacionados para preguntar, resultado de razonar),
+        o None si la consulta se canceló entre etapas.
+        """
+        sintomas_usuario = procesar_sintomas_semi_libre(texto_usuario, self.base)
+        if cancelada.is_set():
+            return None
+        if not sintomas_usuario:
+            return sintomas_usuario, None, None
 
         if len(sintomas_usuario) == 1:
-            sintoma = sintomas_usuario[0]
-            casos_relacionados = [c for c in self.base.listar_casos() if sintoma in c.sintomas]
-
+            casos_relacionados = self.base.casos_con_sintoma(sintomas_usuario[0])
             if len(casos_relacionados) > 1:
-                messagebox.showinfo(
-                    "Información adicional requerida",
-                    "Te haré unas preguntas para entender mejor tu situación."
-                )
-
-                for caso in casos_relacionados:
-                    otros = [s for s in caso.sintomas if s != sintoma]
-                    if not otros:
-                        continue
-                    pregunta = f"¿También presentas {otros[0]}?"
-                    if messagebox.askyesno("Confirmación", pregunta):
-                        return self.mostrar_resultado(caso, sintomas_usuario)
-                messagebox.showinfo(
-                    "Sin coincidencia clara",
-                    "No se pudo determinar un caso específico con la información proporcionada."
-                )
-                return
+                return sintomas_usuario, casos_relacionados, None
 
         resultado = razonar(self.base, sintomas_usuario)
+        return None if cancelada.is_set() else (sintomas_usuario, None, resultado)
+
+    def _revisar_consulta(self, futuro):
+        """Sondea (con after) el análisis en curso y muestra su resultado al terminar."""
+        if self._consulta is None or self._consulta[0] is not futuro:
+            return  # consulta obsoleta
+        if not futuro.done():
+            self.after(INTERVALO_CONSULTA_MS, self._revisar_consulta, futuro)
+            return
+
+        self._consulta = None
+        self._detener_progreso()
+        self.text_resultado.delete(1.0, tk.END)
+        try:
+            analisis = futuro.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo analizar los síntomas: {e}")
+            return
+        if analisis is not None:
+            self.mostrar_analisis(*analisis)
+
+    def mostrar_analisis(self, sintomas_usuario, casos_relacionados, resultado):
+        """Muestra en la ventana el resultado del análisis (hilo principal)."""
+        if not sintomas_usuario:
+            messagebox.showwarning("Advertencia", "Por favor, ingrese al menos un síntoma.")
+            return
+
+        if casos_relacionados is not None:
+            sintoma = sintomas_usuario[0]
+            messagebox.showinfo(
+                "Información adicional requerida",
+                "Te haré unas preguntas para entender mejor tu situación."
+            )
+
+            for caso in casos_relacionados:
+                otros = [s for s in caso.sintomas if s != sintoma]
+                if not otros:
+                    continue
+                pregunta = f"¿También presentas {otros[0]}?"
+                if messagebox.askyesno("Confirmación", pregunta):
+                    return self.mostrar_resultado(caso, sintomas_usuario)
+            messagebox.showinfo(
+                "Sin coincidencia clara",
+                "No se pudo determinar un caso específico con la información proporcionada."
+            )
+            return
 
         if resultado is None:
             self.text_resultado.insert(tk.END, "⚠️ No se encontró un caso similar en la base de conocimiento.")
@@ -229,32 +315,27 @@ class SistemaExpertoApp(tk.Tk):
 
     def mostrar_resultado(self, caso, sintomas_usuario, sim=None):
         """Muestra el caso más similar y su explicación."""
+        # Solo se llega aquí tras un análisis, que corre después de la carga
+        base = self._base_cargada()
+        if base is None:
+            return
         sim = sim or 1.0
-        nivel_confianza = "alta" if sim >= 0.7 else "moderada" if sim >= 0.4 else "baja"
-
-        texto = (
-            f"🩺 Posible causa: {getattr(caso, 'posible_causa', 'No especificada')}\n"
-            f"💡 Estrategias sugeridas: {', '.join(getattr(caso, 'estrategias', [])) or 'No especificadas'}\n"
-            f"🧘 Recomendación general: {getattr(caso, 'recomendacion_general', 'Mantener rutinas saludables')}\n"
-            f"🧾 Autoevaluaciones sugeridas: {', '.join(getattr(caso, 'autoevaluaciones_sugeridas', [])) or 'No especificadas'}\n"
-            f"🔎 Nivel de riesgo: {getattr(caso, 'riesgo', 'no definido')}\n"
-            f"📊 Nivel de confianza: {nivel_confianza}\n\n"
-        )
-
-        exp = ModuloExplicacion(caso, sim)
-        texto += "📖 Explicación:\n" + exp.generar_explicacion(sintomas_usuario)
+        partes = [
+            resumen_caso(caso, sim),
+            "📖 Explicación:\n",
+            CACHE_CONSULTAS.explicacion(base, sintomas_usuario, caso, sim),
+        ]
 
         posibles = [
-            c for c in self.base.listar_casos()
-            if c.id_caso != caso.id_caso and any(s in c.sintomas for s in sintomas_usuario)
+            c for c in base.casos_con_algun_sintoma(sintomas_usuario)
+            if c.id_caso != caso.id_caso
         ]
         if posibles:
-            texto += "\n\n⚠️ Casos relacionados:\n"
-            for otro in posibles[:2]:
-                texto += f"  - {getattr(otro, 'posible_causa', 'No especificada')}\n"
+            partes.append("\n\n⚠️ Casos relacionados:\n")
+            partes.extend(f"  - {getattr(otro, 'posible_causa', 'No especificada')}\n" for otro in posibles[:2])
 
         self.text_resultado.delete(1.0, tk.END)
-        self.text_resultado.insert(tk.END, texto)
+        self.text_resultado.insert(tk.END, "".join(partes))
 
     # ===== PSICÓLOGO =====
     def rol_psicologo(self):
@@ -294,11 +375,21 @@ class SistemaExpertoApp(tk.Tk):
             self.entry_recomendacion
         ) = self.entries_ps
 
-        ttk.Button(frame, text="💾 Guardar caso", command=self.agregar_caso).pack(pady=(15, 8))
+        # Deshabilitado hasta que termine la carga (lo activa _revisar_carga)
+        self.boton_guardar = ttk.Button(frame, text="💾 Guardar caso", command=self.agregar_caso)
+        self.boton_guardar.pack(pady=(15, 8))
+        self._habilitar_guardado()
         ttk.Button(frame, text="⬅ Volver", command=self.iniciar_interfaz).pack()
 
     def agregar_caso(self):
         """Agrega un nuevo caso a la base de conocimiento."""
+        base = self._base_cargada()
+        if base is None:
+            if self._error_carga() is not None:
+                messagebox.showerror("Error", "No se pudo cargar la base de conocimiento; el caso no se guardó.")
+            else:
+                messagebox.showinfo("Espere", "La base de conocimiento aún se está cargando.")
+            return
         sintomas = normalizar_sintomas(self.entry_sintomas.get().split(","))
         causa = self.entry_causa.get()
         estrategias = [e.strip() for e in self.entry_estrategias.get().split(",") if e.strip()]
@@ -309,7 +400,7 @@ class SistemaExpertoApp(tk.Tk):
         recomendacion = self.entry_recomendacion.get() or "Mantener rutinas saludables"
 
         nuevo_caso = Caso(
-            id_caso=len(self.base.listar_casos()) + 1,
+            id_caso=None,  # guardar_caso asigna el siguiente id libre con el diario bloqueado
             sintomas=sintomas,
             posible_causa=causa,
             estrategias=estrategias,
@@ -320,8 +411,13 @@ class SistemaExpertoApp(tk.Tk):
             recomendacion_general=recomendacion
         )
 
-        self.base.agregar_caso(nuevo_caso)
-        guardar_base(self.base)
+        # Se añade al diario en lugar de reescribir casos.json completo
+        try:
+            guardar_caso(nuevo_caso)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"No se pudo guardar el caso: {e}")
+            return
+        base.agregar_caso(nuevo_caso)
         messagebox.showinfo("✅ Éxito", "Caso agregado correctamente.")
         self.iniciar_interfaz()
 
@@ -0,0 +1,197 @@
+# modulo_explicacion/plantillas.py
+"""
+Plantillas precompiladas de la explicación de un caso.
+
+Cada formato (texto, Markdown) es un conjunto fijo de fragmentos con huecos.
+Las secciones que solo dependen del caso (riesgo, estrategias, recomendación,
+autoevaluaciones, derivaciones y resultado) se generan una vez por caso y
+formato y se guardan en una caché LRU; en cada consulta solo se rellenan las
+coincidencias y la similitud, y el texto se une con un único join.
+
+El formato "json" devuelve un diccionario con las mismas secciones, para lotes y API.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+
+from motor_inferencia.representacion import normalizar_lista
+
+FORMATOS = ("texto", "markdown", "json")
+TAM_CACHE_CASOS = 4096
+
+AVISO = "Recuerda que esta información es orientativa y NO REEMPLAZA LA EVALUACIÓN PROFESIONAL"
+
+
+class Plantilla(NamedTuple):
+    encabezado: str
+    coincidencias: str
+    sin_coincidencias: str
+    causa: str
+    riesgo: str
+    estrategias: str
+    estrategia: str
+    recomendacion: str
+    autoevaluaciones: str
+    autoevaluacion: str
+    derivar: str
+    resultado: str
+    similitud: str
+    cierre: str
+
+
+PLANTILLAS: Dict[str, Plantilla] = {
+    "texto": Plantilla(
+        encabezado="🔍 Hemos analizado los síntomas que proporcionaste y los comparamos con casos registrados "
+                   "en nuestra base de conocimiento.\n\n",
+        coincidencias="✔ Coincidencias encontradas en los síntomas: {}.\n",
+        sin_coincidencias="⚠ No se encontraron coincidencias exactas con casos anteriores.\n",
+        causa="\n🧠 Posible causa identificada: {}.\n",
+        riesgo="⚠ Nivel de riesgo estimado: **{}**.\n",
+        estrategias="\n💡 Estrategias recomendadas:\n",
+        estrategia="   {}. {}\n",
+        recomendacion="\n📋 Recomendación general: {}.\n",
+        autoevaluaciones="\n🧾 Autoevaluaciones sugeridas:\n",
+        autoevaluacion="   - {}\n",
+        derivar="\n👉 Se recomienda derivar a: {}.\n",
+        resultado="\n📈 Resultado observado en casos similares: {}.\n",
+        similitud="\n🔢 Nivel de similitud con el caso más cercano: {:.1f}%.\n",
+        cierre=f"\n🧩 {AVISO} 🩺.",
+    ),
+    "markdown": Plantilla(
+        encabezado="## 🔍 Análisis de síntomas\n\nHemos analizado los síntomas que proporcionaste y los comparamos "
+                   "con casos registrados en nuestra base de conocimiento.\n\n",
+        coincidencias="**✔ Coincidencias encontradas en los síntomas:** {}.\n",
+        sin_coincidencias="**⚠ No se encontraron coincidencias exactas con casos anteriores.**\n",
+        causa="\n**🧠 Posible causa identificada:** {}.\n",
+        riesgo="\n**⚠ Nivel de riesgo estimado:** {}\n",
+        estrategias="\n### 💡 Estrategias recomendadas\n\n",
+        estrategia="{}. {}\n",
+        recomendacion="\n**📋 Recomendación general:** {}.\n",
+        autoevaluaciones="\n### 🧾 Autoevaluaciones sugeridas\n\n",
+        autoevaluacion="- {}\n",
+        derivar="\n**👉 Se recomienda derivar a:** {}.\n",
+        resultado="\n**📈 Resultado observado en casos similares:** {}.\n",
+        similitud="\n**🔢 Nivel de similitud con el caso más cercano:** {:.1f}%\n",
+        cierre=f"\n> 🧩 {AVISO} 🩺\n",
+    ),
+}
+
+
+# ===== SECCIONES ESTÁTICAS (por caso) =====
+def _campos(caso) -> Tuple:
+    """Campos del caso de los que dependen las secciones estáticas (clave de la caché)."""
+    return (
+        getattr(caso, "riesgo", None),
+        tuple(getattr(caso, "estrategias", None) or ()),
+        getattr(caso, "recomendacion_general", None),
+        tuple(getattr(caso, "autoevaluaciones_sugeridas", None) or ()),
+        tuple(getattr(caso, "derivar_a", None) or ()),
+        getattr(caso, "resultado", None),
+    )
+
+
+@lru_cache(maxsize=TAM_CACHE_CASOS)
+def _bloque_estatico(formato: str, riesgo, estrategias, recomendacion, autoevaluaciones, derivar_a, resultado) -> str:
+    p = PLANTILLAS[formato]
+    partes = []
+    if riesgo and riesgo.lower() != "desconocido":
+        partes.append(p.riesgo.format(riesgo.upper()))
+    if estrategias:
+        partes.append(p.estrategias)
+        partes.extend(p.estrategia.format(i, e) for i, e in enumerate(estrategias, start=1))
+    if recomendacion:
+        partes.append(p.recomendacion.format(recomendacion))
+    if autoevaluaciones:
+        partes.append(p.autoevaluaciones)
+        partes.extend(p.autoevaluacion.format(t) for t in autoevaluaciones)
+    if derivar_a:
+        partes.append(p.derivar.format(", ".join(derivar_a)))
+    if resultado:
+        partes.append(p.resultado.format(resultado))
+    return "".join(partes)
+
+
+@lru_cache(maxsize=TAM_CACHE_CASOS)
+def _sintomas_caso(sintomas_normalizados: Tuple[str, ...]) -> frozenset:
+    return frozenset(sintomas_normalizados)
+
+
+def coincidencias(caso, sintomas_usuario: Iterable[str]) -> set:
+    """Síntomas normalizados del usuario que también tiene el caso."""
+    return set(normalizar_lista(sintomas_usuario)).intersection(_sintomas_caso(caso.sintomas_normalizados))
+
+
+# ===== RENDERIZADO =====
+def renderizar(
+    caso,
+    similitud: float,
+    sintomas_usuario: List[str],
+    formato: str = "texto",
+) -> Union[str, Dict]:
+    """
+    Explicación de `caso` para los síntomas del usuario en el formato pedido:
+    "texto" y "markdown" devuelven una cadena, "json" un diccionario.
+    """
+    if formato == "json":
+        return renderizar_json(caso, similitud, sintomas_usuario)
+    p = PLANTILLAS.get(formato)
+    if p is None:
+        raise ValueError(f"Formato de explicación desconocido: {formato} (use {', '.join(FORMATOS)})")
+
+    comunes = coincidencias(caso, sintomas_usuario)
+    causa = getattr(caso, "causa", None)
+    return "".join((
+        p.encabezado,
+        p.coincidencias.format(", ".join(comunes)) if comunes else p.sin_coincidencias,
+        p.causa.format(causa) if causa else "",
+        _bloque_estatico(formato, *_campos(caso)),
+        p.similitud.format(similitud * 100),
+        p.cierre,
+    ))
+
+
+def renderizar_json(caso, similitud: float, sintomas_usuario: List[str]) -> Dict:
+    riesgo, estrategias, recomendacion, autoevaluaciones, derivar_a, resultado = _campos(caso)
+    return {
+        "coincidencias": list(coincidencias(caso, sintomas_usuario)),
+        "posible_causa": getattr(caso, "posible_causa", None),
+        "riesgo": riesgo if riesgo and riesgo.lower() != "desconocido" else None,
+        "estrategias": list(estrategias),
+        "recomendacion_general": recomendacion or None,
+        "autoevaluaciones_sugeridas": list(autoevaluaciones),
+        "derivar_a": list(derivar_a),
+        "resultado": resultado or None,
+        "similitud": round(similitud, 4),
+        "aviso": AVISO,
+    }
+
+
+# ===== RESUMEN DE LA INTERFAZ =====
+@lru_cache(maxsize=TAM_CACHE_CASOS)
+def _resumen_estatico(posible_causa, estrategias, recomendacion, autoevaluaciones, riesgo) -> str:
+    return (
+        f"🩺 Posible causa: {posible_causa}\n"
+        f"💡 Estrategias sugeridas: {', '.join(estrategias) or 'No especificadas'}\n"
+        f"🧘 Recomendación general: {recomendacion}\n"
+        f"🧾 Autoevaluaciones sugeridas: {', '.join(autoevaluaciones) or 'No especificadas'}\n"
+        f"🔎 Nivel de riesgo: {riesgo}\n"
+    )
+
+
+def resumen_caso(caso, similitud: float) -> str:
+    """Bloque de resumen del caso que muestra la interfaz antes de la explicación."""
+    cabecera = _resumen_estatico(
+        getattr(caso, "posible_causa", "No especificada"),
+        tuple(getattr(caso, "estrategias", [])),
+        getattr(caso, "recomendacion_general", "Mantener rutinas saludables"),
+        tuple(getattr(caso, "autoevaluaciones_sugeridas", [])),
+        getattr(caso, "riesgo", "no definido"),
+    )
+    nivel_confianza = "alta" if similitud >= 0.7 else "moderada" if similitud >= 0.4 else "baja"
+    return f"{cabecera}📊 Nivel de confianza: {nivel_confianza}\n\n"
+
+
+def limpiar_cache():
+    """Vacía las secciones estáticas guardadas."""
+    _bloque_estatico.cache_clear()
+    _sintomas_caso.cache_clear()
+    _resumen_estatico.cache_clear()
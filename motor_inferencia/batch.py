@@ -0,0 +1,345 @@
+# motor_inferencia/batch.py
+"""
+Inferencia por lotes sin interfaz gráfica.
+
+Lee descripciones de síntomas en texto libre (JSONL o CSV), las pasa por
+procesar_sintomas_semi_libre → razonar → ModuloExplicacion y escribe un
+resultado JSONL por fila. Lee y escribe de forma incremental, así que la
+memoria no depende del tamaño del archivo.
+
+Con --procesos N > 1 las filas se reparten por bloques entre N procesos.
+Los índices se construyen una sola vez en el proceso principal y los hijos
+los heredan por fork (copy-on-write); donde no hay fork, cada hijo recibe la
+base serializada y construye sus índices al arrancar. Los resultados se
+escriben en el mismo orden que la entrada.
+
+Uso:
+    python -m motor_inferencia.batch entrada.jsonl -o resultados.jsonl
+    python -m motor_inferencia.batch pacientes.csv --campo descripcion -o -
+    python -m motor_inferencia.batch entrada.jsonl -o resultados.jsonl --procesos 32
+    python -m motor_inferencia.batch entrada.jsonl -o resultados.jsonl --modo bm25
+"""
+import argparse
+import contextlib
+import csv
+import gc
+import io
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, cargar_base
+from base_conocimiento.modelos import BaseDeCasos
+from modulo_explicacion.plantillas import FORMATOS
+from motor_inferencia.cache_consultas import CACHE_CONSULTAS
+from motor_inferencia.instrumentacion import configurar_log
+from motor_inferencia.procesamiento import precargar_indices, procesar_sintomas_semi_libre
+from motor_inferencia.razonador import MODOS_RECUPERACION, obtener_motor_modo, razonar
+
+CAMPO_TEXTO = "texto"
+CAMPO_ID = "id"
+TAM_BLOQUE = 64  # filas por tarea enviada a cada proceso
+
+
+# ===== LECTURA =====
+def _detectar_formato(ruta: str, formato: str) -> str:
+    if formato != "auto":
+        return formato
+    return "csv" if ruta.lower().endswith(".csv") else "jsonl"
+
+
+def leer_registros(archivo: TextIO, formato: str, campo: str = CAMPO_TEXTO) -> Iterator[Dict]:
+    """
+    Genera un registro {"id", "texto"} por fila, sin cargar el archivo completo.
+    En JSONL cada línea puede ser un objeto (con `campo`) o una cadena.
+    """
+    if formato == "csv":
+        for n, fila in enumerate(csv.DictReader(archivo), start=1):
+            yield {"id": fila.get(CAMPO_ID) or n, "texto": fila.get(campo) or ""}
+        return
+
+    for n, linea in enumerate(archivo, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            dato = json.loads(linea)
+        except ValueError as e:
+            yield {"id": n, "texto": "", "error": f"JSON inválido: {e}"}
+            continue
+        if isinstance(dato, dict):
+            yield {"id": dato.get(CAMPO_ID, n), "texto": dato.get(campo) or ""}
+        else:
+            yield {"id": n, "texto": str(dato)}
+
+
+# ===== INFERENCIA =====
+def inferir(
+    base: BaseDeCasos,
+    registro: Dict,
+    umbral: float = 0.6,
+    explicar: bool = True,
+    formato_explicacion: str = "texto",
+    modo: str = "jaccard",
+) -> Dict:
+    """
+    Procesa un registro y devuelve el resultado listo para serializar.
+    `formato_explicacion`: "texto", "markdown" o "json" (la explicación como objeto).
+    `modo`: recuperación de razonar (uno de MODOS_RECUPERACION).
+    """
+    resultado = {"id": registro["id"], "texto": registro["texto"]}
+    if "error" in registro:
+        resultado["error"] = registro["error"]
+        return resultado
+    try:
+        sintomas = sorted(procesar_sintomas_semi_libre(registro["texto"], base))
+        resultado["sintomas"] = sintomas
+        inferido = razonar(base, sintomas, umbral=umbral, modo=modo) if sintomas else None
+        if inferido is None:
+            resultado["caso"] = None
+            return resultado
+
+        caso, similitud, ambiguedad = inferido
+        resultado.update({
+            "caso": caso.id_caso,
+            "posible_causa": caso.posible_causa,
+            "riesgo": caso.riesgo,
+            "similitud": round(similitud, 4),
+            "ambiguedad": ambiguedad,
+        })
+        if explicar:
+            resultado["explicacion"] = CACHE_CONSULTAS.explicacion(
+                base, sintomas, caso, similitud, umbral, formato_explicacion, modo
+            )
+    except Exception as e:  # una fila problemática no detiene el lote
+        resultado["error"] = f"{type(e).__name__}: {e}"
+    return resultado
+
+
+# ===== PROCESOS EN PARALELO =====
+# Estado de cada proceso hijo, fijado por el inicializador del pool
+_BASE_TRABAJADOR: Optional[BaseDeCasos] = None
+_OPCIONES_TRABAJADOR: Dict = {}
+
+
+def _inicializar_trabajador(
+    base: Optional[BaseDeCasos], umbral: float, explicar: bool, formato_explicacion: str, modo: str,
+    silencioso: bool,
+):
+    global _BASE_TRABAJADOR, _OPCIONES_TRABAJADOR
+    # Los mensajes de diagnóstico nunca deben mezclarse con la salida de resultados
+    sys.stdout = open(os.devnull, "w", encoding="utf-8") if silencioso else sys.stderr
+    if silencioso:
+        configurar_log("OFF")
+    if base is not None:
+        # Sin fork (spawn): la base llega serializada y los índices se construyen aquí
+        _BASE_TRABAJADOR = base
+        precargar_indices(base)
+        obtener_motor_modo(base, modo).sincronizar()
+    _OPCIONES_TRABAJADOR = {
+        "umbral": umbral, "explicar": explicar, "formato_explicacion": formato_explicacion, "modo": modo,
+    }
+
+
+def _inferir_en_trabajador(registro: Dict) -> Dict:
+    return inferir(_BASE_TRABAJADOR, registro, **_OPCIONES_TRABAJADOR)
+
+
+def _resultados_en_paralelo(
+    base: BaseDeCasos,
+    registros: Iterable[Dict],
+    procesos: int,
+    umbral: float,
+    explicar: bool,
+    formato_explicacion: str,
+    modo: str,
+    silencioso: bool,
+    tam_bloque: int = TAM_BLOQUE,
+) -> Iterator[Dict]:
+    """Reparte los registros entre `procesos` hijos y devuelve los resultados en orden."""
+    global _BASE_TRABAJADOR
+    metodos = multiprocessing.get_all_start_methods()
+    usar_fork = "fork" in metodos
+    contexto = multiprocessing.get_context("fork" if usar_fork else "spawn")
+
+    if usar_fork:
+        # Los hijos heredan la base y los índices ya construidos; gc.freeze evita
+        # que el recolector toque (y copie) esas páginas en cada hijo. Antes se
+        # recoge la basura para no congelar también objetos ya inalcanzables
+        _BASE_TRABAJADOR = base
+        gc.collect()
+        gc.freeze()
+        base_a_enviar = None
+    else:
+        base_a_enviar = base
+
+    # Un único imap alimentado de forma perezosa: como mucho `en_vuelo` filas
+    # leídas y aún sin consumir (cada resultado consumido libera un cupo), así
+    # la memoria no crece con la entrada y los procesos no esperan entre tandas.
+    # Debe ser ≥ tam_bloque para que imap siempre pueda completar el bloque pendiente.
+    en_vuelo = procesos * tam_bloque * 4
+    cupos = threading.Semaphore(en_vuelo)
+    detener = threading.Event()
+
+    def alimentar() -> Iterator[Dict]:
+        # Corre en el hilo de tareas del pool; si el consumidor se detiene, deja de esperar cupo
+        for registro in registros:
+            while not cupos.acquire(timeout=0.1):
+                if detener.is_set():
+                    return
+            yield registro
+
+    try:
+        with contexto.Pool(
+            procesos,
+            initializer=_inicializar_trabajador,
+            initargs=(base_a_enviar, umbral, explicar, formato_explicacion, modo, silencioso),
+        ) as pool:
+            try:
+                for resultado in pool.imap(_inferir_en_trabajador, alimentar(), chunksize=tam_bloque):
+                    cupos.release()
+                    yield resultado
+            finally:
+                detener.set()
+    finally:
+        if usar_fork:
+            gc.unfreeze()
+
+
+# ===== EJECUCIÓN =====
+def _abrir(ruta: str, modo: str):
+    if ruta == "-":
+        flujo = sys.stdin if "r" in modo else sys.stdout
+        return contextlib.nullcontext(flujo)
+    return open(ruta, modo, encoding="utf-8", newline="" if "r" in modo else None)
+
+
+def ejecutar(
+    entrada: str,
+    salida: str = "-",
+    formato: str = "auto",
+    campo: str = CAMPO_TEXTO,
+    umbral: float = 0.6,
+    explicar: bool = True,
+    silencioso: bool = False,
+    formato_explicacion: str = "texto",
+    modo: str = "jaccard",
+    ruta_casos: str = RUTA_ARCHIVO,
+    base: Optional[BaseDeCasos] = None,
+    procesos: int = 1,
+    tam_bloque: int = TAM_BLOQUE,
+) -> Dict[str, float]:
+    """
+    Ejecuta el lote completo y devuelve estadísticas (filas, errores, segundos, filas/s).
+    Los mensajes de diagnóstico del motor van a stderr (o se descartan con `silencioso`)
+    para que la salida estándar contenga solo resultados.
+    """
+    destino_logs = io.StringIO() if silencioso else sys.stderr
+    filas = errores = 0
+
+    with contextlib.redirect_stdout(destino_logs):
+        if base is None:
+            base = cargar_base(ruta_casos)
+        if procesos > 1:
+            precargar_indices(base)
+            obtener_motor_modo(base, modo).sincronizar()
+    inicio = time.perf_counter()
+
+    with _abrir(entrada, "r") as f_entrada, _abrir(salida, "w") as f_salida:
+        registros = leer_registros(f_entrada, _detectar_formato(entrada, formato), campo)
+        if procesos > 1:
+            resultados = _resultados_en_paralelo(
+                base, registros, procesos, umbral, explicar, formato_explicacion, modo, silencioso, tam_bloque
+            )
+        else:
+            resultados = (
+                _inferir_redirigido(base, r, umbral, explicar, formato_explicacion, modo, destino_logs)
+                for r in registros
+            )
+
+        for resultado in resultados:
+            f_salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+            filas += 1
+            errores += "error" in resultado
+        f_salida.flush()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "filas": filas,
+        "errores": errores,
+        "segundos": segundos,
+        "filas_por_segundo": filas / segundos if segundos > 0 else 0.0,
+    }
+
+
+def _inferir_redirigido(
+    base: BaseDeCasos, registro: Dict, umbral: float, explicar: bool, formato_explicacion: str, modo: str,
+    destino_logs,
+) -> Dict:
+    """Inferencia en el propio proceso, desviando los mensajes de diagnóstico."""
+    with contextlib.redirect_stdout(destino_logs):
+        resultado = inferir(base, registro, umbral, explicar, formato_explicacion, modo)
+    if isinstance(destino_logs, io.StringIO):
+        destino_logs.seek(0)
+        destino_logs.truncate()
+    return resultado
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m motor_inferencia.batch",
+        description="Inferencia por lotes de descripciones de síntomas (JSONL/CSV → JSONL)."
+    )
+    parser.add_argument("entrada", help="Archivo JSONL o CSV de entrada ('-' para stdin)")
+    parser.add_argument("-o", "--salida", default="-", help="Archivo JSONL de salida ('-' para stdout)")
+    parser.add_argument("--formato", choices=["auto", "jsonl", "csv"], default="auto",
+                        help="Formato de entrada (por defecto según la extensión)")
+    parser.add_argument("--campo", default=CAMPO_TEXTO, help="Campo/columna con el texto del paciente")
+    parser.add_argument("--umbral", type=float, default=0.6, help="Umbral de similitud de razonar")
+    parser.add_argument("--casos", default=RUTA_ARCHIVO, help="Ruta de la base de casos (JSON, o SQLite si termina en .db)")
+    parser.add_argument("--modo", choices=MODOS_RECUPERACION, default="jaccard",
+                        help="Recuperación de casos: jaccard (por defecto), tfidf, bm25 o lsh (aproximada)")
+    parser.add_argument("--sin-explicacion", action="store_true", help="No generar el texto explicativo")
+    parser.add_argument("--formato-explicacion", choices=FORMATOS, default="texto",
+                        help="Formato de la explicación: texto, markdown o json (objeto anidado)")
+    parser.add_argument("-q", "--silencioso", action="store_true", help="Descartar los mensajes de diagnóstico")
+    parser.add_argument("-p", "--procesos", type=int, default=1,
+                        help="Procesos en paralelo (0 = todos los núcleos; por defecto 1)")
+    parser.add_argument("--tam-bloque", type=int, default=TAM_BLOQUE, help="Filas por tarea de cada proceso")
+    args = parser.parse_args(argv)
+
+    if args.entrada != "-" and not os.path.exists(args.entrada):
+        parser.error(f"No se encontró el archivo: {args.entrada}")
+    procesos = args.procesos if args.procesos > 0 else (os.cpu_count() or 1)
+    if args.silencioso:
+        # Sin destinatario, los mensajes por fragmento ni siquiera se formatean
+        configurar_log("OFF")
+
+    stats = ejecutar(
+        args.entrada,
+        salida=args.salida,
+        formato=args.formato,
+        campo=args.campo,
+        umbral=args.umbral,
+        explicar=not args.sin_explicacion,
+        formato_explicacion=args.formato_explicacion,
+        modo=args.modo,
+        silencioso=args.silencioso,
+        ruta_casos=args.casos,
+        procesos=procesos,
+        tam_bloque=max(1, args.tam_bloque),
+    )
+    print(
+        f"✅ {stats['filas']} filas procesadas ({stats['errores']} con error) "
+        f"en {stats['segundos']:.2f} s → {stats['filas_por_segundo']:.1f} filas/s",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
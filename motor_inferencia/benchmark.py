@@ -0,0 +1,336 @@
+# motor_inferencia/benchmark.py
+"""
+Banco de pruebas de rendimiento del pipeline semántico y de razonamiento.
+
+Genera un corpus reproducible de frases de paciente a partir de las claves de
+sinónimos (exactas, con errores de tipeo, con ruido y combinadas), escala la
+base de casos (1×, 10×, 100× de casos.json) y mide, por etapa:
+
+    normalizar_sinonimos, buscar_sinonimo_difuso, buscar_equivalente_semantico,
+    procesar_sintomas, similitud_jaccard, recuperar_caso, razonar, cargar_base
+
+con percentiles de latencia, rendimiento (operaciones/s) y memoria pico
+(tracemalloc). También mide el arranque en un proceso nuevo, con y sin la
+instantánea compilada. Las cachés de similitudes y de consultas se vacían antes
+de cada etapa.
+
+Los resultados se guardan en JSON para comparar entre commits:
+    python -m motor_inferencia.benchmark -o base.json
+    python -m motor_inferencia.benchmark --comparar base.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence
+
+from base_conocimiento.almacenamiento import cargar_base
+from base_conocimiento.modelos import BaseDeCasos, Caso
+from motor_inferencia.cache_consultas import CACHE_CONSULTAS
+from motor_inferencia.cache_similitud import CACHE_SIMILITUD
+from motor_inferencia.procesamiento import precargar_indices, procesar_sintomas_semi_libre
+from motor_inferencia.razonador import razonar, recuperar_caso, similitud_jaccard
+from motor_inferencia.semantic_helper import (
+    buscar_equivalente_semantico,
+    buscar_sinonimo_difuso,
+    cargar_sinonimos,
+    normalizar_sinonimos,
+    obtener_indice_difuso,
+    preprocesar_texto,
+)
+
+_DIRECTORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESCALAS = (1, 10, 100)
+PERCENTILES = (50, 90, 99)
+UMBRAL_REGRESION = 1.25  # p50 actual / p50 de referencia a partir del cual se marca regresión
+
+_RELLENOS = ["a veces", "últimamente", "creo que", "desde hace semanas", "mucho", "casi siempre", "no sé"]
+_CONECTORES = [", ", " y ", "; ", ". "]
+_LETRAS = "abcdefghijklmnopqrstuvwxyzáéíóúñ"
+
+
+# ===== CORPUS =====
+def _con_error(frase: str, rng: random.Random) -> str:
+    """Introduce un error de tipeo: borrar, insertar, sustituir o trasponer un carácter."""
+    if len(frase) < 3:
+        return frase
+    i = rng.randrange(len(frase) - 1)
+    tipo = rng.randrange(4)
+    if tipo == 0:
+        return frase[:i] + frase[i + 1:]
+    if tipo == 1:
+        return frase[:i] + rng.choice(_LETRAS) + frase[i:]
+    if tipo == 2:
+        return frase[:i] + rng.choice(_LETRAS) + frase[i + 1:]
+    return frase[:i] + frase[i + 1] + frase[i] + frase[i + 2:]
+
+
+def generar_corpus(n: int, semilla: int = 42, claves: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Genera `n` frases de paciente reproducibles: claves de sinónimos exactas,
+    con errores de tipeo, con palabras de relleno y combinaciones de 2-3 claves.
+    """
+    rng = random.Random(semilla)
+    claves = sorted(claves if claves is not None else cargar_sinonimos())
+    frases = []
+    for _ in range(n):
+        tipo = rng.random()
+        if tipo < 0.25:
+            frase = rng.choice(claves)
+        elif tipo < 0.5:
+            frase = _con_error(rng.choice(claves), rng)
+        elif tipo < 0.7:
+            frase = f"{rng.choice(_RELLENOS)} {rng.choice(claves)} {rng.choice(_RELLENOS)}"
+        else:
+            partes = [rng.choice(claves) for _ in range(rng.randint(2, 3))]
+            partes = [_con_error(p, rng) if rng.random() < 0.3 else p for p in partes]
+            frase = partes[0]
+            for parte in partes[1:]:
+                frase += rng.choice(_CONECTORES) + parte
+        frases.append(frase)
+    return frases
+
+
+def escalar_base(base: BaseDeCasos, factor: int, semilla: int = 42) -> BaseDeCasos:
+    """
+    Base con `factor` copias de los casos (ids nuevos). En las copias se omite al
+    azar algún síntoma para que no todas sean idénticas a su original.
+    """
+    rng = random.Random(semilla)
+    escalada = BaseDeCasos()
+    casos = []
+    desplazamiento = max((c.id_caso for c in base.casos if isinstance(c.id_caso, int)), default=0)
+    for copia in range(factor):
+        for caso in base.casos:
+            datos = caso.to_dict()
+            if copia and len(datos["sintomas"]) > 1 and rng.random() < 0.5:
+                datos["sintomas"].pop(rng.randrange(len(datos["sintomas"])))
+            if isinstance(datos["id_caso"], int):
+                datos["id_caso"] += copia * desplazamiento
+            casos.append(Caso.from_dict(datos))
+    escalada.agregar_casos(casos)
+    return escalada
+
+
+# ===== MEDICIÓN =====
+def resumir(tiempos_ns: List[int]) -> Dict[str, float]:
+    """Percentiles, media, máximo (ms) y operaciones por segundo de una lista de tiempos."""
+    ordenados = sorted(tiempos_ns)
+    n = len(ordenados)
+    resumen = {"n": n}
+    for p in PERCENTILES:
+        resumen[f"p{p}_ms"] = ordenados[min(n - 1, int(n * p / 100))] / 1e6
+    total = sum(ordenados)
+    resumen["media_ms"] = total / n / 1e6
+    resumen["max_ms"] = ordenados[-1] / 1e6
+    resumen["ops_por_s"] = n / (total / 1e9) if total else 0.0
+    return resumen
+
+
+def medir(funcion: Callable, argumentos: Sequence[tuple], muestras_memoria: int = 20) -> Dict[str, float]:
+    """
+    Mide `funcion(*args)` para cada tupla de `argumentos`: primero los tiempos
+    (sin tracemalloc, que los distorsiona) y luego la memoria pico con una muestra.
+    """
+    CACHE_SIMILITUD.limpiar()
+    CACHE_CONSULTAS.limpiar()
+    tiempos = []
+    with contextlib.redirect_stdout(open(os.devnull, "w", encoding="utf-8")) as nulo:
+        for args in argumentos:
+            inicio = time.perf_counter_ns()
+            funcion(*args)
+            tiempos.append(time.perf_counter_ns() - inicio)
+
+        CACHE_SIMILITUD.limpiar()
+        CACHE_CONSULTAS.limpiar()
+        tracemalloc.start()
+        try:
+            base_memoria = tracemalloc.get_traced_memory()[0]
+            for args in argumentos[:muestras_memoria]:
+                funcion(*args)
+            pico = tracemalloc.get_traced_memory()[1] - base_memoria
+        finally:
+            tracemalloc.stop()
+        nulo.close()
+
+    resumen = resumir(tiempos)
+    resumen["memoria_pico_kb"] = pico / 1024
+    return resumen
+
+
+def medir_arranque(repeticiones: int = 3) -> Dict[str, Dict[str, float]]:
+    """Arranque en frío en un proceso nuevo: importar, cargar la base y construir los índices."""
+    codigo = (
+        "import time, io, contextlib, json\n"
+        "t = time.perf_counter()\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    from base_conocimiento.almacenamiento import cargar_base\n"
+        "    from motor_inferencia.procesamiento import precargar_indices\n"
+        "    precargar_indices(cargar_base(usar_instantanea={instantanea}))\n"
+        "print(json.dumps(time.perf_counter() - t))\n"
+    )
+    entorno = dict(os.environ, PYTHONPATH=_DIRECTORIO_RAIZ)
+    resultados = {}
+    for nombre, instantanea in (("instantanea", True), ("json", False)):
+        tiempos = []
+        for _ in range(repeticiones):
+            salida = subprocess.run(
+                [sys.executable, "-c", codigo.format(instantanea=instantanea)],
+                capture_output=True, text=True, cwd=_DIRECTORIO_RAIZ, env=entorno, check=True
+            ).stdout
+            tiempos.append(int(json.loads(salida.strip().splitlines()[-1]) * 1e9))
+        resultados[nombre] = resumir(tiempos)
+    return resultados
+
+
+def ejecutar(n_frases: int = 200, escalas: Sequence[int] = ESCALAS, semilla: int = 42, arranque: bool = True) -> Dict:
+    """Ejecuta el banco completo y devuelve los resultados (listos para guardar en JSON)."""
+    with contextlib.redirect_stdout(open(os.devnull, "w", encoding="utf-8")) as nulo:
+        base_original = cargar_base(usar_instantanea=False)
+        corpus = generar_corpus(n_frases, semilla)
+        indice_difuso = obtener_indice_difuso()
+        nulo.close()
+
+    resultados = {
+        "meta": {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "semilla": semilla,
+            "frases": n_frases,
+            "casos_base": len(base_original.casos),
+        },
+        "escalas": {},
+    }
+
+    preprocesadas = [(preprocesar_texto(f),) for f in corpus]
+    for factor in escalas:
+        base = escalar_base(base_original, factor, semilla)
+        with contextlib.redirect_stdout(open(os.devnull, "w", encoding="utf-8")) as nulo:
+            precargar_indices(base)
+            sintomas = [procesar_sintomas_semi_libre(f, base) for f in corpus]
+            nulo.close()
+        consultas = [(base, s) for s in sintomas if s]
+        rng = random.Random(semilla)
+        pares = [(s, rng.choice(base.casos).sintomas) for s in sintomas if s]
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "casos.json")
+            with open(ruta, "w", encoding="utf-8") as f:
+                json.dump([c.to_dict() for c in base.casos], f, ensure_ascii=False)
+            etapas = {
+                "normalizar_sinonimos": (normalizar_sinonimos, preprocesadas),
+                "buscar_sinonimo_difuso": (
+                    lambda f: buscar_sinonimo_difuso(f, indice_difuso, 0.65), preprocesadas
+                ),
+                "buscar_equivalente_semantico": (
+                    lambda f: buscar_equivalente_semantico(f, base=base), preprocesadas
+                ),
+                "procesar_sintomas": (lambda f: procesar_sintomas_semi_libre(f, base), [(f,) for f in corpus]),
+                "similitud_jaccard": (similitud_jaccard, pares),
+                "recuperar_caso": (recuperar_caso, consultas),
+                "razonar": (razonar, consultas),
+                "cargar_base": (
+                    lambda: cargar_base(ruta, usar_instantanea=False, usar_diario=False), [()] * 5
+                ),
+            }
+            resultados["escalas"][str(factor)] = {
+                "casos": len(base.casos),
+                "etapas": {nombre: medir(funcion, args) for nombre, (funcion, args) in etapas.items()},
+            }
+
+    if arranque:
+        resultados["arranque"] = medir_arranque()
+    return resultados
+
+
+def _commit_actual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=_DIRECTORIO_RAIZ, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ===== INFORMES =====
+def imprimir(resultados: Dict, archivo=sys.stdout):
+    for factor, escala in resultados["escalas"].items():
+        print(f"\n📊 Escala {factor}× ({escala['casos']} casos)", file=archivo)
+        print(f"   {'etapa':<30}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'ops/s':>12}{'mem KB':>10}", file=archivo)
+        for nombre, r in escala["etapas"].items():
+            print(
+                f"   {nombre:<30}{r['p50_ms']:>10.3f}{r['p90_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+                f"{r['ops_por_s']:>12.1f}{r['memoria_pico_kb']:>10.1f}",
+                file=archivo
+            )
+    for nombre, r in resultados.get("arranque", {}).items():
+        print(f"🚀 Arranque ({nombre}): p50 {r['p50_ms']:.1f} ms", file=archivo)
+
+
+def comparar(actual: Dict, referencia: Dict, umbral: float = UMBRAL_REGRESION, archivo=sys.stdout) -> int:
+    """Compara los p50 con una ejecución guardada. Devuelve el número de regresiones."""
+    regresiones = 0
+    print(f"\n🔁 Comparación con {referencia['meta'].get('commit') or 'referencia'} (p50 actual / referencia)",
+          file=archivo)
+    filas = []
+    for factor, escala in actual["escalas"].items():
+        previas = referencia.get("escalas", {}).get(factor, {}).get("etapas", {})
+        for nombre, r in escala["etapas"].items():
+            if nombre in previas:
+                filas.append((f"{factor}× {nombre}", r["p50_ms"], previas[nombre]["p50_ms"]))
+    for nombre, r in actual.get("arranque", {}).items():
+        if nombre in referencia.get("arranque", {}):
+            filas.append((f"arranque {nombre}", r["p50_ms"], referencia["arranque"][nombre]["p50_ms"]))
+
+    for nombre, ahora, antes in filas:
+        razon = ahora / antes if antes else float("inf")
+        marca = "⚠️ regresión" if razon >= umbral else ""
+        regresiones += razon >= umbral
+        print(f"   {nombre:<42}{antes:>10.3f} → {ahora:>10.3f} ms  ×{razon:.2f} {marca}", file=archivo)
+    return regresiones
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m motor_inferencia.benchmark",
+        description="Mide latencias, rendimiento y memoria del pipeline semántico y de razonamiento."
+    )
+    parser.add_argument("-n", "--frases", type=int, default=200, help="Frases del corpus sintético")
+    parser.add_argument("--escalas", default=",".join(map(str, ESCALAS)),
+                        help="Factores de escala de la base de casos (p. ej. 1,10,100)")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla del corpus y del escalado")
+    parser.add_argument("--sin-arranque", action="store_true", help="No medir el arranque en un proceso nuevo")
+    parser.add_argument("-o", "--salida", help="Guardar los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior con el que comparar")
+    parser.add_argument("--umbral", type=float, default=UMBRAL_REGRESION,
+                        help="Razón de p50 a partir de la que se considera regresión")
+    args = parser.parse_args(argv)
+
+    escalas = [int(e) for e in args.escalas.split(",") if e.strip()]
+    resultados = ejecutar(args.frases, escalas, args.semilla, arranque=not args.sin_arranque)
+    imprimir(resultados)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            referencia = json.load(f)
+        if comparar(resultados, referencia, args.umbral):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
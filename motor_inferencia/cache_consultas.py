@@ -0,0 +1,159 @@
+# motor_inferencia/cache_consultas.py
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from base_conocimiento.modelos import BaseDeCasos, Caso
+from modulo_explicacion.explicacion import ModuloExplicacion
+from motor_inferencia.instrumentacion import METRICAS
+from motor_inferencia.representacion import normalizar_lista
+
+CAPACIDAD_POR_DEFECTO = 4096
+
+_Clave = Tuple[Tuple[str, ...], float, str]
+
+
+class EntradaConsulta:
+    """Resultado de razonar para una consulta y, cuando se piden, sus explicaciones ya generadas (por formato)."""
+
+    __slots__ = ("resultado", "explicaciones")
+
+    def __init__(self, resultado):
+        self.resultado = resultado
+        self.explicaciones: Dict[str, Union[str, Dict]] = {}
+
+
+class CacheConsultas:
+    """
+    Caché LRU acotada de consultas: (síntomas canónicos ordenados, umbral, modo) →
+    resultado de razonar + texto de la explicación.
+
+    Hay una tabla por BaseDeCasos que se vacía sola cuando cambia `base.version`
+    (al agregar o actualizar casos), así que nunca devuelve resultados obsoletos.
+    Cuenta aciertos, fallos e invalidaciones.
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_POR_DEFECTO):
+        self.capacidad = capacidad
+        # base → (versión, entradas)
+        self._tablas: "weakref.WeakKeyDictionary[BaseDeCasos, Tuple[int, OrderedDict]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.explicaciones_reutilizadas = 0
+
+    @staticmethod
+    def clave(sintomas_usuario: List[str], umbral: float, modo: str = "jaccard") -> _Clave:
+        # Ordenada pero sin quitar repetidos: razonar distingue una consulta de un solo síntoma
+        return tuple(sorted(normalizar_lista(sintomas_usuario))), umbral, modo
+
+    def _entradas(self, base: BaseDeCasos) -> "OrderedDict[_Clave, EntradaConsulta]":
+        tabla = self._tablas.get(base)
+        if tabla is None or tabla[0] != base.version:
+            if tabla is not None and tabla[1]:
+                self.invalidaciones += 1
+            tabla = (base.version, OrderedDict())
+            self._tablas[base] = tabla
+        return tabla[1]
+
+    def obtener(
+        self, base: BaseDeCasos, sintomas_usuario: List[str], umbral: float, modo: str = "jaccard"
+    ) -> Optional[EntradaConsulta]:
+        clave = self.clave(sintomas_usuario, umbral, modo)
+        with self._lock:
+            entradas = self._entradas(base)
+            entrada = entradas.get(clave)
+            if entrada is not None:
+                entradas.move_to_end(clave)
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+        METRICAS.acierto("cache.consultas", entrada is not None)
+        return entrada
+
+    def guardar(
+        self,
+        base: BaseDeCasos,
+        sintomas_usuario: List[str],
+        umbral: float,
+        resultado,
+        version: Optional[int] = None,
+        modo: str = "jaccard",
+    ) -> EntradaConsulta:
+        """
+        Guarda el resultado de razonar. Si se indica la `version` de la base con la
+        que se calculó y la base cambió entretanto, no se guarda (estaría obsoleto).
+        """
+        clave = self.clave(sintomas_usuario, umbral, modo)
+        entrada = EntradaConsulta(resultado)
+        with self._lock:
+            if version is not None and version != base.version:
+                return entrada
+            entradas = self._entradas(base)
+            entradas[clave] = entrada
+            entradas.move_to_end(clave)
+            if len(entradas) > self.capacidad:
+                entradas.popitem(last=False)
+        return entrada
+
+    def explicacion(
+        self,
+        base: BaseDeCasos,
+        sintomas_usuario: List[str],
+        caso: Caso,
+        similitud: float,
+        umbral: float = 0.6,
+        formato: str = "texto",
+        modo: str = "jaccard",
+    ) -> Union[str, Dict]:
+        """
+        Explicación de `caso` para la consulta en el `formato` indicado. Si es el
+        mismo caso y similitud que razonar (con ese modo) dejó en la caché, se genera una sola vez
+        (en formato "json" el diccionario devuelto es compartido: no modificarlo).
+        """
+        clave = self.clave(sintomas_usuario, umbral, modo)
+        with self._lock:
+            entrada = self._entradas(base).get(clave)
+        reutilizable = (
+            entrada is not None and entrada.resultado is not None
+            and entrada.resultado[0] is caso and entrada.resultado[1] == similitud
+        )
+        if reutilizable and formato in entrada.explicaciones:
+            with self._lock:
+                self.explicaciones_reutilizadas += 1
+            return entrada.explicaciones[formato]
+
+        explicacion = ModuloExplicacion(caso, similitud).generar_explicacion(sintomas_usuario, formato)
+        if reutilizable:
+            entrada.explicaciones[formato] = explicacion
+        return explicacion
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Entradas, aciertos, fallos, tasa de aciertos, invalidaciones y explicaciones reutilizadas."""
+        with self._lock:
+            entradas = sum(len(tabla[1]) for tabla in self._tablas.values())
+        total = self.aciertos + self.fallos
+        return {
+            "entradas": entradas,
+            "capacidad": self.capacidad,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+            "invalidaciones": self.invalidaciones,
+            "explicaciones_reutilizadas": self.explicaciones_reutilizadas,
+        }
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._tablas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+            self.invalidaciones = 0
+            self.explicaciones_reutilizadas = 0
+
+
+# Caché compartida por todo el proceso
+CACHE_CONSULTAS = CacheConsultas()
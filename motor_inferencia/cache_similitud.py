@@ -0,0 +1,142 @@
+# motor_inferencia/cache_similitud.py
+import json
+import os
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Dict, Tuple
+
+CAPACIDAD_POR_DEFECTO = 100_000
+VERSION_FORMATO = 2
+RUTA_CACHE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "base_conocimiento", "cache_similitud.json")
+
+
+class CacheSimilitud:
+    """
+    Caché LRU acotada de SequenceMatcher(None, a, b).ratio().
+    La clave es el par ordenado (a, b) porque el ratio no es simétrico.
+    Cuenta aciertos y fallos, y puede guardarse en disco para arrancar en caliente.
+
+    Solo debe recibir pares de síntomas del vocabulario de la base: el texto
+    libre del paciente no se repite entre consultas (no se aprovecharía) y no
+    debe acabar escrito en disco. Para ese texto use `supera_umbral`.
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_POR_DEFECTO):
+        self.capacidad = capacidad
+        self._datos: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def ratio(self, a: str, b: str) -> float:
+        """Devuelve el ratio de similitud entre `a` y `b`, calculándolo solo la primera vez."""
+        clave = (a, b)
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return valor
+            self.fallos += 1
+
+        valor = SequenceMatcher(None, a, b).ratio()
+
+        with self._lock:
+            self._datos[clave] = valor
+            if len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+        return valor
+
+    def supera(self, a: str, b: str, umbral: float) -> bool:
+        """
+        ratio(a, b) >= umbral. Si el par no está guardado, quick_ratio() descarta
+        antes de alinear los pares que no pueden llegar al umbral (esos no se guardan).
+        """
+        clave = (a, b)
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return valor >= umbral
+            self.fallos += 1
+
+        matcher = SequenceMatcher(None, a, b)
+        if matcher.quick_ratio() < umbral:
+            return False
+        valor = matcher.ratio()
+
+        with self._lock:
+            self._datos[clave] = valor
+            if len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+        return valor >= umbral
+
+    def estadisticas(self) -> Dict[str, float]:
+        """Tamaño, aciertos, fallos y tasa de aciertos de la caché."""
+        total = self.aciertos + self.fallos
+        return {
+            "entradas": len(self._datos),
+            "capacidad": self.capacidad,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / total if total else 0.0,
+        }
+
+    def limpiar(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._datos.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    # ------------------------------------------------------
+    # Persistencia en JSON
+    # ------------------------------------------------------
+    def guardar(self, ruta: str = RUTA_CACHE):
+        """Guarda las entradas (de la menos a la más usada) en un JSON, de forma atómica."""
+        with self._lock:
+            data = {"version": VERSION_FORMATO, "pares": [[a, b, r] for (a, b), r in self._datos.items()]}
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def cargar(self, ruta: str = RUTA_CACHE) -> int:
+        """
+        Carga entradas guardadas previamente. Devuelve cuántas se cargaron.
+        Los archivos de versiones anteriores (que podían incluir texto libre
+        del paciente) se ignoran y se sobrescriben en el siguiente `guardar`.
+        """
+        if not os.path.exists(ruta):
+            return 0
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo leer la caché de similitud {ruta}: {e}")
+            return 0
+        if not isinstance(data, dict) or data.get("version") != VERSION_FORMATO:
+            print(f"⚠️ Caché de similitud {ruta} con formato anterior: se descarta.")
+            return 0
+        data = data.get("pares", [])
+        with self._lock:
+            for a, b, r in data[-self.capacidad:]:
+                self._datos[(a, b)] = r
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+        return len(data)
+
+
+# Caché compartida por todo el proceso
+CACHE_SIMILITUD = CacheSimilitud()
+
+
+def supera_umbral(a: str, b: str, umbral: float) -> bool:
+    """SequenceMatcher(None, a, b).ratio() >= umbral sin memoizar, con el filtro quick_ratio() delante."""
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.quick_ratio() >= umbral and matcher.ratio() >= umbral
@@ -0,0 +1,433 @@
+# motor_inferencia/indice_sinonimos.py
+import bisect
+import math
+from array import array
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+
+class IndiceCanonico:
+    """
+    Índice invertido para canonicalizar frases con una tabla de sinónimos.
+
+    Reproduce exactamente la regla de `normalizar_sinonimos`: una clave coincide
+    si TODAS sus palabras aparecen como subcadena de la frase, y gana la primera
+    clave (en el orden de la tabla) que cumpla. En lugar de recorrer todas las
+    claves, se buscan en la frase solo las palabras del vocabulario de claves y
+    cada clave se indexa por su palabra menos frecuente (ancla), de modo que
+    solo se verifican las claves cuya ancla aparece en la frase.
+    """
+
+    def __init__(self, sinonimos: Mapping[str, str]):
+        self._canonicos: List[str] = list(sinonimos.values())
+        # Solo se guardan las claves: las palabras se separan al verificar cada
+        # candidata, lo que mantiene el índice pequeño al serializarlo
+        self._claves: List[str] = list(sinonimos)
+        palabras_por_clave = [set(clave.split()) for clave in self._claves]
+
+        frecuencia = Counter(p for palabras in palabras_por_clave for p in palabras)
+        self._vocabulario: Set[str] = set(frecuencia)
+        self._longitudes: List[int] = sorted({len(p) for p in self._vocabulario})
+
+        # ancla → posiciones de las claves (en orden creciente)
+        self._por_ancla: Dict[str, List[int]] = {}
+        # Una clave sin palabras coincide con cualquier frase (all([]) es True)
+        self._primera_vacia: Optional[int] = None
+        for pos, palabras in enumerate(palabras_por_clave):
+            if not palabras:
+                if self._primera_vacia is None:
+                    self._primera_vacia = pos
+                continue
+            ancla = min(palabras, key=lambda p: (frecuencia[p], -len(p), p))
+            self._por_ancla.setdefault(ancla, []).append(pos)
+
+    def __len__(self) -> int:
+        return len(self._canonicos)
+
+    def palabras_presentes(self, frase: str) -> Set[str]:
+        """Devuelve las palabras del vocabulario que aparecen como subcadena de `frase`."""
+        vocabulario = self._vocabulario
+        n = len(frase)
+        presentes = set()
+        for longitud in self._longitudes:
+            if longitud > n:
+                break
+            for i in range(n - longitud + 1):
+                trozo = frase[i:i + longitud]
+                if trozo in vocabulario:
+                    presentes.add(trozo)
+        return presentes
+
+    def posicion(self, frase: str) -> Optional[int]:
+        """Posición de la primera clave que coincide con `frase` (ya preprocesada), o None."""
+        mejor = self._primera_vacia
+        presentes = self.palabras_presentes(frase)
+        for ancla in presentes:
+            for pos in self._por_ancla.get(ancla, ()):
+                if mejor is not None and pos >= mejor:
+                    break
+                if all(p in presentes for p in self._claves[pos].split()):
+                    mejor = pos
+                    break
+        return mejor
+
+    def buscar(self, frase: str) -> Optional[str]:
+        """Devuelve el síntoma canónico de la primera clave que coincide, o None."""
+        pos = self.posicion(frase)
+        return self._canonicos[pos] if pos is not None else None
+
+
+# Cotas (de mayor a menor) a las que se buscan candidatas antes de bajar al umbral
+NIVELES_COTA = (0.95, 0.9, 0.85, 0.8, 0.75, 0.7, 0.65, 0.6)
+
+
+class IndiceDifuso:
+    """
+    Búsqueda difusa de la clave más parecida a una frase (ratio de SequenceMatcher).
+
+    Devuelve exactamente el mismo resultado que recorrer todas las claves, pero
+    solo calcula `ratio()` sobre una lista corta:
+      1. Filtro de recuento de caracteres (q-gramas de tamaño 1): los caracteres
+         coincidentes de SequenceMatcher nunca superan Σ min(apariciones en la
+         clave, apariciones en la frase). Para cada carácter c y cada j se guarda
+         el conjunto de claves con al menos j apariciones de c como un entero de
+         bits, y el recuento de todas las claves a la vez se suma en planos de
+         bits (un sumador con enteros grandes), sin recorrer las claves en Python.
+      2. Poda por longitud: 2·min(la, lb) / (la + lb) acota el ratio; las claves
+         se numeran por longitud, así que cada longitud es un tramo de bits.
+      3. Poda por LCS: de las candidatas que quedan, la subsecuencia común más
+         larga (Hyyrö, en paralelo de bits) vuelve a acotar el ratio.
+    Las candidatas se buscan por niveles de cota (NIVELES_COTA y al final el
+    umbral): si la mejor similitud ya alcanza el nivel, ninguna clave por debajo
+    de él puede superarla ni empatarla y la búsqueda termina.
+
+    Los conjuntos son enteros y arrays, así que el índice se serializa y se
+    recupera de una instantánea casi sin coste.
+    """
+
+    def __init__(self, claves: Sequence[str]):
+        self.claves: List[str] = list(claves)
+        n = len(self.claves)
+
+        # Número interno: claves ordenadas por longitud (y por posición)
+        orden = sorted(range(n), key=lambda pos: (len(self.claves[pos]), pos))
+        self._orden = array("I", orden)
+        self._tramos: Dict[int, Tuple[int, int]] = {}
+        # carácter → [números internos de las claves con ≥ 1 aparición, con ≥ 2, ...]
+        por_caracter: Dict[str, List[List[int]]] = {}
+        for interno, pos in enumerate(orden):
+            clave = self.claves[pos]
+            inicio, _ = self._tramos.get(len(clave), (interno, interno))
+            self._tramos[len(clave)] = (inicio, interno + 1)
+            for caracter, veces in Counter(clave).items():
+                listas = por_caracter.setdefault(caracter, [])
+                while len(listas) < veces:
+                    listas.append([])
+                for j in range(veces):
+                    listas[j].append(interno)
+
+        # c * j → entero con un bit por clave que contiene c al menos j veces
+        self._presencias: Dict[str, int] = {}
+        for caracter, listas in por_caracter.items():
+            for j, internos in enumerate(listas, start=1):
+                bits = bytearray(b"0" * n)
+                for interno in internos:
+                    bits[interno] = 49  # "1"
+                bits.reverse()
+                self._presencias[caracter * j] = int(bits, 2)
+        self._alfabeto: Set[str] = set(por_caracter)
+        self._longitudes: List[int] = sorted(self._tramos)
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    # ------------------------------------------------------
+    # Búsquedas públicas
+    # ------------------------------------------------------
+    def mejor_clave(self, frase: str, umbral: float) -> Optional[str]:
+        """
+        Equivale a `get_close_matches(frase, claves, n=1, cutoff=umbral)`:
+        mayor ratio con SequenceMatcher(None, clave, frase); en empate, la clave mayor.
+        """
+        pos = self._buscar(frase, umbral, frase_como_a=False)
+        return self.claves[pos] if pos is not None else None
+
+    def mejor_posicion(self, frase: str, umbral: float) -> Optional[int]:
+        """
+        Posición de la primera clave con el mayor ratio SequenceMatcher(None, frase, clave)
+        que además alcance `umbral` (semántica del recorrido lineal de la UI).
+        """
+        return self._buscar(frase, umbral, frase_como_a=True)
+
+    # ------------------------------------------------------
+    # Núcleo de la búsqueda
+    # ------------------------------------------------------
+    def _rango_compatible(self, lb: int, corte: float) -> Tuple[int, int]:
+        """Números internos [inicio, fin) de las claves cuya cota por longitud alcanza `corte`."""
+        longitudes = self._longitudes
+        desde, hasta = 0, len(longitudes)
+        if corte > 0:
+            desde = bisect.bisect_left(longitudes, lb * corte / (2 - corte) - 1)
+            hasta = bisect.bisect_right(longitudes, lb * (2 - corte) / corte + 1)
+        compatibles = [la for la in longitudes[desde:hasta] if _cota_longitud(la, lb) >= corte]
+        if not compatibles:
+            return 0, 0
+        return self._tramos[compatibles[0]][0], self._tramos[compatibles[-1]][1]
+
+    def _planos_coincidencias(self, frase: str, inicio: int, fin: int) -> Tuple[List[int], int, int]:
+        """
+        Planos de bits del recuento Σ min(apariciones en la clave, en la frase)
+        de las claves: el bit i del plano k es el bit k del recuento de la clave
+        interna i + desplazamiento. Si el tramo [inicio, fin) es corto, los
+        conjuntos se recortan a él antes de sumar. Devuelve (planos,
+        desplazamiento, fin del tramo cubierto).
+        """
+        planos: List[int] = []
+        presencias = self._presencias
+        recortar = fin - inicio < len(self.claves) // 2
+        mascara = (1 << (fin - inicio)) - 1
+        for caracter, veces in Counter(frase).items():
+            for j in range(1, veces + 1):
+                acarreo = presencias.get(caracter * j)
+                if recortar and acarreo is not None:
+                    acarreo = (acarreo >> inicio) & mascara
+                if not acarreo:
+                    break  # ninguna clave tiene más apariciones de este carácter
+                for k, plano in enumerate(planos):
+                    planos[k] = plano ^ acarreo
+                    acarreo &= plano
+                    if not acarreo:
+                        break
+                if acarreo:
+                    planos.append(acarreo)
+        if recortar:
+            return planos, inicio, fin
+        return planos, 0, len(self.claves)
+
+    @staticmethod
+    def _al_menos(planos: List[int], minimo: int) -> int:
+        """Bits de las claves cuyo recuento (en `planos`) es ≥ `minimo`."""
+        if minimo <= 0:
+            return -1
+        if minimo >> len(planos):
+            return 0
+        mayores, iguales = 0, -1
+        for k in range(len(planos) - 1, -1, -1):
+            if (minimo >> k) & 1:
+                iguales &= planos[k]
+            else:
+                mayores |= iguales & planos[k]
+        return mayores | iguales
+
+    def _candidatas(
+        self, planos: List[int], desplazamiento: int, inicio: int, fin: int,
+        lb: int, corte: float, extraidas: int
+    ) -> Tuple[List[int], int]:
+        """
+        Números internos de las claves del tramo [inicio, fin) aún no extraídas
+        cuya cota (por longitud y por recuento de caracteres) alcanza `corte`, de
+        longitud más cercana a la frase primero; devuelve también el conjunto de
+        bits de extraídas actualizado.
+        """
+        # Longitudes compatibles agrupadas por mínimo de caracteres coincidentes
+        tramos_por_minimo: Dict[int, List[Tuple[int, int]]] = {}
+        longitudes = self._longitudes
+        desde = bisect.bisect_left(longitudes, len(self.claves[self._orden[inicio]])) if fin > inicio else 0
+        for la in longitudes[desde:]:
+            tramo_inicio, tramo_fin = self._tramos[la]
+            if tramo_inicio >= fin:
+                break
+            if _cota_longitud(la, lb) < corte:
+                continue
+            minimo = math.ceil(corte * (la + lb) / 2 - 1e-9)
+            tramos_por_minimo.setdefault(minimo, []).append(
+                (tramo_inicio - desplazamiento, tramo_fin - desplazamiento)
+            )
+
+        candidatas = []
+        pendientes = ~(extraidas >> desplazamiento)
+        for minimo, tramos in tramos_por_minimo.items():
+            cumplen = self._al_menos(planos, minimo) & pendientes
+            if not cumplen:
+                continue
+            for tramo_inicio, tramo_fin in tramos:
+                bits = (cumplen >> tramo_inicio) & ((1 << (tramo_fin - tramo_inicio)) - 1)
+                if not bits:
+                    continue
+                extraidas |= bits << (desplazamiento + tramo_inicio)
+                # bin() invertido: el carácter i es el bit i
+                cadena = bin(bits)[:1:-1]
+                i = cadena.find("1")
+                while i >= 0:
+                    candidatas.append(desplazamiento + tramo_inicio + i)
+                    i = cadena.find("1", i + 1)
+        claves, orden = self.claves, self._orden
+        candidatas.sort(key=lambda interno: abs(len(claves[orden[interno]]) - lb))
+        return candidatas, extraidas
+
+    def _buscar(self, frase: str, umbral: float, frase_como_a: bool) -> Optional[int]:
+        claves = self.claves
+        lb = len(frase)
+        matcher = SequenceMatcher()
+        if frase_como_a:
+            matcher.set_seq1(frase)
+        else:
+            matcher.set_seq2(frase)
+
+        mejor_pos: Optional[int] = None
+        mejor_ratio = 0.0
+
+        def evaluar(pos: int):
+            nonlocal mejor_pos, mejor_ratio
+            if frase_como_a:
+                matcher.set_seq2(claves[pos])
+            else:
+                matcher.set_seq1(claves[pos])
+            ratio = matcher.ratio()
+            if ratio < umbral:
+                return
+            if mejor_pos is None or ratio > mejor_ratio:
+                mejor_pos, mejor_ratio = pos, ratio
+            elif ratio == mejor_ratio:
+                # Desempate: get_close_matches prefiere la clave mayor;
+                # el recorrido de la UI se queda con la primera posición
+                if (pos < mejor_pos) if frase_como_a else (claves[pos] > claves[mejor_pos]):
+                    mejor_pos = pos
+
+        # Máscaras de bits de cada carácter de la frase (para la cota LCS)
+        mascaras: Dict[str, int] = {}
+        for j, ch in enumerate(frase):
+            mascaras[ch] = mascaras.get(ch, 0) | (1 << j)
+        todos = (1 << lb) - 1
+        # Tabla que elimina de las claves los caracteres ausentes en la frase
+        ausentes = {ord(ch): None for ch in self._alfabeto if ch not in mascaras}
+
+        # Los planos se calculan primero solo para el tramo de longitudes del
+        # primer nivel; si hay que bajar de nivel, se rehacen para todo el tramo del umbral
+        planos: Optional[List[int]] = None
+        desplazamiento = cubierto = 0
+        extraidas = 0
+        for nivel in [n for n in NIVELES_COTA if n > umbral] + [umbral]:
+            corte_nivel = max(nivel, umbral, mejor_ratio)
+            inicio, fin = self._rango_compatible(lb, corte_nivel)
+            if planos is None:
+                planos, desplazamiento, cubierto = self._planos_coincidencias(frase, inicio, fin)
+            elif inicio < desplazamiento or fin > cubierto:
+                planos, desplazamiento, cubierto = self._planos_coincidencias(
+                    frase, *self._rango_compatible(lb, umbral)
+                )
+            candidatas, extraidas = self._candidatas(
+                planos, desplazamiento, inicio, fin, lb, corte_nivel, extraidas
+            )
+            for interno in candidatas:
+                pos = self._orden[interno]
+                corte = max(umbral, mejor_ratio)
+                total = len(claves[pos]) + lb
+                if _cota_longitud(len(claves[pos]), lb) < corte:
+                    continue
+                reducida = claves[pos].translate(ausentes)
+                if total and 2.0 * min(len(reducida), lb) / total < corte:
+                    continue
+                v = todos
+                for ch in reducida:
+                    u = v & mascaras[ch]
+                    v = ((v + u) | (v - u)) & todos
+                lcs = lb - bin(v).count("1")
+                if total and 2.0 * lcs / total < corte:
+                    continue
+                evaluar(pos)
+            # Las claves sin extraer tienen cota < nivel ≤ mejor_ratio: no pueden superarla ni empatarla
+            if mejor_pos is not None and mejor_ratio >= nivel:
+                break
+
+        return mejor_pos
+
+
+def _cota_longitud(la: int, lb: int) -> float:
+    """Cota superior del ratio de SequenceMatcher para textos de longitudes la y lb (misma fórmula)."""
+    total = la + lb
+    return 2.0 * min(la, lb) / total if total else 1.0
+
+
+class IndiceSemantico:
+    """
+    Índice de los síntomas de la base para la coincidencia semántica general de
+    `buscar_equivalente_semantico`, cuya similitud es
+    0.7 · Jaccard de palabras + 0.3 · ratio de SequenceMatcher.
+
+    Guarda cada síntoma ya preprocesado y separado en palabras, y una lista
+    invertida palabra → síntomas. Para una frase, el Jaccard sale directamente
+    del recuento de palabras compartidas y el ratio se acota por longitud, así
+    que solo se calcula el ratio (lo caro) de los síntomas cuya cota aún puede
+    superar a la mejor similitud encontrada. El resultado es el mismo que
+    recorrer todos los síntomas: la mayor similitud y, en empate, el primero.
+    """
+
+    def __init__(self, sintomas: Sequence[str], preprocesar: Callable[[str], str]):
+        self.sintomas: List[str] = list(sintomas)
+        self._textos: List[str] = [preprocesar(s) for s in self.sintomas]
+
+        n_palabras: List[int] = []
+        por_palabra: Dict[str, List[int]] = {}
+        por_longitud: Dict[int, List[int]] = {}
+        for pos, texto in enumerate(self._textos):
+            palabras = set(texto.split())
+            n_palabras.append(len(palabras))
+            for palabra in palabras:
+                por_palabra.setdefault(palabra, []).append(pos)
+            por_longitud.setdefault(len(texto), []).append(pos)
+        self._n_palabras = array("I", n_palabras)
+        self._por_palabra: Dict[str, array] = {p: array("I", l) for p, l in por_palabra.items()}
+        self._por_longitud: Dict[int, array] = {l: array("I", p) for l, p in por_longitud.items()}
+
+    def __len__(self) -> int:
+        return len(self.sintomas)
+
+    def mejor(self, frase: str) -> Tuple[Optional[str], float]:
+        """
+        (síntoma más parecido, similitud) para `frase` ya preprocesada, o (None, 0.0)
+        si ninguno tiene similitud mayor que 0.
+        """
+        textos = self._textos
+        palabras = set(frase.split())
+        n = len(palabras)
+        la = len(frase)
+        compartidas = Counter()
+        for palabra in palabras:
+            posiciones = self._por_palabra.get(palabra)
+            if posiciones:
+                compartidas.update(posiciones)
+
+        mejor_pos: Optional[int] = None
+        mejor_sim = 0.0
+
+        def evaluar(pos: int, jaccard: float):
+            nonlocal mejor_pos, mejor_sim
+            sim = (jaccard * 0.7) + (SequenceMatcher(None, frase, textos[pos]).ratio() * 0.3)
+            if sim > mejor_sim or (sim == mejor_sim and mejor_pos is not None and pos < mejor_pos):
+                mejor_pos, mejor_sim = pos, sim
+
+        # 1. Síntomas con alguna palabra en común, de mayor a menor cota
+        candidatos = []
+        for pos, interseccion in compartidas.items():
+            jaccard = interseccion / (n + self._n_palabras[pos] - interseccion)
+            cota = (jaccard * 0.7) + (_cota_longitud(la, len(textos[pos])) * 0.3)
+            candidatos.append((-cota, pos, jaccard))
+        candidatos.sort()
+        for menos_cota, pos, jaccard in candidatos:
+            # Con cota igual a la mejor aún podría empatar con una posición anterior
+            if -menos_cota < mejor_sim:
+                break
+            evaluar(pos, jaccard)
+
+        # 2. Sin palabras en común la similitud es 0.3 · ratio ≤ 0.3: solo si aún puede ganar
+        if mejor_sim <= (0.0 * 0.7) + (1.0 * 0.3):
+            for lb, posiciones in self._por_longitud.items():
+                if (0.0 * 0.7) + (_cota_longitud(la, lb) * 0.3) < mejor_sim:
+                    continue
+                for pos in posiciones:
+                    if pos not in compartidas:
+                        evaluar(pos, 0.0)
+
+        return (self.sintomas[mejor_pos] if mejor_pos is not None else None), mejor_sim
@@ -0,0 +1,245 @@
+# motor_inferencia/instrumentacion.py
+"""
+Instrumentación del pipeline: cronómetros por etapa, contadores y registro.
+
+    METRICAS.contar("coincidencia.exacta")
+    with METRICAS.medir("etapa.difusa"):
+        ...
+    METRICAS.instantanea()        # dict con contadores, etapas y tasas de acierto
+    METRICAS.texto_prometheus()   # el mismo contenido en formato de exposición Prometheus
+
+Los contadores que terminan en ".aciertos" / ".fallos" se combinan en una tasa
+de acierto (p. ej. "indice.canonico"). Con METRICAS.activa = False no se mide nada.
+
+Los mensajes de diagnóstico ("[SEMANTIC LOG] ...") pasan por el logger `LOG`,
+con nivel configurable (variable de entorno SEAP_LOG_NIVEL o configurar_log) y
+opcionalmente con búfer (SEAP_LOG_BUFFER): con nivel WARNING los mensajes por
+fragmento ni siquiera se formatean. Un valor no válido en las variables de
+entorno se avisa y se ignora (DEBUG, sin búfer).
+"""
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO
+
+from motor_inferencia.cache_similitud import CACHE_SIMILITUD
+
+_SUFIJO_ACIERTOS = ".aciertos"
+_SUFIJO_FALLOS = ".fallos"
+
+
+class _Cronometro:
+    __slots__ = ("_metricas", "_nombre", "_inicio")
+
+    def __init__(self, metricas: "Metricas", nombre: str):
+        self._metricas = metricas
+        self._nombre = nombre
+
+    def __enter__(self):
+        self._inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._metricas.registrar(self._nombre, time.perf_counter_ns() - self._inicio)
+        return False
+
+
+class _CronometroInactivo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_INACTIVO = _CronometroInactivo()
+
+
+class Metricas:
+    """Contadores y duraciones acumuladas (n, total, máximo) por nombre, seguros entre hilos."""
+
+    def __init__(self, activa: bool = True):
+        self.activa = activa
+        self._contadores: Dict[str, int] = {}
+        self._duraciones: Dict[str, List[int]] = {}   # nombre → [n, total_ns, max_ns]
+        self._lock = threading.Lock()
+
+    def contar(self, nombre: str, n: int = 1):
+        if not self.activa:
+            return
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + n
+
+    def acierto(self, nombre: str, acertado: bool):
+        """Cuenta un acierto o un fallo de `nombre` (índice, caché...)."""
+        self.contar(nombre + (_SUFIJO_ACIERTOS if acertado else _SUFIJO_FALLOS))
+
+    def registrar(self, nombre: str, nanosegundos: int):
+        if not self.activa:
+            return
+        with self._lock:
+            datos = self._duraciones.get(nombre)
+            if datos is None:
+                self._duraciones[nombre] = [1, nanosegundos, nanosegundos]
+            else:
+                datos[0] += 1
+                datos[1] += nanosegundos
+                if nanosegundos > datos[2]:
+                    datos[2] = nanosegundos
+
+    def medir(self, nombre: str):
+        """Context manager que suma la duración del bloque a la etapa `nombre`."""
+        return _Cronometro(self, nombre) if self.activa else _INACTIVO
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._duraciones.clear()
+
+    # ------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------
+    def instantanea(self) -> Dict:
+        """Copia de las métricas: contadores, etapas (ms), tasas de acierto y caché de similitud."""
+        with self._lock:
+            contadores = dict(self._contadores)
+            duraciones = {nombre: list(datos) for nombre, datos in self._duraciones.items()}
+
+        etapas = {
+            nombre: {
+                "n": n,
+                "total_ms": total / 1e6,
+                "media_ms": total / n / 1e6,
+                "max_ms": maximo / 1e6,
+            }
+            for nombre, (n, total, maximo) in sorted(duraciones.items())
+        }
+        bases = sorted(
+            nombre.rsplit(".", 1)[0] for nombre in contadores
+            if nombre.endswith(_SUFIJO_ACIERTOS) or nombre.endswith(_SUFIJO_FALLOS)
+        )
+        tasas = {}
+        for base in bases:
+            aciertos = contadores.get(base + _SUFIJO_ACIERTOS, 0)
+            total = aciertos + contadores.get(base + _SUFIJO_FALLOS, 0)
+            tasas[base] = aciertos / total if total else 0.0
+        return {
+            "contadores": dict(sorted(contadores.items())),
+            "etapas": etapas,
+            "tasas_acierto": tasas,
+            "cache_similitud": CACHE_SIMILITUD.estadisticas(),
+        }
+
+    def texto_prometheus(self, prefijo: str = "seap") -> str:
+        """Métricas en el formato de texto de exposición de Prometheus."""
+        datos = self.instantanea()
+        lineas = [f"# TYPE {prefijo}_eventos_total counter"]
+        lineas += [
+            f'{prefijo}_eventos_total{{nombre="{nombre}"}} {valor}'
+            for nombre, valor in datos["contadores"].items()
+        ]
+        lineas.append(f"# TYPE {prefijo}_etapa_segundos summary")
+        for nombre, etapa in datos["etapas"].items():
+            lineas.append(f'{prefijo}_etapa_segundos_count{{etapa="{nombre}"}} {etapa["n"]}')
+            lineas.append(f'{prefijo}_etapa_segundos_sum{{etapa="{nombre}"}} {etapa["total_ms"] / 1e3:.9f}')
+        lineas.append(f"# TYPE {prefijo}_etapa_segundos_max gauge")
+        lineas += [
+            f'{prefijo}_etapa_segundos_max{{etapa="{nombre}"}} {etapa["max_ms"] / 1e3:.9f}'
+            for nombre, etapa in datos["etapas"].items()
+        ]
+        lineas.append(f"# TYPE {prefijo}_tasa_aciertos gauge")
+        lineas += [
+            f'{prefijo}_tasa_aciertos{{nombre="{nombre}"}} {tasa:.6f}'
+            for nombre, tasa in datos["tasas_acierto"].items()
+        ]
+        cache = datos["cache_similitud"]
+        lineas.append(f"# TYPE {prefijo}_cache_similitud_entradas gauge")
+        lineas.append(f"{prefijo}_cache_similitud_entradas {cache['entradas']}")
+        lineas.append(f"# TYPE {prefijo}_cache_similitud_tasa_aciertos gauge")
+        lineas.append(f"{prefijo}_cache_similitud_tasa_aciertos {cache['tasa_aciertos']:.6f}")
+        return "\n".join(lineas) + "\n"
+
+
+# Métricas compartidas por todo el proceso
+METRICAS = Metricas()
+
+
+# ======================================================
+# Registro (logging)
+# ======================================================
+class _ManejadorSalida(logging.StreamHandler):
+    """Escribe en el sys.stdout vigente en cada mensaje (respeta redirect_stdout)."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+
+LOG = logging.getLogger("seap")
+LOG.propagate = False
+
+NIVELES_LOG = ("DEBUG", "INFO", "WARNING", "ERROR", "OFF")
+
+
+def configurar_log(nivel: str = "DEBUG", buffer: int = 0, flujo: Optional[TextIO] = None):
+    """
+    Configura el logger de diagnóstico.
+    `nivel`: DEBUG (cada fragmento, como siempre), INFO, WARNING, ERROR u OFF.
+    `buffer` > 0: acumula hasta ese número de mensajes antes de escribirlos
+    (los WARNING o más graves se escriben en el acto).
+    `flujo`: destino fijo; por defecto, el sys.stdout vigente al escribir.
+    Un nivel desconocido o un búfer negativo lanzan ValueError.
+    """
+    nivel = nivel.upper()
+    if nivel not in NIVELES_LOG:
+        raise ValueError(f"Nivel de log desconocido: {nivel!r} (use {', '.join(NIVELES_LOG)}).")
+    if buffer < 0:
+        raise ValueError(f"El búfer del log no puede ser negativo: {buffer}.")
+    LOG.setLevel(logging.CRITICAL + 1 if nivel == "OFF" else getattr(logging, nivel))
+    for manejador in list(LOG.handlers):
+        LOG.removeHandler(manejador)
+        manejador.close()
+
+    destino = logging.StreamHandler(flujo) if flujo is not None else _ManejadorSalida()
+    destino.setFormatter(logging.Formatter("[SEMANTIC LOG] %(message)s"))
+    if buffer > 0:
+        manejador = logging.handlers.MemoryHandler(buffer, flushLevel=logging.WARNING, target=destino)
+    else:
+        manejador = destino
+    LOG.addHandler(manejador)
+
+
+def vaciar_log():
+    """Escribe los mensajes pendientes del búfer."""
+    for manejador in LOG.handlers:
+        manejador.flush()
+
+
+def _configuracion_entorno():
+    """Nivel y búfer de SEAP_LOG_NIVEL / SEAP_LOG_BUFFER; lo no válido se avisa y vuelve al valor por defecto."""
+    # Se avisa por stderr: stdout puede ser la salida JSONL de batch
+    nivel = os.environ.get("SEAP_LOG_NIVEL", "DEBUG").strip().upper() or "DEBUG"
+    if nivel not in NIVELES_LOG:
+        print(f"⚠️ SEAP_LOG_NIVEL={nivel!r} no es válido ({', '.join(NIVELES_LOG)}); se usa DEBUG.",
+              file=sys.stderr)
+        nivel = "DEBUG"
+    texto = os.environ.get("SEAP_LOG_BUFFER", "0").strip() or "0"
+    try:
+        buffer = int(texto)
+        if buffer < 0:
+            raise ValueError
+    except ValueError:
+        print(f"⚠️ SEAP_LOG_BUFFER={texto!r} no es un entero ≥ 0; se usa 0 (sin búfer).", file=sys.stderr)
+        buffer = 0
+    return nivel, buffer
+
+
+configurar_log(*_configuracion_entorno())
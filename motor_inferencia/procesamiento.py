@@ -0,0 +1,139 @@
+# motor_inferencia/procesamiento.py
+import re
+from functools import lru_cache
+from typing import List, Mapping, Tuple, Union
+
+from base_conocimiento.registro_sinonimos import REGISTRO, RUTA_SINONIMOS_ENRIQUECIDO, TablaSinonimos
+from motor_inferencia.indice_sinonimos import IndiceDifuso
+from motor_inferencia.instrumentacion import LOG, METRICAS
+from motor_inferencia.recuperacion import obtener_motor
+from motor_inferencia.semantic_helper import (
+    buscar_equivalente_semantico,
+    obtener_indice_canonico,
+    obtener_indice_difuso,
+    obtener_indice_semantico,
+)
+
+# ===== CONFIGURACIÓN GLOBAL =====
+RUTA_SINONIMOS = RUTA_SINONIMOS_ENRIQUECIDO
+STOPWORDS = {"tengo", "me", "siento", "y", "a veces", "muy", "con", "el", "la", "los", "las", "de", "en", "por"}
+
+
+# ===== UTILIDADES DE PROCESAMIENTO =====
+def cargar_tabla_sinonimos(ruta=RUTA_SINONIMOS):
+    """
+    Devuelve la tabla de sinónimos desde el registro compartido.
+    Solo se relee el JSON si el archivo cambió en disco.
+    """
+    return REGISTRO.obtener((ruta,))
+
+
+def cargar_sinonimos(ruta=RUTA_SINONIMOS):
+    """Devuelve el diccionario (de solo lectura) de sinónimos."""
+    return cargar_tabla_sinonimos(ruta).entradas
+
+
+def _construir_indice_aproximado(sinonimos: Mapping[str, str]) -> Tuple[IndiceDifuso, List[str]]:
+    return IndiceDifuso([k.lower() for k in sinonimos]), list(sinonimos.values())
+
+
+@lru_cache(maxsize=4)
+def _indice_de_pares(pares: tuple) -> Tuple[IndiceDifuso, List[str]]:
+    """Índice de un diccionario ajeno al registro (se reutiliza mientras no cambie)."""
+    return _construir_indice_aproximado(dict(pares))
+
+
+def _indice_aproximado(sinonimos: Union[TablaSinonimos, Mapping[str, str]]) -> Tuple[IndiceDifuso, List[str]]:
+    """Índice difuso sobre las claves en minúsculas, junto con sus valores."""
+    if not isinstance(sinonimos, TablaSinonimos):
+        # El diccionario de una tabla del registro comparte el índice guardado en la tabla
+        tabla = next((t for t in REGISTRO.tablas() if t.entradas is sinonimos), None)
+        if tabla is None:
+            return _indice_de_pares(tuple(sinonimos.items()))
+        sinonimos = tabla
+    return sinonimos.derivado("indice_aproximado_ui", lambda t: _construir_indice_aproximado(t.entradas))
+
+
+def buscar_sinonimo_aproximado(frase, sinonimos, umbral=0.7):
+    """
+    Busca el sinónimo más parecido a la frase dada.
+    Si la similitud supera el umbral, devuelve el valor del sinónimo.
+    En caso contrario, devuelve la frase original.
+    `sinonimos` es el diccionario de sinónimos o su TablaSinonimos del registro.
+    """
+    frase = frase.lower().strip()
+    indice, valores = _indice_aproximado(sinonimos)
+    pos = indice.mejor_posicion(frase, umbral)
+    METRICAS.acierto("indice.aproximado", pos is not None)
+    return valores[pos] if pos is not None else frase
+
+
+def precargar_indices(base=None):
+    """
+    Construye por adelantado las tablas de sinónimos y los índices que usa el
+    procesamiento (canonicalización, búsqueda difusa y, si se pasa la base,
+    coincidencia semántica y recuperación de casos), para que la primera
+    consulta no pague ese coste.
+    """
+    obtener_indice_canonico()
+    obtener_indice_difuso()
+    _indice_aproximado(cargar_tabla_sinonimos())
+    if base is not None:
+        obtener_indice_semantico(base)
+        obtener_motor(base).sincronizar()
+
+
+def normalizar_sintomas(sintomas):
+    """Normaliza una lista de síntomas usando el diccionario de sinónimos."""
+    sinonimos = cargar_sinonimos()
+    return [sinonimos.get(s.strip().lower(), s.strip().lower()) for s in sintomas if s.strip()]
+
+
+def procesar_sintomas_semi_libre(texto, base=None):
+    """
+    Convierte el texto libre del paciente en una lista de síntomas canónicos:
+    coincidencia exacta, luego difusa y por último semántica, por fragmento.
+    """
+    with METRICAS.medir("procesamiento"):
+        return _procesar_sintomas_semi_libre(texto, base)
+
+
+def _procesar_sintomas_semi_libre(texto, base):
+    frases = re.split(r"[.,;]", texto.lower())
+    tabla = cargar_tabla_sinonimos()
+    sinonimos = tabla.entradas
+    sintomas = []
+
+    for frase in frases:
+        frase = frase.strip()
+        if not frase or frase in STOPWORDS:
+            continue
+        METRICAS.contar("procesamiento.fragmentos")
+
+        # Exacta
+        if frase in sinonimos:
+            METRICAS.contar("procesamiento.exacta")
+            sintomas.append(sinonimos[frase])
+            continue
+
+        # Difusa (ya la tienes con buscar_sinonimo_aproximado)
+        with METRICAS.medir("procesamiento.difusa"):
+            aproximado = buscar_sinonimo_aproximado(frase, tabla, umbral=0.7)
+        if aproximado != frase:
+            METRICAS.contar("procesamiento.difusa")
+            sintomas.append(aproximado)
+            continue
+
+        # Semántica
+        coincidencias = buscar_equivalente_semantico(frase, umbral=0.5, base=base)
+        if coincidencias:
+            METRICAS.contar("procesamiento.semantica")
+            for _, encontrado, sim in coincidencias:
+                LOG.debug("Coincidencia semántica: '%s' → '%s' (sim=%.2f)", frase, encontrado, sim)
+                sintomas.append(encontrado)
+        else:
+            METRICAS.contar("procesamiento.sin_coincidencia")
+            LOG.debug("Sin coincidencia semántica para: '%s'", frase)
+            sintomas.append(frase)  # mantener texto original
+
+    return list(set(sintomas))
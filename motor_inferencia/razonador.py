@@ -2,7 +2,17 @@
 from typing import List, Optional, Tuple, Callable
 from base_conocimiento.modelos import BaseDeCasos, Caso
 from motor_inferencia.representacion import normalizar_lista
-from difflib import SequenceMatcher
+from motor_inferencia.recuperacion import obtener_motor
+from motor_inferencia.recuperacion_lsh import obtener_motor_lsh
+from motor_inferencia.recuperacion_vectorial import ESQUEMAS, obtener_motor_vectorial
+from motor_inferencia.cache_similitud import supera_umbral
+from motor_inferencia.cache_consultas import CACHE_CONSULTAS
+from motor_inferencia.instrumentacion import METRICAS
+
+# "jaccard": Jaccard flexible sobre síntomas (motor de máscaras de bits);
+# "tfidf" / "bm25": producto disperso sobre palabras y trigramas (recuperacion_vectorial);
+# "lsh": candidatos MinHash/LSH puntuados con el Jaccard exacto (recuperacion_lsh, aproximado)
+MODOS_RECUPERACION = ("jaccard",) + ESQUEMAS + ("lsh",)
 
 
 def similitud_jaccard(sintomas1: List[str], sintomas2: List[str]) -> float:
@@ -18,8 +28,7 @@ def similitud_jaccard(sintomas1: List[str], sintomas2: List[str]) -> float:
     interseccion = 0
     for s1 in set1:
         for s2 in set2:
-            ratio = SequenceMatcher(None, s1, s2).ratio()
-            if ratio >= 0.6:  # 60% de parecido cuenta como coincidencia
+            if supera_umbral(s1, s2, 0.6):  # 60% de parecido cuenta como coincidencia
                 interseccion += 1
                 break
 
@@ -27,72 +36,102 @@ def similitud_jaccard(sintomas1: List[str], sintomas2: List[str]) -> float:
     return interseccion / union if union else 0.0
 
 
-def recuperar_caso(base: BaseDeCasos, sintomas_usuario: List[str]) -> List[Tuple[Caso, float]]:
+def obtener_motor_modo(base: BaseDeCasos, modo: str):
+    """Motor de recuperación de `base` para el modo indicado (todos ofrecen recuperar y mejores)."""
+    if modo == "jaccard":
+        return obtener_motor(base)
+    if modo in ESQUEMAS:
+        return obtener_motor_vectorial(base, modo)
+    if modo == "lsh":
+        return obtener_motor_lsh(base)
+    raise ValueError(f"Modo de recuperación desconocido: {modo} (use {', '.join(MODOS_RECUPERACION)})")
+
+
+def recuperar_caso(base: BaseDeCasos, sintomas_usuario: List[str], modo: str = "jaccard") -> List[Tuple[Caso, float]]:
     """
     Recupera todos los casos con su similitud, ordenados de mayor a menor.
+    Con el modo "jaccard" usa el motor precalculado de la base (las puntuaciones
+    son las mismas que aplicar `similitud_jaccard` a cada caso); con "tfidf" o
+    "bm25", la matriz dispersa de recuperacion_vectorial; con "lsh", solo se
+    puntúan los candidatos MinHash/LSH y el resto queda con 0.0.
     """
-    sintomas_usuario = normalizar_lista(sintomas_usuario)
-    similitudes = []
+    with METRICAS.medir("recuperacion"):
+        return obtener_motor_modo(base, modo).recuperar(sintomas_usuario)
 
-    for caso in base.listar_casos():
-        sintomas_caso = normalizar_lista(caso.sintomas)
-        score = similitud_jaccard(sintomas_usuario, sintomas_caso)
-        
-        similitudes.append((caso, score))
 
-    similitudes.sort(key=lambda x: x[1], reverse=True)
-    return similitudes
+def recuperar_mejores(
+    base: BaseDeCasos, sintomas_usuario: List[str], k: int = 2, modo: str = "jaccard"
+) -> List[Tuple[Caso, float]]:
+    """
+    Recupera solo los `k` casos más similares (con similitud > 0), en el mismo
+    orden que `recuperar_caso`, sin puntuar ni ordenar el resto de la base.
+    """
+    with METRICAS.medir("recuperacion"):
+        return obtener_motor_modo(base, modo).mejores(sintomas_usuario, k)
 
 
 def razonar(
     base: BaseDeCasos,
     sintomas_usuario: List[str],
     umbral: float = 0.6,
-    preguntar_callback: Optional[Callable[[str], str]] = None
+    preguntar_callback: Optional[Callable[[str], str]] = None,
+    modo: str = "jaccard",
 ) -> Optional[Tuple[Caso, float, Optional[str]]]:
     """
     Recupera el caso más probable según los síntomas.
     Si el usuario da un solo síntoma, pregunta síntomas adicionales (si hay ambigüedad).
     Si hay empate, añade explicación sobre la ambigüedad.
     Si todas las similitudes son 0.0, devuelve None.
+    Sin `preguntar_callback` el resultado se toma de (o se guarda en) la caché de consultas.
+    `modo`: forma de recuperar los casos, uno de MODOS_RECUPERACION.
     """
     sintomas_usuario = normalizar_lista(sintomas_usuario)
-    coincidencias = recuperar_caso(base, sintomas_usuario)
+    if preguntar_callback is None:
+        entrada = CACHE_CONSULTAS.obtener(base, sintomas_usuario, umbral, modo)
+        if entrada is None:
+            version = base.version
+            resultado = _razonar(base, sintomas_usuario, umbral, modo=modo)
+            entrada = CACHE_CONSULTAS.guardar(base, sintomas_usuario, umbral, resultado, version, modo)
+        return entrada.resultado
+    return _razonar(base, sintomas_usuario, umbral, preguntar_callback, modo)
 
-    if not coincidencias:
-        return None
 
-    # Si todos los puntajes son 0.0 → no hay ningún caso relevante
-    if all(score == 0 for _, score in coincidencias):
+def _razonar(
+    base: BaseDeCasos,
+    sintomas_usuario: List[str],
+    umbral: float,
+    preguntar_callback: Optional[Callable[[str], str]] = None,
+    modo: str = "jaccard",
+) -> Optional[Tuple[Caso, float, Optional[str]]]:
+    # Basta con los dos mejores: el ganador y, si lo hay, el primer empatado
+    coincidencias = recuperar_mejores(base, sintomas_usuario, k=2, modo=modo)
+
+    # Base vacía o todos los puntajes son 0.0 → no hay ningún caso relevante
+    if not coincidencias:
         return None
 
     # --- Caso A: un solo síntoma ---
     if len(sintomas_usuario) == 1:
         sintoma = sintomas_usuario[0]
-        # Solo considerar casos con similitud > 0
-        candidatos = [c for c, s in coincidencias if sintoma in normalizar_lista(c.sintomas) and s > 0]
-
-        # Si no hay ningún candidato con similitud positiva
-        if not candidatos and coincidencias[0][1] == 0:
-            return None
 
         # Si hay varios casos con ese síntoma
-        if len(candidatos) > 1 and preguntar_callback:
-            for candidato in candidatos:
-                for sint in normalizar_lista(candidato.sintomas):
-                    if sint != sintoma:
-                        respuesta = preguntar_callback(
-                            f"Me has dado poca información.\n¿Tienes {sint}?"
-                        )
-                        if respuesta.lower().startswith("s"):
-                            return candidato, 1.0, None  # Seleccionado directamente
-            # Si no confirmó ninguno
-            return candidatos[0], 0.5, None
+        if preguntar_callback:
+            # Casos que contienen el síntoma (todos con similitud > 0), de mayor a menor similitud
+            candidatos = [c for c, _ in obtener_motor(base).casos_con_sintoma(sintoma)]
+            if len(candidatos) > 1:
+                for candidato in candidatos:
+                    for sint in candidato.sintomas_normalizados:
+                        if sint != sintoma:
+                            respuesta = preguntar_callback(
+                                f"Me has dado poca información.\n¿Tienes {sint}?"
+                            )
+                            if respuesta.lower().startswith("s"):
+                                return candidato, 1.0, None  # Seleccionado directamente
+                # Si no confirmó ninguno
+                return candidatos[0], 0.5, None
 
         # Si solo hay uno o no se requiere preguntar
         mejor_caso, score = coincidencias[0]
-        if score == 0:
-            return None
         return mejor_caso, score, None
 
     # --- Caso B: varios síntomas ---
@@ -0,0 +1,296 @@
+# motor_inferencia/recuperacion.py
+import heapq
+import threading
+import weakref
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from base_conocimiento.modelos import SINTOMAS, BaseDeCasos, Caso
+from motor_inferencia.representacion import normalizar_lista
+from motor_inferencia.cache_similitud import CACHE_SIMILITUD, supera_umbral
+
+UMBRAL_EQUIVALENCIA = 0.6  # mismo criterio que similitud_jaccard
+
+
+class MotorRecuperacion:
+    """
+    Motor de recuperación precalculado sobre una BaseDeCasos.
+
+    Mantiene:
+      - un vocabulario de síntomas normalizados (síntoma → id), al que se llega
+        desde los ids enteros de los síntomas de cada caso (Caso.ids_sintomas),
+      - la matriz dispersa caso × síntoma (máscara de bits por caso y lista
+        invertida síntoma → posiciones de casos),
+      - la tabla de equivalencias difusas síntoma × síntoma (ratio ≥ 0.6),
+        calculada por filas a medida que los síntomas aparecen en consultas.
+
+    Con esto una consulta se resuelve con búsquedas en el índice y operaciones
+    AND sobre enteros, dando exactamente las mismas puntuaciones que aplicar
+    `similitud_jaccard` caso por caso.
+    """
+
+    def __init__(self, base: BaseDeCasos):
+        self.base = base
+        self._lock = threading.RLock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._version = None
+        self._lista = None
+        self._casos: List[Caso] = []
+        self._vocabulario: Dict[str, int] = {}
+        self._sintomas: List[str] = []
+        self._mascaras: List[int] = []          # caso → bits de sus síntomas
+        self._tamanos: List[int] = []           # caso → nº de síntomas distintos
+        self._casos_por_sintoma: List[List[int]] = []
+        # id en la tabla compartida SINTOMAS → id en el vocabulario (None si queda vacío)
+        self._por_id_global: Dict[int, Optional[int]] = {}
+        # fila de equivalencias: síntoma → (bits de síntomas equivalentes, nº de síntomas revisados)
+        self._equivalencias: Dict[str, Tuple[int, int]] = {}
+
+    # El cerrojo no se serializa (el motor se guarda en la instantánea compilada)
+    # ni los ids de SINTOMAS, que solo valen dentro del proceso
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado["_lock"]
+        estado["_por_id_global"] = {}
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------
+    # Construcción y sincronización con la base
+    # ------------------------------------------------------
+    def _id_vocabulario(self, id_global: int) -> Optional[int]:
+        """Id en el vocabulario del síntoma `id_global` de SINTOMAS, normalizándolo una sola vez."""
+        if id_global in self._por_id_global:
+            return self._por_id_global[id_global]
+        id_sintoma = None
+        for sintoma in normalizar_lista([SINTOMAS.texto(id_global)]):
+            id_sintoma = self._vocabulario.get(sintoma)
+            if id_sintoma is None:
+                id_sintoma = len(self._sintomas)
+                self._vocabulario[sintoma] = id_sintoma
+                self._sintomas.append(sintoma)
+                self._casos_por_sintoma.append([])
+        self._por_id_global[id_global] = id_sintoma
+        return id_sintoma
+
+    def _indexar(self, caso: Caso):
+        pos = len(self._casos)
+        mascara = 0
+        ids = {self._id_vocabulario(id_global) for id_global in caso.ids_sintomas}
+        ids.discard(None)
+        for id_sintoma in ids:
+            mascara |= 1 << id_sintoma
+            self._casos_por_sintoma[id_sintoma].append(pos)
+        self._casos.append(caso)
+        self._mascaras.append(mascara)
+        self._tamanos.append(bin(mascara).count("1"))
+
+    def sincronizar(self):
+        """
+        Pone el índice al día con la base. Si solo se agregaron casos al final
+        se indexan únicamente los nuevos; ante cualquier otro cambio se reconstruye.
+        """
+        base = self.base
+        if self._version == base.version:
+            return
+        with self._lock:
+            if self._version == base.version:
+                return
+            casos = base.casos
+            n = len(self._casos)
+            solo_agregados = (
+                casos is self._lista
+                and len(casos) >= n
+                and (n == 0 or casos[n - 1] is self._casos[n - 1])
+            )
+            if not solo_agregados:
+                self._reiniciar()
+                n = 0
+            for caso in casos[n:]:
+                self._indexar(caso)
+            self._lista = casos
+            self._version = base.version
+
+    # ------------------------------------------------------
+    # Equivalencias difusas entre síntomas
+    # ------------------------------------------------------
+    def equivalentes(self, sintoma: str) -> int:
+        """
+        Bits de los síntomas del vocabulario con ratio ≥ 0.6 respecto a `sintoma`
+        (SequenceMatcher(None, sintoma, otro), igual que similitud_jaccard).
+        Las filas de síntomas del vocabulario se guardan y solo se completan
+        con los síntomas nuevos; las de texto libre se calculan al vuelo y sus
+        pares no pasan por la caché de similitudes (ni llegan a disco).
+        """
+        bits, revisados = self._equivalencias.get(sintoma, (0, 0))
+        total = len(self._sintomas)
+        if revisados == total:
+            return bits
+        del_vocabulario = sintoma in self._vocabulario
+        supera = CACHE_SIMILITUD.supera if del_vocabulario else supera_umbral
+        la = len(sintoma)
+        for id_sintoma in range(revisados, total):
+            otro = self._sintomas[id_sintoma]
+            lb = len(otro)
+            # Cota superior del ratio por longitudes antes de alinear
+            if la + lb == 0 or 2.0 * min(la, lb) / (la + lb) < UMBRAL_EQUIVALENCIA:
+                continue
+            if supera(sintoma, otro, UMBRAL_EQUIVALENCIA):
+                bits |= 1 << id_sintoma
+        if del_vocabulario:
+            self._equivalencias[sintoma] = (bits, total)
+        return bits
+
+    def precalcular_equivalencias(self):
+        """Completa la fila de equivalencias de todos los síntomas del vocabulario."""
+        self.sincronizar()
+        with self._lock:
+            for sintoma in list(self._sintomas):
+                self.equivalentes(sintoma)
+
+    # ------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------
+    def _preparar(
+        self, sintomas_usuario: List[str], con_candidatos: bool = True
+    ) -> Tuple[int, List[Tuple[int, int]], Set[int]]:
+        """
+        Normaliza la consulta y devuelve (nº de síntomas distintos, filas, candidatos):
+        una fila (bits equivalentes, bit exacto o 0) por cada síntoma con algún
+        equivalente, y las posiciones de los casos que comparten alguno
+        (vacío si `con_candidatos` es False).
+        """
+        consulta = set(normalizar_lista(sintomas_usuario))
+        filas = []
+        candidatos: Set[int] = set()
+        for sintoma in consulta:
+            bits = self.equivalentes(sintoma)
+            if not bits:
+                continue
+            id_exacto = self._vocabulario.get(sintoma)
+            filas.append((bits, 1 << id_exacto if id_exacto is not None else 0))
+            if not con_candidatos:
+                continue
+            resto = bits
+            while resto:
+                bajo = resto & -resto
+                candidatos.update(self._casos_por_sintoma[bajo.bit_length() - 1])
+                resto ^= bajo
+        return len(consulta), filas, candidatos
+
+    def _similitud(self, pos: int, n_consulta: int, filas: List[Tuple[int, int]]) -> float:
+        mascara = self._mascaras[pos]
+        interseccion = 0
+        comunes = 0
+        for bits, exacto in filas:
+            if bits & mascara:
+                interseccion += 1
+            if exacto & mascara:
+                comunes += 1
+        return interseccion / (n_consulta + self._tamanos[pos] - comunes)
+
+    def puntuar(self, sintomas_usuario: List[str]) -> Dict[int, float]:
+        """
+        Devuelve {posición del caso: similitud} solo para los casos con similitud > 0.
+        El resto de casos tiene similitud 0.0.
+        """
+        self.sincronizar()
+        with self._lock:
+            n_consulta, filas, candidatos = self._preparar(sintomas_usuario)
+            return {pos: self._similitud(pos, n_consulta, filas) for pos in candidatos}
+
+    def puntuar_posiciones(self, sintomas_usuario: List[str], posiciones: Iterable[int]) -> Dict[int, float]:
+        """
+        Como `puntuar`, pero solo para los casos en `posiciones` (p. ej. los
+        candidatos de recuperacion_lsh), sin recorrer las listas invertidas.
+        """
+        self.sincronizar()
+        with self._lock:
+            n_consulta, filas, _ = self._preparar(sintomas_usuario, con_candidatos=False)
+            puntuaciones = {}
+            if not filas:
+                return puntuaciones
+            for pos in posiciones:
+                similitud = self._similitud(pos, n_consulta, filas)
+                if similitud > 0:
+                    puntuaciones[pos] = similitud
+            return puntuaciones
+
+    def mejores(self, sintomas_usuario: List[str], k: int) -> List[Tuple[Caso, float]]:
+        """
+        Los `k` casos más similares (solo con similitud > 0), en el mismo orden
+        que los primeros de `recuperar`.
+
+        La similitud de un caso nunca supera f / max(nq, nc), donde f es el nº de
+        síntomas de la consulta con algún equivalente, nq el de la consulta y nc el
+        del caso. Los candidatos se recorren de menos a más síntomas (cota
+        decreciente) y se corta en cuanto la cota queda por debajo del k-ésimo.
+        """
+        self.sincronizar()
+        with self._lock:
+            n_consulta, filas, candidatos = self._preparar(sintomas_usuario)
+            if k <= 0 or not filas:
+                return []
+            f = len(filas)
+            tamanos = self._tamanos
+            monton: List[Tuple[float, int]] = []    # (similitud, -posición), mínimo arriba
+            for pos in sorted(candidatos, key=tamanos.__getitem__):
+                if len(monton) == k and f / max(n_consulta, tamanos[pos]) < monton[0][0]:
+                    break
+                elemento = (self._similitud(pos, n_consulta, filas), -pos)
+                if len(monton) < k:
+                    heapq.heappush(monton, elemento)
+                elif elemento > monton[0]:
+                    heapq.heapreplace(monton, elemento)
+            monton.sort(reverse=True)
+            return [(self._casos[-pos], score) for score, pos in monton]
+
+    def casos_con_sintoma(self, sintoma: str) -> List[Tuple[Caso, float]]:
+        """
+        Casos que contienen exactamente `sintoma` (normalizado) con su similitud
+        frente a la consulta de ese único síntoma (1 / nº de síntomas del caso),
+        en el orden en que los devolvería `recuperar`.
+        """
+        self.sincronizar()
+        with self._lock:
+            id_sintoma = self._vocabulario.get(sintoma)
+            if id_sintoma is None:
+                return []
+            posiciones = sorted(self._casos_por_sintoma[id_sintoma], key=lambda p: (self._tamanos[p], p))
+            return [(self._casos[p], 1 / self._tamanos[p]) for p in posiciones]
+
+    def recuperar(self, sintomas_usuario: List[str]) -> List[Tuple[Caso, float]]:
+        """Todos los casos con su similitud, ordenados de mayor a menor (orden estable)."""
+        with self._lock:
+            puntuaciones = self.puntuar(sintomas_usuario)
+            casos = self._casos
+            orden = sorted(puntuaciones, key=lambda pos: (-puntuaciones[pos], pos))
+            resultado = [(casos[pos], puntuaciones[pos]) for pos in orden]
+            resultado.extend((caso, 0.0) for pos, caso in enumerate(casos) if pos not in puntuaciones)
+            return resultado
+
+
+_MOTORES: "weakref.WeakKeyDictionary[BaseDeCasos, MotorRecuperacion]" = weakref.WeakKeyDictionary()
+_MOTORES_LOCK = threading.Lock()
+
+
+def obtener_motor(base: BaseDeCasos) -> MotorRecuperacion:
+    """Devuelve (creándolo si hace falta) el motor de recuperación asociado a `base`."""
+    motor = _MOTORES.get(base)
+    if motor is None:
+        with _MOTORES_LOCK:
+            motor = _MOTORES.get(base)
+            if motor is None:
+                motor = MotorRecuperacion(base)
+                _MOTORES[base] = motor
+    return motor
+
+
+def registrar_motor(motor: MotorRecuperacion):
+    """Asocia a su base un motor ya construido (p. ej. recuperado de una instantánea)."""
+    with _MOTORES_LOCK:
+        _MOTORES[motor.base] = motor
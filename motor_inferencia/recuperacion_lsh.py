@@ -0,0 +1,328 @@
+# motor_inferencia/recuperacion_lsh.py
+"""
+Recuperación aproximada de candidatos con MinHash + LSH, para bases muy grandes.
+
+Cada caso tiene una firma MinHash del conjunto de trigramas de caracteres de
+sus síntomas (así las coincidencias difusas, con errores de tipeo, siguen
+chocando). La firma de un caso es el mínimo, posición a posición, de las
+firmas de sus síntomas, que se calculan una sola vez por síntoma distinto.
+La firma se parte en `bandas` de `filas` valores y cada banda va a una tabla
+hash: dos conjuntos con similitud de Jaccard s comparten alguna banda con
+probabilidad 1 - (1 - s^filas)^bandas.
+
+Una consulta solo mira sus propios cubos; los casos que chocan (como mucho
+`max_candidatos`, los de más bandas en común) se puntúan de forma exacta con
+el motor de recuperación. Más bandas o menos filas → más recall y más
+candidatos; `max_candidatos` acota la latencia.
+
+Informe de recall frente a la búsqueda exhaustiva:
+    python -m motor_inferencia.recuperacion_lsh --escala 100 --bandas 32 --filas 2
+"""
+import argparse
+import heapq
+import random
+import sys
+import threading
+import time
+import weakref
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from base_conocimiento.modelos import BaseDeCasos, Caso
+from motor_inferencia.cache_similitud import CACHE_SIMILITUD
+from motor_inferencia.recuperacion import obtener_motor
+from motor_inferencia.representacion import normalizar_lista
+
+BANDAS = 32
+FILAS = 2
+MAX_CANDIDATOS = 256
+N_SHINGLE = 3
+_PRIMO = (1 << 61) - 1
+
+
+def shingles(sintoma: str) -> Set[int]:
+    """Trigramas de caracteres de cada palabra del síntoma (con bordes), como enteros de 32 bits."""
+    resultado = set()
+    for palabra in sintoma.split():
+        marcada = f" {palabra} "
+        for i in range(len(marcada) - N_SHINGLE + 1):
+            resultado.add(zlib.crc32(marcada[i:i + N_SHINGLE].encode("utf-8")))
+    return resultado
+
+
+class MotorLSH:
+    """
+    Firmas MinHash de los casos de una BaseDeCasos en `bandas` tablas LSH.
+
+    Si solo se agregaron casos al final se indexan únicamente los nuevos; ante
+    cualquier otro cambio de la base se reconstruye.
+    """
+
+    def __init__(
+        self,
+        base: BaseDeCasos,
+        bandas: int = BANDAS,
+        filas: int = FILAS,
+        max_candidatos: Optional[int] = MAX_CANDIDATOS,
+        semilla: int = 1,
+    ):
+        if bandas < 1 or filas < 1:
+            raise ValueError("bandas y filas deben ser al menos 1.")
+        self.base = base
+        self.bandas = bandas
+        self.filas = filas
+        self.max_candidatos = max_candidatos
+        rng = random.Random(semilla)
+        self._coeficientes = [(rng.randrange(1, _PRIMO), rng.randrange(_PRIMO)) for _ in range(bandas * filas)]
+        self._firmas_sintoma: Dict[str, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self._version = None
+        self._lista = None
+        self._casos: List[Caso] = []
+        self._tablas: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(self.bandas)]
+
+    # ------------------------------------------------------
+    # Firmas
+    # ------------------------------------------------------
+    def _firma_de_sintoma(self, sintoma: str) -> Tuple[int, ...]:
+        elementos = shingles(sintoma) or {0}
+        return tuple(min((a * x + b) % _PRIMO for x in elementos) for a, b in self._coeficientes)
+
+    def firma(self, sintomas: Sequence[str], memorizar: bool = False) -> Optional[Tuple[int, ...]]:
+        """
+        Firma MinHash de la unión de los trigramas de los síntomas (ya normalizados),
+        o None si no hay síntomas. Con `memorizar` se guardan las firmas por síntoma.
+        """
+        firmas = []
+        for sintoma in set(sintomas):
+            firma = self._firmas_sintoma.get(sintoma)
+            if firma is None:
+                firma = self._firma_de_sintoma(sintoma)
+                if memorizar:
+                    self._firmas_sintoma[sintoma] = firma
+            firmas.append(firma)
+        if not firmas:
+            return None
+        return firmas[0] if len(firmas) == 1 else tuple(map(min, *firmas))
+
+    def _bandas_de(self, firma: Tuple[int, ...]):
+        filas = self.filas
+        return (firma[i * filas:(i + 1) * filas] for i in range(self.bandas))
+
+    # ------------------------------------------------------
+    # Construcción y sincronización con la base
+    # ------------------------------------------------------
+    def _indexar(self, caso: Caso):
+        pos = len(self._casos)
+        self._casos.append(caso)
+        firma = self.firma(caso.sintomas_normalizados, memorizar=True)
+        if firma is None:
+            return
+        for tabla, clave in zip(self._tablas, self._bandas_de(firma)):
+            tabla.setdefault(clave, []).append(pos)
+
+    def sincronizar(self):
+        """Pone las tablas al día con la base (igual que MotorRecuperacion.sincronizar)."""
+        base = self.base
+        if self._version == base.version:
+            return
+        with self._lock:
+            if self._version == base.version:
+                return
+            casos = base.casos
+            n = len(self._casos)
+            solo_agregados = (
+                casos is self._lista
+                and len(casos) >= n
+                and (n == 0 or casos[n - 1] is self._casos[n - 1])
+            )
+            if not solo_agregados:
+                self._reiniciar()
+                n = 0
+            for caso in casos[n:]:
+                self._indexar(caso)
+            self._lista = casos
+            self._version = base.version
+
+    # ------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------
+    def candidatos(self, sintomas_usuario: List[str]) -> List[int]:
+        """
+        Posiciones de los casos que comparten al menos una banda con la consulta;
+        si son más de `max_candidatos`, los que más bandas comparten (y, a igualdad,
+        los primeros de la base).
+        """
+        self.sincronizar()
+        firma = self.firma(normalizar_lista(sintomas_usuario))
+        if firma is None:
+            return []
+        with self._lock:
+            choques = Counter()
+            for tabla, clave in zip(self._tablas, self._bandas_de(firma)):
+                choques.update(tabla.get(clave, ()))
+        if self.max_candidatos is None or len(choques) <= self.max_candidatos:
+            return sorted(choques)
+        return heapq.nsmallest(self.max_candidatos, choques, key=lambda pos: (-choques[pos], pos))
+
+    def mejores(self, sintomas_usuario: List[str], k: int) -> List[Tuple[Caso, float]]:
+        """Los `k` mejores candidatos con su similitud exacta (> 0), en el orden de `recuperar_mejores`."""
+        if k <= 0:
+            return []
+        motor = obtener_motor(self.base)
+        puntuaciones = motor.puntuar_posiciones(sintomas_usuario, self.candidatos(sintomas_usuario))
+        mejores = heapq.nsmallest(k, puntuaciones, key=lambda pos: (-puntuaciones[pos], pos))
+        return [(self._casos[pos], puntuaciones[pos]) for pos in mejores]
+
+    def recuperar(self, sintomas_usuario: List[str]) -> List[Tuple[Caso, float]]:
+        """
+        Todos los casos en la forma de `recuperar_caso`: los candidatos con su
+        similitud exacta y, después, el resto con 0.0 (no se han puntuado).
+        """
+        motor = obtener_motor(self.base)
+        puntuaciones = motor.puntuar_posiciones(sintomas_usuario, self.candidatos(sintomas_usuario))
+        casos = self._casos
+        orden = sorted(puntuaciones, key=lambda pos: (-puntuaciones[pos], pos))
+        resultado = [(casos[pos], puntuaciones[pos]) for pos in orden]
+        resultado.extend((caso, 0.0) for pos, caso in enumerate(casos) if pos not in puntuaciones)
+        return resultado
+
+
+_MOTORES_LSH: "weakref.WeakKeyDictionary[BaseDeCasos, MotorLSH]" = weakref.WeakKeyDictionary()
+_MOTORES_LOCK = threading.Lock()
+
+
+def obtener_motor_lsh(base: BaseDeCasos) -> MotorLSH:
+    """Devuelve (creándolo con los parámetros por defecto si hace falta) el motor LSH de `base`."""
+    motor = _MOTORES_LSH.get(base)
+    if motor is None:
+        with _MOTORES_LOCK:
+            motor = _MOTORES_LSH.get(base)
+            if motor is None:
+                motor = MotorLSH(base)
+                _MOTORES_LSH[base] = motor
+    return motor
+
+
+def registrar_motor_lsh(motor: MotorLSH):
+    """Asocia a su base un motor LSH con otros parámetros (lo usará el modo "lsh" de razonar)."""
+    with _MOTORES_LOCK:
+        _MOTORES_LSH[motor.base] = motor
+
+
+# ======================================================
+# Informe de recall frente a la búsqueda exhaustiva
+# ======================================================
+def generar_consultas(base: BaseDeCasos, n: int, semilla: int = 42, prob_error: float = 0.3) -> List[List[str]]:
+    """
+    Consultas reproducibles sacadas de los casos: un subconjunto de sus síntomas,
+    algunos con una letra borrada (error de tipeo).
+    """
+    rng = random.Random(semilla)
+    casos = [c for c in base.casos if c.sintomas_normalizados]
+    consultas = []
+    for _ in range(n):
+        sintomas = list(rng.choice(casos).sintomas_normalizados)
+        consulta = rng.sample(sintomas, rng.randint(1, len(sintomas)))
+        for i, sintoma in enumerate(consulta):
+            if len(sintoma) > 3 and rng.random() < prob_error:
+                j = rng.randrange(len(sintoma))
+                consulta[i] = sintoma[:j] + sintoma[j + 1:]
+        consultas.append(consulta)
+    return consultas
+
+
+def _percentil_ms(tiempos_ns: List[int], p: int) -> float:
+    ordenados = sorted(tiempos_ns)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))] / 1e6 if ordenados else 0.0
+
+
+def informe_recall(motor: MotorLSH, consultas: List[List[str]], k: int = 5) -> Dict[str, float]:
+    """
+    Compara los `k` mejores de `motor` con los de la búsqueda exhaustiva
+    (MotorRecuperacion.mejores): recall@k, acierto del primero, candidatos
+    puntuados y latencias (p50/p90 en ms) de ambos.
+    """
+    exhaustivo = obtener_motor(motor.base)
+    motor.sincronizar()
+    exhaustivo.sincronizar()
+
+    # Cada búsqueda en su propia pasada y con la caché de similitudes vacía al empezar
+    resultados = {}
+    tiempos: Dict[str, List[int]] = {}
+    for nombre, buscador in (("exhaustivo", exhaustivo), ("lsh", motor)):
+        CACHE_SIMILITUD.limpiar()
+        resultados[nombre], tiempos[nombre] = [], []
+        for consulta in consultas:
+            inicio = time.perf_counter_ns()
+            resultados[nombre].append(buscador.mejores(consulta, k))
+            tiempos[nombre].append(time.perf_counter_ns() - inicio)
+
+    suma_recall = aciertos_primero = evaluadas = 0
+    for referencia, aproximado in zip(resultados["exhaustivo"], resultados["lsh"]):
+        if not referencia:
+            continue
+        evaluadas += 1
+        esperados = {id(caso) for caso, _ in referencia}
+        suma_recall += len(esperados.intersection(id(caso) for caso, _ in aproximado)) / len(esperados)
+        aciertos_primero += bool(aproximado) and aproximado[0][0] is referencia[0][0]
+    candidatos = sum(len(motor.candidatos(consulta)) for consulta in consultas)
+
+    n_casos = len(motor.base.casos)
+    return {
+        "consultas": len(consultas),
+        "casos": n_casos,
+        "bandas": motor.bandas,
+        "filas": motor.filas,
+        "max_candidatos": motor.max_candidatos,
+        "k": k,
+        f"recall@{k}": suma_recall / evaluadas if evaluadas else 0.0,
+        "acierto_primero": aciertos_primero / evaluadas if evaluadas else 0.0,
+        "candidatos_medios": candidatos / len(consultas) if consultas else 0.0,
+        "fraccion_base": candidatos / len(consultas) / n_casos if consultas and n_casos else 0.0,
+        "lsh_p50_ms": _percentil_ms(tiempos["lsh"], 50),
+        "lsh_p90_ms": _percentil_ms(tiempos["lsh"], 90),
+        "exhaustivo_p50_ms": _percentil_ms(tiempos["exhaustivo"], 50),
+        "exhaustivo_p90_ms": _percentil_ms(tiempos["exhaustivo"], 90),
+    }
+
+
+def main(argv=None) -> int:
+    # Importación diferida: benchmark importa el razonador, que a su vez importa este módulo
+    from base_conocimiento.almacenamiento import cargar_base
+    from motor_inferencia.benchmark import escalar_base
+
+    parser = argparse.ArgumentParser(
+        prog="python -m motor_inferencia.recuperacion_lsh",
+        description="Recall y latencia de la recuperación MinHash/LSH frente a la búsqueda exhaustiva."
+    )
+    parser.add_argument("--bandas", type=int, default=BANDAS, help="Bandas de la firma (más → más recall)")
+    parser.add_argument("--filas", type=int, default=FILAS, help="Valores por banda (más → menos candidatos)")
+    parser.add_argument("--max-candidatos", type=int, default=MAX_CANDIDATOS,
+                        help="Candidatos puntuados como máximo (0 = sin límite)")
+    parser.add_argument("-k", type=int, default=5, help="Casos comparados por consulta")
+    parser.add_argument("-n", "--consultas", type=int, default=300, help="Consultas sintéticas")
+    parser.add_argument("--escala", type=int, default=1, help="Copias de la base de casos (p. ej. 100)")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla de las consultas y del escalado")
+    args = parser.parse_args(argv)
+
+    base = cargar_base()
+    if args.escala > 1:
+        base = escalar_base(base, args.escala, args.semilla)
+    inicio = time.perf_counter()
+    motor = MotorLSH(base, args.bandas, args.filas, args.max_candidatos or None)
+    motor.sincronizar()
+    print(f"🔧 Firmas e índices LSH de {len(base.casos)} casos en {time.perf_counter() - inicio:.2f} s")
+
+    informe = informe_recall(motor, generar_consultas(base, args.consultas, args.semilla), args.k)
+    for clave, valor in informe.items():
+        print(f"   {clave:<20} {valor:.4f}" if isinstance(valor, float) else f"   {clave:<20} {valor}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# motor_inferencia/recuperacion_vectorial.py
+"""
+Recuperación de casos por vectores dispersos (TF-IDF o BM25).
+
+Cada caso es una bolsa de términos sacados de sus síntomas normalizados:
+las palabras y los trigramas de caracteres de cada palabra (así "insomio"
+sigue compartiendo términos con "insomnio"). Al cargar se construye la matriz
+dispersa término × caso con los pesos del esquema elegido (listas de
+posiciones y pesos por término), y una consulta se puntúa con un único
+producto matriz-vector disperso: solo se recorren las columnas de los términos
+de la consulta, sin alinear cadenas por pares.
+
+Las puntuaciones están en [0, 1] (coseno en TF-IDF; BM25 dividido por su
+máximo posible para la consulta) y los resultados tienen la forma de
+`recuperar_caso`: lista de (Caso, puntuación) de mayor a menor.
+"""
+import heapq
+import math
+import threading
+import weakref
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from base_conocimiento.modelos import BaseDeCasos, Caso
+from motor_inferencia.representacion import normalizar_lista
+
+ESQUEMAS = ("tfidf", "bm25")
+N_GRAMA = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def terminos(sintomas: List[str]) -> Counter:
+    """Frecuencia de los términos (palabras y trigramas de caracteres) de síntomas ya normalizados."""
+    frecuencias = Counter()
+    for sintoma in sintomas:
+        for palabra in sintoma.split():
+            frecuencias["p:" + palabra] += 1
+            marcada = f" {palabra} "
+            for i in range(len(marcada) - N_GRAMA + 1):
+                frecuencias["g:" + marcada[i:i + N_GRAMA]] += 1
+    return frecuencias
+
+
+class MotorVectorial:
+    """
+    Matriz dispersa término × caso de una BaseDeCasos con pesos TF-IDF o BM25.
+
+    TF-IDF: tf sublineal (1 + log tf), idf suavizado y vectores de caso
+    normalizados (L2); la puntuación es el coseno con la consulta.
+    BM25: pesos k1/b clásicos sobre cada caso; la puntuación se divide por la
+    que tendría un caso que saturase todos los términos de la consulta.
+
+    Los idf dependen de toda la base, así que ante cualquier cambio
+    (`base.version`) la matriz se reconstruye completa.
+    """
+
+    def __init__(self, base: BaseDeCasos, esquema: str = "bm25"):
+        if esquema not in ESQUEMAS:
+            raise ValueError(f"Esquema de recuperación desconocido: {esquema} (use {', '.join(ESQUEMAS)})")
+        self.base = base
+        self.esquema = esquema
+        self._lock = threading.Lock()
+        self._version = None
+        self._casos: List[Caso] = []
+        self._vocabulario: Dict[str, int] = {}
+        self._idf = array("d")
+        self._posiciones: List[array] = []      # término → posiciones de los casos
+        self._pesos: List[array] = []           # término → peso en cada uno de esos casos
+
+    # ------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------
+    def sincronizar(self):
+        """Reconstruye la matriz si la base cambió desde la última vez."""
+        if self._version == self.base.version:
+            return
+        with self._lock:
+            if self._version != self.base.version:
+                version = self.base.version
+                self._construir(list(self.base.casos))
+                self._version = version
+
+    def _construir(self, casos: List[Caso]):
+        documentos = [terminos(sorted(set(caso.sintomas_normalizados))) for caso in casos]
+        n = len(documentos)
+        vocabulario: Dict[str, int] = {}
+        posiciones: List[array] = []
+        frecuencias: List[array] = []
+        for pos, documento in enumerate(documentos):
+            for termino, tf in documento.items():
+                id_termino = vocabulario.get(termino)
+                if id_termino is None:
+                    id_termino = vocabulario[termino] = len(posiciones)
+                    posiciones.append(array("i"))
+                    frecuencias.append(array("d"))
+                posiciones[id_termino].append(pos)
+                frecuencias[id_termino].append(tf)
+
+        idf = array("d", (self._idf_de(len(p), n) for p in posiciones))
+        if self.esquema == "tfidf":
+            pesos = [
+                array("d", (idf[t] * (1.0 + math.log(tf)) for tf in frecuencias[t]))
+                for t in range(len(posiciones))
+            ]
+            normas = [0.0] * n
+            for t, columna in enumerate(posiciones):
+                for pos, peso in zip(columna, pesos[t]):
+                    normas[pos] += peso * peso
+            normas = [math.sqrt(x) or 1.0 for x in normas]
+            for t, columna in enumerate(posiciones):
+                pesos[t] = array("d", (peso / normas[pos] for pos, peso in zip(columna, pesos[t])))
+        else:
+            longitudes = [sum(documento.values()) for documento in documentos]
+            media = sum(longitudes) / n if n else 0.0
+            pesos = []
+            for t, columna in enumerate(posiciones):
+                pesos.append(array("d", (
+                    idf[t] * tf * (BM25_K1 + 1)
+                    / (tf + BM25_K1 * (1 - BM25_B + BM25_B * longitudes[pos] / media))
+                    for pos, tf in zip(columna, frecuencias[t])
+                )))
+
+        self._casos = casos
+        self._vocabulario = vocabulario
+        self._idf = idf
+        self._posiciones = posiciones
+        self._pesos = pesos
+
+    def _idf_de(self, df: int, n: int) -> float:
+        if self.esquema == "tfidf":
+            return math.log((1 + n) / (1 + df)) + 1.0
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    # ------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------
+    def puntuar(self, sintomas_usuario: List[str]) -> Dict[int, float]:
+        """{posición del caso: puntuación} de los casos que comparten algún término con la consulta."""
+        self.sincronizar()
+        consulta = terminos(sorted(set(normalizar_lista(sintomas_usuario))))
+        if not consulta:
+            return {}
+        with self._lock:
+            n = len(self._casos)
+            vocabulario, idf = self._vocabulario, self._idf
+            vector = []       # (id del término, peso en la consulta)
+            norma = 0.0
+            for termino, tf in consulta.items():
+                id_termino = vocabulario.get(termino)
+                if self.esquema == "tfidf":
+                    peso = (idf[id_termino] if id_termino is not None else self._idf_de(0, n)) * (1.0 + math.log(tf))
+                    norma += peso * peso
+                else:
+                    # Cada término de la consulta cuenta una vez; el máximo por término es idf·(k1 + 1)
+                    peso = 1.0
+                    norma += (idf[id_termino] if id_termino is not None else self._idf_de(0, n)) * (BM25_K1 + 1)
+                if id_termino is not None:
+                    vector.append((id_termino, peso))
+            if self.esquema == "tfidf":
+                norma = math.sqrt(norma)
+            if not norma:
+                return {}
+
+            acumulado: Dict[int, float] = {}
+            obtener = acumulado.get
+            for id_termino, peso in vector:
+                for pos, valor in zip(self._posiciones[id_termino], self._pesos[id_termino]):
+                    acumulado[pos] = obtener(pos, 0.0) + peso * valor
+            return {pos: min(valor / norma, 1.0) for pos, valor in acumulado.items() if valor > 0}
+
+    def mejores(self, sintomas_usuario: List[str], k: int) -> List[Tuple[Caso, float]]:
+        """Los `k` casos con mayor puntuación (> 0); a igual puntuación, el que va antes en la base."""
+        puntuaciones = self.puntuar(sintomas_usuario)
+        if k <= 0:
+            return []
+        mejores = heapq.nsmallest(k, puntuaciones, key=lambda pos: (-puntuaciones[pos], pos))
+        return [(self._casos[pos], puntuaciones[pos]) for pos in mejores]
+
+    def recuperar(self, sintomas_usuario: List[str]) -> List[Tuple[Caso, float]]:
+        """Todos los casos con su puntuación, ordenados de mayor a menor (orden estable)."""
+        puntuaciones = self.puntuar(sintomas_usuario)
+        casos = self._casos
+        orden = sorted(puntuaciones, key=lambda pos: (-puntuaciones[pos], pos))
+        resultado = [(casos[pos], puntuaciones[pos]) for pos in orden]
+        resultado.extend((caso, 0.0) for pos, caso in enumerate(casos) if pos not in puntuaciones)
+        return resultado
+
+
+_MOTORES_VECTORIALES: "weakref.WeakKeyDictionary[BaseDeCasos, Dict[str, MotorVectorial]]" = weakref.WeakKeyDictionary()
+_MOTORES_LOCK = threading.Lock()
+
+
+def obtener_motor_vectorial(base: BaseDeCasos, esquema: str = "bm25") -> MotorVectorial:
+    """Devuelve (creándolo si hace falta) el motor vectorial de `base` para el esquema indicado."""
+    motores = _MOTORES_VECTORIALES.get(base)
+    motor = motores.get(esquema) if motores is not None else None
+    if motor is None:
+        with _MOTORES_LOCK:
+            motores = _MOTORES_VECTORIALES.setdefault(base, {})
+            motor = motores.get(esquema)
+            if motor is None:
+                motor = motores[esquema] = MotorVectorial(base, esquema)
+    return motor
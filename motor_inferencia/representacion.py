@@ -1,8 +1,59 @@
 # motor_inferencia/representacion.py
-from typing import List
-import re
+"""
+Núcleo único de normalización de texto (minúsculas y sin tildes), compartido
+por la base de conocimiento, el motor y el módulo de explicación.
+
+Los caracteres latinos acentuados y las mayúsculas se resuelven con una tabla
+de traducción precalculada (un único str.translate); solo el texto con otros
+caracteres pasa por unicodedata. Los resultados se memorizan en cachés LRU.
+"""
+from functools import lru_cache
+from typing import Dict, List
 import unicodedata
 
+TAM_CACHE_NORMALIZACION = 65536
+
+
+def _plegar_unicode(texto: str) -> str:
+    """Quita las marcas diacríticas (NFD sin categoría Mn) y pasa a minúsculas."""
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', texto)
+        if unicodedata.category(c) != 'Mn'
+    ).lower()
+
+
+def _construir_tabla() -> Dict[int, str]:
+    """
+    Tabla carácter → versión plegada para las mayúsculas ASCII y los bloques
+    latinos (Latin-1, Latin extendido A/B y adicional) cuyo resultado es ASCII.
+    En esos bloques plegar carácter a carácter da lo mismo que plegar el texto entero.
+    """
+    tabla = {ord(c): c.lower() for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"}
+    for inicio, fin in ((0x00C0, 0x0250), (0x1E00, 0x1F00)):
+        for codigo in range(inicio, fin):
+            caracter = chr(codigo)
+            plegado = _plegar_unicode(caracter)
+            # Solo si da igual quitar tildes antes o después de pasar a minúsculas
+            if plegado.isascii() and plegado == _plegar_unicode(caracter.lower()):
+                tabla[codigo] = plegado
+    return tabla
+
+
+_TABLA_PLEGADO = _construir_tabla()
+
+
+@lru_cache(maxsize=TAM_CACHE_NORMALIZACION)
+def plegar_texto(texto: str) -> str:
+    """Texto en minúsculas y sin tildes/acentos; los espacios no se tocan."""
+    if texto.isascii():
+        return texto.lower()
+    plegado = texto.translate(_TABLA_PLEGADO)
+    if plegado.isascii():
+        return plegado
+    return _plegar_unicode(texto)
+
+
+@lru_cache(maxsize=TAM_CACHE_NORMALIZACION)
 def normalizar_texto(texto: str) -> str:
     """
     Normaliza un síntoma para comparación:
@@ -11,27 +62,25 @@ def normalizar_texto(texto: str) -> str:
     - quita espacios extra
     - mantiene la frase completa
     """
-    # Quitar tildes/acentos
-    texto = ''.join(
-        c for c in unicodedata.normalize('NFD', texto)
-        if unicodedata.category(c) != 'Mn'
-    )
-    # Pasar a minúsculas
-    texto = texto.lower()
-    # Eliminar espacios al inicio/fin y dobles espacios
-    texto = texto.strip()
-    texto = re.sub(r'\s+', ' ', texto)
-    return texto
+    return ' '.join(plegar_texto(texto).split())
+
 
 def normalizar_lista(sintomas: List[str]) -> List[str]:
     """
     Normaliza una lista de síntomas manteniendo frases.
     Evita errores si hay valores None o vacíos.
     """
+    normalizar = normalizar_texto
     lista_normalizada = []
     for s in sintomas:
         if isinstance(s, str) and s.strip():  # Solo procesar si es string y no está vacío
-            lista_normalizada.append(normalizar_texto(s))
+            lista_normalizada.append(normalizar(s))
         elif s is None:
             print("[WARNING] Valor None detectado en lista de síntomas.")
     return lista_normalizada
+
+
+def limpiar_cache():
+    """Vacía las cachés de normalización."""
+    plegar_texto.cache_clear()
+    normalizar_texto.cache_clear()
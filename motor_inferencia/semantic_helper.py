@@ -1,68 +1,56 @@
-import json
-import os
-import unicodedata
+import threading
+import weakref
 import re
-from difflib import get_close_matches, SequenceMatcher
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Sequence, Union
+
+from base_conocimiento.almacenamiento import cargar_base
+from base_conocimiento.registro_sinonimos import REGISTRO, RUTAS_FUSION
+from motor_inferencia.indice_sinonimos import IndiceCanonico, IndiceDifuso, IndiceSemantico
+from motor_inferencia.instrumentacion import LOG, METRICAS
+from motor_inferencia.representacion import plegar_texto
 
 # === CONFIGURACIÓN ===
-_RUTA_CASOS = os.path.join("base_conocimiento", "casos.json")
-_RUTA_SINONIMOS = os.path.join("base_conocimiento", "sinonimos_ontologia_enriquecido.json")
-_RUTA_SINONIMOS_BACKUP = os.path.join("base_conocimiento", "sinonimos_ontologia.json")
 _DEFAULT_THRESHOLD = 0.65  # similitud mínima aceptada
 
 
 # === FUNCIÓN DE CARGA DE SINÓNIMOS ===
 def cargar_sinonimos():
     """
-    Carga los sinónimos desde los archivos enriquecido y respaldo.
-    Si ambos existen, los fusiona (el enriquecido tiene prioridad).
+    Devuelve los sinónimos fusionados (original + enriquecido, el enriquecido
+    tiene prioridad) desde el registro compartido del proceso.
+    Los archivos solo se vuelven a leer si cambiaron en disco.
     """
-    archivos = [_RUTA_SINONIMOS_BACKUP, _RUTA_SINONIMOS]
-    sinonimos_final = {}
-    cargados = []
-
-    for ruta in archivos:
-        if os.path.exists(ruta):
-            try:
-                with open(ruta, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                sinonimos_final.update(data)
-                cargados.append(f"{ruta} ({len(data)} entradas)")
-            except Exception as e:
-                print(f"❌ Error al cargar {ruta}: {e}")
+    return REGISTRO.obtener(RUTAS_FUSION).entradas
 
-    if not cargados:
-        print("⚠️ No se encontró ningún archivo de sinónimos.")
-        return {}
 
-    print(f"✅ Sinónimos cargados y fusionados desde:\n   " + "\n   ".join(cargados))
-    print(f"📚 Total combinados: {len(sinonimos_final)} entradas únicas")
-    return sinonimos_final
+def obtener_indice_canonico() -> IndiceCanonico:
+    """Índice de canonicalización de la tabla fusionada actual (se construye una vez por tabla)."""
+    tabla = REGISTRO.obtener(RUTAS_FUSION)
+    return tabla.derivado("indice_canonico", lambda t: IndiceCanonico(t.entradas))
 
 
-# === CARGAR SINÓNIMOS AL INICIO ===
-SINONIMOS = cargar_sinonimos()
+def obtener_indice_difuso() -> IndiceDifuso:
+    """Índice difuso sobre las claves de la tabla fusionada actual."""
+    tabla = REGISTRO.obtener(RUTAS_FUSION)
+    return tabla.derivado("indice_difuso", lambda t: IndiceDifuso(list(t.entradas)))
 
 
 # === UTILIDADES ===
 def preprocesar_texto(texto: str) -> str:
-    """Convierte texto a minúsculas y elimina acentos."""
-    texto = texto.lower()
-    texto = ''.join(
-        c for c in unicodedata.normalize('NFD', texto)
-        if unicodedata.category(c) != 'Mn'
-    )
-    return texto.strip()
+    """Convierte texto a minúsculas y elimina acentos (núcleo memorizado de representacion)."""
+    return plegar_texto(texto).strip()
 
 
-def normalizar_sinonimos(frase: str) -> str:
+def normalizar_sinonimos(frase: str, indice: IndiceCanonico = None) -> str:
     """Devuelve la versión canónica si coincide parcial o totalmente con un sinónimo."""
+    if indice is None:
+        indice = obtener_indice_canonico()
     frase_norm = preprocesar_texto(frase)
-    for clave, canonico in SINONIMOS.items():
-        palabras_clave = clave.split()
-        if all(p in frase_norm for p in palabras_clave):
-            return canonico
-    return frase_norm
+    canonico = indice.buscar(frase_norm)
+    METRICAS.acierto("indice.canonico", canonico is not None)
+    return canonico if canonico is not None else frase_norm
 
 
 def similitud_lexica(a: str, b: str) -> float:
@@ -84,10 +72,25 @@ def similitud_combinada(a: str, b: str) -> float:
     return (sim_palabras * 0.7) + (sim_caracteres * 0.3)
 
 
-def buscar_sinonimo_difuso(frase: str, lista_claves: list, umbral: float) -> str:
-    """Busca coincidencia difusa con sinónimos (por caracteres)."""
-    match = get_close_matches(frase, lista_claves, n=1, cutoff=umbral)
-    return match[0] if match else None
+@lru_cache(maxsize=4)
+def _indice_de_claves(claves: tuple) -> IndiceDifuso:
+    """Índice difuso de una lista de claves (se reutiliza mientras las claves no cambien)."""
+    return IndiceDifuso(claves)
+
+
+def buscar_sinonimo_difuso(frase: str, lista_claves: Union[Sequence[str], IndiceDifuso], umbral: float) -> str:
+    """
+    Busca coincidencia difusa con sinónimos (por caracteres).
+    Mismo resultado que get_close_matches(frase, lista_claves, n=1, cutoff=umbral).
+    `lista_claves` puede ser la lista de claves o, para no volver a indexarla, un IndiceDifuso.
+    """
+    if isinstance(lista_claves, IndiceDifuso):
+        indice = lista_claves
+    else:
+        indice = _indice_de_claves(tuple(lista_claves))
+    clave = indice.mejor_clave(frase, umbral)
+    METRICAS.acierto("indice.difuso", clave is not None)
+    return clave
 
 
 def es_coincidencia_valida(frase_usuario: str, sintoma: str, similitud: float) -> bool:
@@ -115,21 +118,50 @@ def es_coincidencia_valida(frase_usuario: str, sintoma: str, similitud: float) -
     return False
 
 
-# === CARGA DE CASOS ===
-def cargar_sintomas_desde_casos():
-    """Lee todos los síntomas únicos de base_conocimiento/casos.json."""
-    if not os.path.exists(_RUTA_CASOS):
-        print(f"⚠️ No se encontró {_RUTA_CASOS}")
-        return []
+# === VOCABULARIO DE SÍNTOMAS ===
+_BASE_POR_DEFECTO = None
+_BASE_LOCK = threading.Lock()
+
+
+def _base_por_defecto():
+    """Base de casos usada cuando el llamador no aporta la suya (se carga una sola vez)."""
+    global _BASE_POR_DEFECTO
+    if _BASE_POR_DEFECTO is None:
+        with _BASE_LOCK:
+            if _BASE_POR_DEFECTO is None:
+                _BASE_POR_DEFECTO = cargar_base()
+    return _BASE_POR_DEFECTO
 
-    with open(_RUTA_CASOS, "r", encoding="utf-8") as f:
-        casos = json.load(f)
 
-    sintomas = set()
-    for caso in casos:
-        for s in caso.get("sintomas", []):
-            sintomas.add(preprocesar_texto(s))
-    return list(sintomas)
+def cargar_sintomas_desde_casos(base=None):
+    """
+    Devuelve los síntomas únicos (normalizados) de la base de casos en memoria.
+    El vocabulario lo mantiene BaseDeCasos y se actualiza al agregar casos.
+    """
+    if base is None:
+        base = _base_por_defecto()
+    return base.sintomas_unicos()
+
+
+_INDICES_SEMANTICOS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def obtener_indice_semantico(base=None) -> IndiceSemantico:
+    """
+    Índice de los síntomas de la base para la coincidencia semántica general.
+    Se reconstruye solo cuando la base cambia (BaseDeCasos.version).
+    """
+    if base is None:
+        base = _base_por_defecto()
+    entrada = _INDICES_SEMANTICOS.get(base)
+    if entrada is None or entrada[0] != base.version:
+        with _BASE_LOCK:
+            entrada = _INDICES_SEMANTICOS.get(base)
+            if entrada is None or entrada[0] != base.version:
+                version = base.version
+                entrada = (version, IndiceSemantico(cargar_sintomas_desde_casos(base), preprocesar_texto))
+                _INDICES_SEMANTICOS[base] = entrada
+    return entrada[1]
 
 
 # === DETECCIÓN DE RELACIONES SEMÁNTICAS ===
@@ -152,12 +184,18 @@ def detectar_relacion(frase: str):
 
 
 # === FUNCIÓN PRINCIPAL ===
-def buscar_equivalente_semantico(frase: str, umbral: float = _DEFAULT_THRESHOLD):
+def buscar_equivalente_semantico(frase: str, umbral: float = _DEFAULT_THRESHOLD, base=None):
     """
     Busca coincidencias entre la frase del usuario y los síntomas base.
+    `base` es la BaseDeCasos en memoria de la que salen los síntomas base
+    (si no se indica, se usa la base por defecto, cargada una sola vez).
     Devuelve lista de (frase_usuario, sintoma_detectado, similitud).
     """
+    with METRICAS.medir("semantico"):
+        return _buscar_equivalente_semantico(frase, umbral, base)
+
 
+def _buscar_equivalente_semantico(frase: str, umbral: float, base):
     EXPRESIONES_BIENESTAR = [
         "estoy bien", "me siento bien", "todo bien", "tranquilo",
         "feliz", "contento", "todo normal", "sin problemas",
@@ -169,14 +207,17 @@ def buscar_equivalente_semantico(frase: str, umbral: float = _DEFAULT_THRESHOLD)
 
     frase_norm = preprocesar_texto(frase)
     if any(exp in frase_norm for exp in EXPRESIONES_BIENESTAR):
-        print(f"[SEMANTIC LOG] Frase de bienestar detectada: '{frase}' → sin síntomas relevantes.")
+        METRICAS.contar("semantico.bienestar")
+        LOG.debug("Frase de bienestar detectada: '%s' → sin síntomas relevantes.", frase)
         return []
 
-    sintomas_base = cargar_sintomas_desde_casos()
-    if not sintomas_base:
+    indice_semantico = obtener_indice_semantico(base)
+    if not len(indice_semantico):
         return []
 
-    lista_claves = list(SINONIMOS.keys())
+    sinonimos = cargar_sinonimos()
+    indice = obtener_indice_canonico()
+    indice_difuso = obtener_indice_difuso()
     partes = [p.strip() for p in re.split(r"[,.]", frase) if p.strip()]
     coincidencias = []
 
@@ -184,50 +225,62 @@ def buscar_equivalente_semantico(frase: str, umbral: float = _DEFAULT_THRESHOLD)
         parte_norm = preprocesar_texto(parte)
 
         # Exacta/parcial
-        canonico = normalizar_sinonimos(parte_norm)
+        with METRICAS.medir("semantico.exacta"):
+            canonico = normalizar_sinonimos(parte_norm, indice)
         if canonico != parte_norm:
-            print(f"[SEMANTIC LOG] Exacto/parcial: '{parte}' → '{canonico}'")
+            METRICAS.contar("semantico.exacta")
+            LOG.debug("Exacto/parcial: '%s' → '%s'", parte, canonico)
             coincidencias.append((parte, canonico, 1.0))
             continue
 
         # Relacional
-        relaciones = detectar_relacion(parte_norm)
-        if relaciones:
-            for x, tipo, y in relaciones:
-                x_norm = normalizar_sinonimos(x)
-                y_norm = normalizar_sinonimos(y)
-                print(f"[SEMANTIC LOG] Relacional: '{x}' ({tipo}) '{y}'")
+        with METRICAS.medir("semantico.relacional"):
+            relaciones = detectar_relacion(parte_norm)
+            relacionadas = [
+                (x, tipo, y, normalizar_sinonimos(x, indice), normalizar_sinonimos(y, indice))
+                for x, tipo, y in relaciones
+            ]
+        if relacionadas:
+            METRICAS.contar("semantico.relacional")
+            for x, tipo, y, x_norm, y_norm in relacionadas:
+                LOG.debug("Relacional: '%s' (%s) '%s'", x, tipo, y)
                 coincidencias.append((parte, f"{x_norm} [{tipo}] {y_norm}", 0.9))
             continue
 
         # Difusa
-        difuso = buscar_sinonimo_difuso(parte_norm, lista_claves, umbral)
+        with METRICAS.medir("semantico.difusa"):
+            difuso = buscar_sinonimo_difuso(parte_norm, indice_difuso, umbral)
+            if difuso:
+                canonico = sinonimos[difuso]
+                sim = similitud_combinada(parte_norm, canonico)
+                valido = es_coincidencia_valida(parte_norm, canonico, sim)
         if difuso:
-            canonico = SINONIMOS[difuso]
-            sim = similitud_combinada(parte_norm, canonico)
-            if es_coincidencia_valida(parte_norm, canonico, sim):
-                print(f"[SEMANTIC LOG] Difuso válido: '{parte}' ≈ '{canonico}' ({sim:.2f})")
+            if valido:
+                METRICAS.contar("semantico.difusa")
+                LOG.debug("Difuso válido: '%s' ≈ '%s' (%.2f)", parte, canonico, sim)
                 coincidencias.append((parte, canonico, sim))
             else:
-                print(f"[SEMANTIC LOG] ❌ Difuso descartado: '{parte}' ≠ '{canonico}' ({sim:.2f})")
+                METRICAS.contar("semantico.difusa_descartada")
+                LOG.debug("❌ Difuso descartado: '%s' ≠ '%s' (%.2f)", parte, canonico, sim)
             continue
 
         # Semántica general
-        mejor_sintoma, mejor_sim = None, 0.0
-        for sintoma in sintomas_base:
-            sim = similitud_combinada(parte_norm, sintoma)
-            if sim > mejor_sim:
-                mejor_sintoma, mejor_sim = sintoma, sim
-
-        if es_coincidencia_valida(parte_norm, mejor_sintoma, mejor_sim):
-            print(f"[SEMANTIC LOG] Coincidencia semántica: '{parte}' → '{mejor_sintoma}' ({mejor_sim:.2f})")
+        # (la mayor similitud_combinada con los síntomas base; en empate, el primero)
+        with METRICAS.medir("semantico.general"):
+            mejor_sintoma, mejor_sim = indice_semantico.mejor(preprocesar_texto(parte_norm))
+            valido = es_coincidencia_valida(parte_norm, mejor_sintoma, mejor_sim)
+
+        if valido:
+            METRICAS.contar("semantico.general")
+            LOG.debug("Coincidencia semántica: '%s' → '%s' (%.2f)", parte, mejor_sintoma, mejor_sim)
             coincidencias.append((parte, mejor_sintoma, mejor_sim))
         else:
-            print(f"[SEMANTIC LOG] ❌ Coincidencia descartada: '{parte}' ≠ '{mejor_sintoma}' ({mejor_sim:.2f})")
+            METRICAS.contar("semantico.general_descartada")
+            LOG.debug("❌ Coincidencia descartada: '%s' ≠ '%s' (%.2f)", parte, mejor_sintoma, mejor_sim)
 
     # --- Limpieza final ---
     coincidencias = [c for c in coincidencias if c[1] is not None]
     if not coincidencias:
-        print("[SEMANTIC LOG] ⚠️ No se detectaron coincidencias válidas.")
+        LOG.debug("⚠️ No se detectaron coincidencias válidas.")
 
     return coincidencias
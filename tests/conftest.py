@@ -0,0 +1,37 @@
+# tests/conftest.py
+"""
+Configuración común de las pruebas (python -m pytest desde la raíz del proyecto).
+Las pruebas usan bases de casos pequeñas en directorios temporales: nunca
+escriben en base_conocimiento/.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from base_conocimiento.modelos import Caso  # noqa: E402
+
+
+def nuevo_caso(id_caso, sintomas=("tristeza", "insomnio"), causa="depresión", **campos) -> Caso:
+    """Caso mínimo para las pruebas."""
+    return Caso.from_dict(dict(
+        {"id_caso": id_caso, "sintomas": list(sintomas), "posible_causa": causa,
+         "estrategias": ["psicoeducación"], "riesgo": "bajo"},
+        **campos,
+    ))
+
+
+@pytest.fixture
+def ruta_casos(tmp_path):
+    """casos.json temporal con tres casos."""
+    ruta = tmp_path / "casos.json"
+    casos = [
+        nuevo_caso(1, ["tristeza", "insomnio"], "depresión"),
+        nuevo_caso(2, ["miedo", "palpitaciones"], "ansiedad", riesgo="medio"),
+        nuevo_caso(3, ["fatiga", "apatía"], "agotamiento", estrategias=["descanso", "rutinas"]),
+    ]
+    ruta.write_text(json.dumps([c.to_dict() for c in casos], ensure_ascii=False), encoding="utf-8")
+    return str(ruta)
@@ -0,0 +1,92 @@
+# tests/test_almacen_sqlite.py
+"""Almacén SQLite: ida y vuelta con la base JSON, escrituras y detalle perezoso tras reescribir."""
+import pickle
+
+import pytest
+
+from base_conocimiento.almacen_sqlite import AlmacenSQLite
+from base_conocimiento.almacenamiento import AlmacenCasos, abrir_almacen, cargar_base, guardar_caso
+from conftest import nuevo_caso
+
+
+def _dicts(base):
+    return [c.to_dict() for c in base.listar_casos()]
+
+
+@pytest.fixture
+def base_json(ruta_casos):
+    return cargar_base(ruta_casos)
+
+
+@pytest.fixture
+def almacen(tmp_path, base_json):
+    almacen = AlmacenSQLite(str(tmp_path / "casos.db"))
+    almacen.guardar_base(base_json)
+    return almacen
+
+
+def test_ida_y_vuelta_con_la_base_json(almacen, base_json):
+    base = almacen.cargar()
+    assert _dicts(base) == _dicts(base_json)
+    assert base.sintomas_unicos() == base_json.sintomas_unicos()
+    assert isinstance(abrir_almacen(almacen.ruta), AlmacenSQLite)
+    assert _dicts(cargar_base(almacen.ruta)) == _dicts(base_json)
+
+
+def test_consultas_indexadas_igual_que_la_base(almacen, base_json):
+    for sintoma in base_json.sintomas_unicos():
+        esperados = [c.id_caso for c in base_json.casos_con_sintoma(sintoma)]
+        assert [c.id_caso for c in almacen.casos_con_sintoma(sintoma)] == esperados
+    assert [c.id_caso for c in almacen.casos_con_riesgo("Medio ")] == [2]
+    assert almacen.buscar_por_id(3).to_dict() == base_json.buscar_por_id(3).to_dict()
+    assert almacen.buscar_por_id(99) is None
+
+
+def test_altas_y_actualizaciones(almacen):
+    nuevo = nuevo_caso(None, ["culpa"])
+    almacen.agregar(nuevo)
+    assert nuevo.id_caso == 4
+    with pytest.raises(ValueError):
+        almacen.agregar(nuevo_caso(2))
+    guardar_caso(nuevo_caso(2, ["ira"], "enojo"), almacen.ruta, operacion="actualizar")
+    base = almacen.cargar()
+    assert [c.id_caso for c in base.casos] == [1, 2, 3, 4]
+    assert base.buscar_por_id(2).posible_causa == "enojo"
+    assert [c.id_caso for c in almacen.casos_con_sintoma("palpitaciones")] == []
+
+
+def test_detalle_perezoso_sigue_valido_tras_guardar_base(almacen):
+    anterior = almacen.cargar()
+    almacen.guardar_base(almacen.cargar())          # reinserta todas las filas con pos nuevas
+    caso = anterior.buscar_por_id(3)
+    assert caso.estrategias == ("descanso", "rutinas")
+    assert caso.recomendacion_general == "Sin recomendación adicional."
+
+
+def test_detalle_de_un_caso_borrado_falla(almacen, base_json):
+    anterior = almacen.cargar()
+    base_json.casos = [c for c in base_json.casos if c.id_caso != 3]
+    base_json._reindexar()
+    almacen.guardar_base(base_json)
+    with pytest.raises(LookupError):
+        anterior.buscar_por_id(3).estrategias
+    assert anterior.buscar_por_id(1).estrategias == ("psicoeducación",)
+
+
+def test_caso_perezoso_se_serializa_completo(almacen, base_json):
+    caso = almacen.cargar().buscar_por_id(3)
+    copia = pickle.loads(pickle.dumps(caso))
+    assert type(copia).__name__ == "Caso"
+    assert copia.to_dict() == base_json.buscar_por_id(3).to_dict()
+
+
+def test_almacen_es_abstracto():
+    with pytest.raises(TypeError):
+        AlmacenCasos()
+
+    class Incompleto(AlmacenCasos):
+        def cargar(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Incompleto()
@@ -0,0 +1,164 @@
+# tests/test_almacenamiento.py
+"""Diario de casos: altas, actualizaciones, reproducción, compactación e ids repetidos."""
+import json
+import os
+
+import pytest
+
+from base_conocimiento import almacenamiento
+from base_conocimiento.almacenamiento import (
+    cargar_base,
+    compactar,
+    guardar_caso,
+    registrar_caso,
+    reproducir_diario,
+    ruta_diario,
+)
+from base_conocimiento.modelos import BaseDeCasos
+from conftest import nuevo_caso
+from motor_inferencia.representacion import normalizar_lista
+
+
+def _ids_de(casos):
+    return [c.id_caso for c in casos]
+
+
+def _ids(base):
+    return _ids_de(base.listar_casos())
+
+
+def _escribir_diario(ruta, entradas, final=""):
+    with open(ruta_diario(ruta), "w", encoding="utf-8") as f:
+        for op, caso in entradas:
+            f.write(json.dumps({"op": op, "caso": caso.to_dict()}, ensure_ascii=False) + "\n")
+        f.write(final)
+
+
+def test_alta_va_al_diario_sin_reescribir_el_archivo(ruta_casos):
+    contenido = open(ruta_casos, encoding="utf-8").read()
+    guardar_caso(nuevo_caso(10, ["culpa"]), ruta_casos)
+    assert open(ruta_casos, encoding="utf-8").read() == contenido
+    assert os.path.exists(ruta_diario(ruta_casos))
+    base = cargar_base(ruta_casos)
+    assert _ids(base) == [1, 2, 3, 10]
+    assert base.casos_con_sintoma("culpa")[0].id_caso == 10
+
+
+def test_alta_sin_id_recibe_el_siguiente_libre(ruta_casos):
+    primero, segundo = nuevo_caso(None), nuevo_caso(None)
+    guardar_caso(primero, ruta_casos)
+    guardar_caso(segundo, ruta_casos)
+    assert (primero.id_caso, segundo.id_caso) == (4, 5)
+    assert _ids(cargar_base(ruta_casos)) == [1, 2, 3, 4, 5]
+
+
+def test_alta_con_id_existente_falla_sin_tocar_el_diario(ruta_casos):
+    guardar_caso(nuevo_caso(7), ruta_casos)
+    tamano = os.path.getsize(ruta_diario(ruta_casos))
+    for id_repetido in (2, 7):
+        with pytest.raises(ValueError):
+            guardar_caso(nuevo_caso(id_repetido), ruta_casos)
+    assert os.path.getsize(ruta_diario(ruta_casos)) == tamano
+    assert _ids(cargar_base(ruta_casos)) == [1, 2, 3, 7]
+
+
+def test_actualizacion_conserva_la_posicion(ruta_casos):
+    guardar_caso(nuevo_caso(2, ["insomnio"], "estrés"), ruta_casos, operacion="actualizar")
+    base = cargar_base(ruta_casos)
+    assert _ids(base) == [1, 2, 3]
+    assert base.buscar_por_id(2).posible_causa == "estrés"
+    assert [c.id_caso for c in base.casos_con_sintoma("palpitaciones")] == []
+    assert [c.id_caso for c in base.casos_con_sintoma("insomnio")] == [1, 2]
+
+
+def test_reproduccion_idempotente_y_colisiones_como_actualizacion(ruta_casos, capsys):
+    _escribir_diario(ruta_casos, [
+        ("agregar", nuevo_caso(4, ["culpa"])),
+        ("agregar", nuevo_caso(4, ["culpa"])),                    # repetida: se ignora
+        ("agregar", nuevo_caso(1, ["miedo"], "fobia")),           # id existente distinto: actualización
+        ("actualizar", nuevo_caso(4, ["culpa", "vergüenza"])),
+        ("agregar", nuevo_caso(5, ["apatía"])),
+        ("actualizar", nuevo_caso(9, ["ira"])),                   # actualizar algo inexistente lo agrega
+    ])
+    base = cargar_base(ruta_casos)
+    avisos = capsys.readouterr().out
+    # Solo la entrada con id 1 choca; el alta repetida idéntica del 4 no avisa
+    assert avisos.count("se aplica como actualización") == 1 and "el id 1 ya existe" in avisos
+    assert _ids(base) == [1, 2, 3, 4, 5, 9]
+    assert base.buscar_por_id(1).posible_causa == "fobia"
+    assert base.buscar_por_id(4).sintomas == ("culpa", "verguenza")   # normalizados al reproducir
+    assert [c.id_caso for c in base.casos_con_sintoma("miedo")] == [1, 2]
+    assert [c.id_caso for c in base.casos_con_sintoma("tristeza")] == []
+
+    # Repetir el diario sobre la base ya cargada deja los mismos casos
+    antes = [c.to_dict() for c in base.casos]
+    reproducir_diario(base, ruta_diario(ruta_casos))
+    assert [c.to_dict() for c in base.casos] == antes
+
+
+def test_reproduccion_igual_que_aplicar_entrada_por_entrada(ruta_casos):
+    entradas = [
+        ("agregar", nuevo_caso(4, ["culpa"])),
+        ("actualizar", nuevo_caso(2, ["ira"])),
+        ("agregar", nuevo_caso(5, ["apatía"])),
+        ("actualizar", nuevo_caso(4, ["soledad"])),
+        ("agregar", nuevo_caso(3, ["miedo"], "fobia")),
+    ]
+    _escribir_diario(ruta_casos, entradas)
+    reproducida = cargar_base(ruta_casos)
+
+    esperada = cargar_base(ruta_casos, usar_diario=False)
+    for op, caso in entradas:
+        caso.sintomas = normalizar_lista(caso.sintomas)
+        if op == "agregar" and esperada.buscar_por_id(caso.id_caso) is None:
+            esperada.agregar_caso(caso)
+        else:
+            esperada.actualizar_caso(caso)
+    assert [c.to_dict() for c in reproducida.casos] == [c.to_dict() for c in esperada.casos]
+    assert reproducida.sintomas_unicos() == esperada.sintomas_unicos()
+    for sintoma in esperada.sintomas_unicos():
+        assert _ids_de(reproducida.casos_con_sintoma(sintoma)) == _ids_de(esperada.casos_con_sintoma(sintoma))
+
+
+def test_linea_cortada_se_ignora_y_la_siguiente_alta_empieza_linea_nueva(ruta_casos, capsys):
+    _escribir_diario(ruta_casos, [("agregar", nuevo_caso(4))], final='{"op": "agregar", "caso": {"id_')
+    assert _ids(cargar_base(ruta_casos)) == [1, 2, 3, 4]
+    assert "ignorada" in capsys.readouterr().out
+    guardar_caso(nuevo_caso(None, ["culpa"]), ruta_casos)
+    assert _ids(cargar_base(ruta_casos)) == [1, 2, 3, 4, 5]
+
+
+def test_compactacion_al_superar_el_tamano_maximo(ruta_casos, monkeypatch):
+    guardar_caso(nuevo_caso(4), ruta_casos)
+    assert os.path.exists(ruta_diario(ruta_casos))
+    monkeypatch.setattr(almacenamiento, "TAM_MAX_DIARIO", 1)
+    guardar_caso(nuevo_caso(5), ruta_casos)
+    assert not os.path.exists(ruta_diario(ruta_casos))
+    with open(ruta_casos, encoding="utf-8") as f:
+        assert [c["id_caso"] for c in json.load(f)] == [1, 2, 3, 4, 5]
+    assert _ids(cargar_base(ruta_casos)) == [1, 2, 3, 4, 5]
+
+
+def test_compactacion_interrumpida_no_duplica_casos(ruta_casos):
+    registrar_caso(nuevo_caso(4), ruta_casos)
+    registrar_caso(nuevo_caso(1, ["miedo"]), ruta_casos, operacion="actualizar")
+    diario = open(ruta_diario(ruta_casos), encoding="utf-8").read()
+    assert compactar(ruta_casos) == 4
+    # Como si el proceso muriera después de reescribir el archivo y antes de borrar el diario
+    with open(ruta_diario(ruta_casos), "w", encoding="utf-8") as f:
+        f.write(diario)
+    base = cargar_base(ruta_casos)
+    assert _ids(base) == [1, 2, 3, 4]
+    assert base.buscar_por_id(1).sintomas == ("miedo",)
+
+
+def test_base_rechaza_ids_repetidos_sin_modificarse():
+    base = BaseDeCasos()
+    base.agregar_casos([nuevo_caso(1), nuevo_caso(2)])
+    version = base.version
+    with pytest.raises(ValueError):
+        base.agregar_caso(nuevo_caso(1))
+    with pytest.raises(ValueError):
+        base.agregar_casos([nuevo_caso(3), nuevo_caso(3)])
+    assert _ids(base) == [1, 2] and base.version == version
+    assert base.buscar_por_id(3) is None
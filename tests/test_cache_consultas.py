@@ -0,0 +1,87 @@
+# tests/test_cache_consultas.py
+"""Caché de consultas: aciertos, invalidación al cambiar la base y explicaciones reutilizadas."""
+import pytest
+
+from base_conocimiento.modelos import BaseDeCasos
+from conftest import nuevo_caso
+from motor_inferencia.cache_consultas import CACHE_CONSULTAS, CacheConsultas
+from motor_inferencia.razonador import razonar
+
+
+@pytest.fixture
+def base():
+    base = BaseDeCasos()
+    base.agregar_casos([
+        nuevo_caso(1, ["tristeza", "insomnio", "fatiga"], "depresión"),
+        nuevo_caso(2, ["miedo", "palpitaciones"], "ansiedad"),
+    ])
+    return base
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia():
+    CACHE_CONSULTAS.limpiar()
+    yield
+    CACHE_CONSULTAS.limpiar()
+
+
+def test_la_misma_consulta_se_sirve_de_la_cache(base):
+    primero = razonar(base, ["insomnio", "tristeza"])
+    assert primero[0].id_caso == 1
+    # El orden de los síntomas no cambia la clave
+    assert razonar(base, ["tristeza", "insomnio"]) is primero
+    assert CACHE_CONSULTAS.estadisticas()["aciertos"] == 1
+    # Otro umbral u otro modo son otra consulta
+    razonar(base, ["tristeza", "insomnio"], umbral=0.5)
+    razonar(base, ["tristeza", "insomnio"], modo="tfidf")
+    assert CACHE_CONSULTAS.estadisticas()["fallos"] == 3
+
+
+def test_agregar_o_actualizar_casos_invalida(base):
+    assert razonar(base, ["tristeza", "insomnio"])[0].id_caso == 1
+    base.agregar_caso(nuevo_caso(3, ["tristeza", "insomnio"], "duelo"))
+    assert CACHE_CONSULTAS.obtener(base, ["tristeza", "insomnio"], 0.6) is None
+    assert CACHE_CONSULTAS.estadisticas()["invalidaciones"] == 1
+    assert razonar(base, ["tristeza", "insomnio"])[0].id_caso == 3
+
+    base.actualizar_caso(nuevo_caso(3, ["miedo"], "fobia"))
+    resultado = razonar(base, ["tristeza", "insomnio"])
+    assert resultado[0].id_caso == 1
+    assert CACHE_CONSULTAS.estadisticas()["invalidaciones"] == 2
+
+
+def test_resultado_calculado_con_una_version_antigua_no_se_guarda(base):
+    cache = CacheConsultas()
+    version = base.version
+    base.agregar_caso(nuevo_caso(3))
+    cache.guardar(base, ["tristeza"], 0.6, ("obsoleto", 1.0, None), version=version)
+    assert cache.obtener(base, ["tristeza"], 0.6) is None
+    cache.guardar(base, ["tristeza"], 0.6, ("vigente", 1.0, None), version=base.version)
+    assert cache.obtener(base, ["tristeza"], 0.6).resultado[0] == "vigente"
+
+
+def test_cada_base_tiene_su_tabla_y_la_capacidad_se_respeta(base):
+    cache = CacheConsultas(capacidad=2)
+    otra = BaseDeCasos()
+    cache.guardar(base, ["a"], 0.6, "base")
+    cache.guardar(otra, ["a"], 0.6, "otra")
+    assert cache.obtener(base, ["a"], 0.6).resultado == "base"
+    assert cache.obtener(otra, ["a"], 0.6).resultado == "otra"
+    cache.guardar(base, ["b"], 0.6, "b")
+    cache.obtener(base, ["a"], 0.6)                   # ["a"] pasa a ser la más reciente
+    cache.guardar(base, ["c"], 0.6, "c")              # desaloja ["b"]
+    assert cache.obtener(base, ["b"], 0.6) is None
+    assert cache.obtener(base, ["a"], 0.6) is not None
+
+
+def test_explicacion_se_genera_una_vez_por_formato(base):
+    sintomas = ["tristeza", "insomnio"]
+    caso, similitud, _ = razonar(base, sintomas)
+    texto = CACHE_CONSULTAS.explicacion(base, sintomas, caso, similitud)
+    assert CACHE_CONSULTAS.explicacion(base, sintomas, caso, similitud) is texto
+    markdown = CACHE_CONSULTAS.explicacion(base, sintomas, caso, similitud, formato="markdown")
+    assert markdown is not texto
+    assert CACHE_CONSULTAS.estadisticas()["explicaciones_reutilizadas"] == 1
+    # Otra similitud (no la que dejó razonar) no reutiliza la explicación guardada
+    CACHE_CONSULTAS.explicacion(base, sintomas, caso, similitud / 2)
+    assert CACHE_CONSULTAS.estadisticas()["explicaciones_reutilizadas"] == 1
@@ -0,0 +1,101 @@
+# tests/test_cache_similitud.py
+"""Caché de similitudes: resultado exacto, desalojo LRU, persistencia y solo pares del vocabulario."""
+import json
+from difflib import SequenceMatcher
+
+from base_conocimiento.modelos import BaseDeCasos
+from conftest import nuevo_caso
+from motor_inferencia.cache_similitud import CACHE_SIMILITUD, CacheSimilitud, supera_umbral
+from motor_inferencia.recuperacion import MotorRecuperacion
+
+PARES = [
+    ("tristeza", "tristeza persistente"),
+    ("insomnio", "insomnio de conciliacion"),
+    ("miedo", "palpitaciones"),
+    ("ansiedad", "ansiedad intensa"),
+    ("", ""),
+    ("a", ""),
+]
+
+
+def test_supera_igual_que_ratio_y_solo_guarda_los_pares_alineados():
+    cache = CacheSimilitud()
+    for a, b in PARES:
+        for umbral in (0.3, 0.6, 0.9):
+            esperado = SequenceMatcher(None, a, b).ratio() >= umbral
+            assert cache.supera(a, b, umbral) == esperado
+            assert supera_umbral(a, b, umbral) == esperado
+    assert all(cache.ratio(a, b) == SequenceMatcher(None, a, b).ratio() for a, b in PARES)
+    estadisticas = cache.estadisticas()
+    assert estadisticas["aciertos"] > 0 and estadisticas["fallos"] > 0
+
+    # Un par descartado por quick_ratio no se guarda (no se llegó a calcular su ratio)
+    nueva = CacheSimilitud()
+    assert not nueva.supera("miedo", "palpitaciones", 0.6)
+    assert len(nueva) == 0
+    assert nueva.supera("ansiedad", "ansiedad intensa", 0.6) and len(nueva) == 1
+
+
+def test_desalojo_lru():
+    cache = CacheSimilitud(capacidad=2)
+    cache.ratio("a", "b")
+    cache.ratio("c", "d")
+    cache.ratio("a", "b")            # ("a", "b") pasa a ser el más reciente
+    cache.ratio("e", "f")            # desaloja ("c", "d")
+    assert len(cache) == 2
+    aciertos = cache.aciertos
+    cache.ratio("a", "b")
+    assert cache.aciertos == aciertos + 1
+    cache.ratio("c", "d")
+    assert cache.fallos == 4
+    cache.limpiar()
+    assert len(cache) == 0 and cache.estadisticas()["aciertos"] == 0
+
+
+def test_guardar_y_cargar(tmp_path):
+    ruta = str(tmp_path / "cache.json")
+    origen = CacheSimilitud()
+    for a, b in PARES:
+        origen.ratio(a, b)
+    origen.guardar(ruta)
+
+    destino = CacheSimilitud()
+    assert destino.cargar(ruta) == len(PARES)
+    assert all(destino.ratio(a, b) == origen.ratio(a, b) for a, b in PARES)
+    assert destino.fallos == 0
+
+    # Con menos capacidad se quedan las entradas más recientes
+    pequena = CacheSimilitud(capacidad=2)
+    pequena.cargar(ruta)
+    assert len(pequena) == 2
+    pequena.ratio(*PARES[-1])
+    assert pequena.fallos == 0
+
+
+def test_archivos_antiguos_o_corruptos_se_descartan(tmp_path, capsys):
+    antiguo = tmp_path / "antiguo.json"
+    antiguo.write_text(json.dumps([["texto libre del paciente", "tristeza", 0.5]]), encoding="utf-8")
+    corrupto = tmp_path / "corrupto.json"
+    corrupto.write_text("{", encoding="utf-8")
+    cache = CacheSimilitud()
+    assert cache.cargar(str(antiguo)) == 0
+    assert cache.cargar(str(corrupto)) == 0
+    assert cache.cargar(str(tmp_path / "no_existe.json")) == 0
+    assert len(cache) == 0
+    salida = capsys.readouterr().out
+    assert "formato anterior" in salida and "No se pudo leer" in salida
+
+
+def test_texto_libre_no_entra_en_la_cache_compartida():
+    base = BaseDeCasos()
+    base.agregar_casos([
+        nuevo_caso(1, ["tristeza persistente", "insomnio"]),
+        nuevo_caso(2, ["tristeza", "miedo intenso"]),
+    ])
+    motor = MotorRecuperacion(base)
+    CACHE_SIMILITUD.limpiar()
+    puntuaciones = motor.puntuar(["tristeza persistnte por las noches", "tristeza"])
+    assert set(puntuaciones) == {0, 1}
+    vocabulario = set(base.sintomas_unicos())
+    pares = list(CACHE_SIMILITUD._datos)
+    assert pares and all(a in vocabulario and b in vocabulario for a, b in pares)
@@ -0,0 +1,142 @@
+# tests/test_indice_sinonimos.py
+"""Los índices de sinónimos dan exactamente el resultado de los recorridos lineales que reemplazan."""
+import random
+from difflib import SequenceMatcher, get_close_matches
+
+import pytest
+
+from motor_inferencia.indice_sinonimos import IndiceCanonico, IndiceDifuso
+from motor_inferencia.semantic_helper import (
+    buscar_sinonimo_difuso,
+    cargar_sinonimos,
+    normalizar_sinonimos,
+    preprocesar_texto,
+)
+
+UMBRALES = (0.6, 0.65, 0.7, 0.85)   # 0.65: buscar_sinonimo_difuso; 0.7: la búsqueda aproximada
+
+
+def _cercana_lineal(frase, claves, umbral):
+    """Lo que hacía buscar_sinonimo_difuso antes del índice."""
+    coincidencias = get_close_matches(frase, claves, n=1, cutoff=umbral)
+    return coincidencias[0] if coincidencias else None
+
+
+def _posiciones_lineales(frase, claves):
+    """Ratios de la frase frente a cada clave, como el recorrido de la interfaz."""
+    return [SequenceMatcher(None, frase, clave).ratio() for clave in claves]
+
+
+def _mejor_posicion_lineal(ratios, umbral):
+    mejor, sim_mejor = None, 0
+    for pos, sim in enumerate(ratios):
+        if sim > sim_mejor and sim >= umbral:
+            mejor, sim_mejor = pos, sim
+    return mejor
+
+
+def _variantes(clave, rng):
+    """Consultas derivadas de una clave: exacta, con errata, recortada y con ruido."""
+    variantes = [clave]
+    if len(clave) > 3:
+        i = rng.randrange(len(clave))
+        variantes.append(clave[:i] + rng.choice("aeiosnrx") + clave[i + 1:])
+        variantes.append(clave[: len(clave) * 2 // 3])
+        variantes.append(clave.replace(" ", "", 1))
+    variantes.append("me siento " + clave)
+    return variantes
+
+
+@pytest.fixture(scope="module")
+def claves():
+    rng = random.Random(7)
+    reales = rng.sample(sorted(cargar_sinonimos()), 500)
+    # Claves sintéticas con muchas letras repetidas (ejercitan el recuento por carácter), repetidas y vacía
+    sinteticas = ["".join(rng.choice("aaeinos r") for _ in range(rng.randrange(0, 24))) for _ in range(150)]
+    return reales + sinteticas + reales[:20] + [""]
+
+
+@pytest.fixture(scope="module")
+def consultas(claves):
+    rng = random.Random(11)
+    frases = ["", "a", "zzzz", "no puedo dormir por las noches", "tristesa", "ansiedad ansiedad ansiedad"]
+    for clave in rng.sample(claves, 25):
+        frases.extend(_variantes(clave, rng))
+    return frases
+
+
+@pytest.fixture(scope="module")
+def indice(claves):
+    return IndiceDifuso(claves)
+
+
+def test_mejor_clave_igual_que_get_close_matches(indice, claves, consultas):
+    for umbral in (0.65, 0.85):
+        for frase in consultas:
+            assert indice.mejor_clave(frase, umbral) == _cercana_lineal(frase, claves, umbral), (frase, umbral)
+
+
+def test_mejor_posicion_igual_que_recorrido_lineal(indice, claves, consultas):
+    for frase in consultas:
+        ratios = _posiciones_lineales(frase, claves)
+        for umbral in UMBRALES:
+            assert indice.mejor_posicion(frase, umbral) == _mejor_posicion_lineal(ratios, umbral), (frase, umbral)
+
+
+def test_buscar_sinonimo_difuso_acepta_lista_o_indice(indice, claves, consultas):
+    for frase in consultas[:30]:
+        esperado = _cercana_lineal(frase, claves, 0.65)
+        assert buscar_sinonimo_difuso(frase, claves, 0.65) == esperado
+        assert buscar_sinonimo_difuso(frase, indice, 0.65) == esperado
+
+
+def test_indice_vacio():
+    assert IndiceDifuso([]).mejor_clave("tristeza", 0.6) is None
+    assert IndiceDifuso([]).mejor_posicion("tristeza", 0.6) is None
+
+
+# ======================================================
+# Índice canónico
+# ======================================================
+def _canonico_lineal(frase, sinonimos):
+    """Regla original de normalizar_sinonimos: la primera clave con todas sus palabras en la frase."""
+    frase_norm = preprocesar_texto(frase)
+    for clave, canonico in sinonimos.items():
+        if all(p in frase_norm for p in clave.split()):
+            return canonico
+    return frase_norm
+
+
+def _frases_canonicas(sinonimos, n, semilla):
+    rng = random.Random(semilla)
+    claves = list(sinonimos)
+    palabras = sorted({p for clave in claves for p in clave.split()})
+    frases = ["", "hola", "zzz qqq"]
+    for _ in range(n):
+        tipo = rng.randrange(4)
+        if tipo == 0:
+            frases.append(rng.choice(claves).upper())
+        elif tipo == 1:
+            frases.append(f"me siento {rng.choice(claves)} y {rng.choice(claves)}")
+        elif tipo == 2:
+            frases.append(" ".join(rng.sample(palabras, rng.randrange(1, 4))))
+        else:
+            clave = rng.choice(claves)
+            frases.append(clave[: rng.randrange(len(clave) + 1)])
+    return frases
+
+
+def test_indice_canonico_igual_que_recorrido_lineal():
+    sinonimos = dict(cargar_sinonimos())
+    indice = IndiceCanonico(sinonimos)
+    for frase in _frases_canonicas(sinonimos, 500, semilla=3):
+        assert normalizar_sinonimos(frase, indice) == _canonico_lineal(frase, sinonimos), frase
+
+
+def test_indice_canonico_respeta_el_orden_y_la_clave_vacia():
+    sinonimos = {"dolor de cabeza": "cefalea", "dolor": "dolor", "": "vacía", "cabeza": "cabeza"}
+    indice = IndiceCanonico(sinonimos)
+    for frase in ("me duele la cabeza", "dolor de cabeza fuerte", "cabeza con dolor", "nada"):
+        assert normalizar_sinonimos(frase, indice) == _canonico_lineal(frase, sinonimos), frase
+    sin_vacia = {k: v for k, v in sinonimos.items() if k}
+    assert normalizar_sinonimos("nada", IndiceCanonico(sin_vacia)) == "nada"
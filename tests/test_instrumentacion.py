@@ -0,0 +1,93 @@
+# tests/test_instrumentacion.py
+"""Instrumentación: variables de entorno del log no válidas, niveles, búfer y métricas."""
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from motor_inferencia.instrumentacion import LOG, Metricas, _configuracion_entorno, configurar_log, vaciar_log
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def log_restaurado():
+    yield
+    configurar_log(*_configuracion_entorno())
+
+
+@pytest.mark.parametrize("nivel, buffer, esperado, aviso", [
+    (None, None, ("DEBUG", 0), ""),
+    (" warning ", "16", ("WARNING", 16), ""),
+    ("off", "", ("OFF", 0), ""),
+    ("verbose", None, ("DEBUG", 0), "SEAP_LOG_NIVEL"),
+    (None, "mucho", ("DEBUG", 0), "SEAP_LOG_BUFFER"),
+    ("INFO", "-3", ("INFO", 0), "SEAP_LOG_BUFFER"),
+])
+def test_configuracion_entorno(monkeypatch, capsys, nivel, buffer, esperado, aviso):
+    for variable, valor in (("SEAP_LOG_NIVEL", nivel), ("SEAP_LOG_BUFFER", buffer)):
+        if valor is None:
+            monkeypatch.delenv(variable, raising=False)
+        else:
+            monkeypatch.setenv(variable, valor)
+    assert _configuracion_entorno() == esperado
+    salida = capsys.readouterr()
+    assert salida.out == ""
+    assert (aviso in salida.err) if aviso else salida.err == ""
+
+
+def test_importar_con_variables_no_validas_no_falla():
+    entorno = dict(os.environ, SEAP_LOG_NIVEL="verbose", SEAP_LOG_BUFFER="x")
+    proceso = subprocess.run(
+        [sys.executable, "-c", "import motor_inferencia.instrumentacion as i; print(i.LOG.level)"],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, timeout=60,
+    )
+    assert proceso.returncode == 0, proceso.stderr
+    assert proceso.stdout.strip() == "10"          # logging.DEBUG
+    assert "SEAP_LOG_NIVEL" in proceso.stderr and "SEAP_LOG_BUFFER" in proceso.stderr
+
+
+def test_niveles_y_bufer():
+    with pytest.raises(ValueError):
+        configurar_log("verbose")
+    with pytest.raises(ValueError):
+        configurar_log("INFO", buffer=-1)
+
+    flujo = io.StringIO()
+    configurar_log("info", buffer=3, flujo=flujo)
+    LOG.debug("descartado")
+    LOG.info("uno")
+    assert flujo.getvalue() == ""
+    LOG.warning("urgente")                          # un WARNING vacía el búfer en el acto
+    assert flujo.getvalue() == "[SEMANTIC LOG] uno\n[SEMANTIC LOG] urgente\n"
+    LOG.info("dos")
+    vaciar_log()
+    assert flujo.getvalue().endswith("[SEMANTIC LOG] dos\n")
+
+    flujo = io.StringIO()
+    configurar_log("OFF", flujo=flujo)
+    LOG.error("nada")
+    assert flujo.getvalue() == ""
+
+
+def test_metricas_y_tasas():
+    metricas = Metricas()
+    metricas.contar("consultas", 2)
+    metricas.acierto("indice.canonico", True)
+    metricas.acierto("indice.canonico", True)
+    metricas.acierto("indice.canonico", False)
+    with metricas.medir("etapa.difusa"):
+        pass
+    datos = metricas.instantanea()
+    assert datos["contadores"]["consultas"] == 2
+    assert datos["tasas_acierto"] == {"indice.canonico": pytest.approx(2 / 3)}
+    assert datos["etapas"]["etapa.difusa"]["n"] == 1
+    assert 'seap_eventos_total{nombre="consultas"} 2' in metricas.texto_prometheus()
+
+    inactiva = Metricas(activa=False)
+    inactiva.contar("consultas")
+    with inactiva.medir("etapa"):
+        pass
+    assert inactiva.instantanea()["contadores"] == {} and inactiva.instantanea()["etapas"] == {}
@@ -0,0 +1,93 @@
+# tests/test_recuperacion.py
+"""Motor de recuperación indexado: mismas puntuaciones y orden que el recorrido lineal con similitud_jaccard."""
+import shutil
+from difflib import SequenceMatcher
+
+import pytest
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, cargar_base
+from base_conocimiento.modelos import BaseDeCasos
+from conftest import nuevo_caso
+from motor_inferencia.recuperacion import MotorRecuperacion
+from motor_inferencia.recuperacion_lsh import generar_consultas
+from motor_inferencia.representacion import normalizar_lista
+
+
+def _jaccard_lineal(sintomas1, sintomas2):
+    """similitud_jaccard tal como estaba antes del índice: todos los pares con SequenceMatcher."""
+    set1, set2 = set(sintomas1), set(sintomas2)
+    if not set1 or not set2:
+        return 0.0
+    interseccion = sum(
+        1 for s1 in set1 if any(SequenceMatcher(None, s1, s2).ratio() >= 0.6 for s2 in set2)
+    )
+    return interseccion / len(set1 | set2)
+
+
+def _recuperar_lineal(base, sintomas_usuario):
+    sintomas_usuario = normalizar_lista(sintomas_usuario)
+    similitudes = [
+        (caso, _jaccard_lineal(sintomas_usuario, normalizar_lista(caso.sintomas)))
+        for caso in base.listar_casos()
+    ]
+    similitudes.sort(key=lambda x: x[1], reverse=True)
+    return similitudes
+
+
+def _ids(resultado):
+    return [(caso.id_caso, score) for caso, score in resultado]
+
+
+def _comprobar(motor, base, consultas):
+    for consulta in consultas:
+        esperado = _ids(_recuperar_lineal(base, consulta))
+        assert _ids(motor.recuperar(consulta)) == esperado, consulta
+        for k in (1, 3, 10):
+            positivos = [par for par in esperado if par[1] > 0][:k]
+            assert _ids(motor.mejores(consulta, k)) == positivos, (consulta, k)
+
+
+@pytest.fixture(scope="module")
+def base_real(tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp("recuperacion") / "casos.json")
+    shutil.copy(RUTA_ARCHIVO, ruta)
+    return cargar_base(ruta, usar_diario=False)
+
+
+CONSULTAS_LIBRES = [
+    [],
+    [""],
+    ["tristeza"],
+    ["Tristeza", "INSOMNIO", "tristeza"],
+    ["me siento muy triste y no duermo"],
+    ["ansiedad", "miedo", "palpitaciones", "sudoracion", "temblor"],
+    ["zzzz qqqq"],
+]
+
+
+def test_igual_que_el_recorrido_lineal_en_la_base_real(base_real):
+    motor = MotorRecuperacion(base_real)
+    consultas = generar_consultas(base_real, 20, semilla=7) + CONSULTAS_LIBRES
+    _comprobar(motor, base_real, consultas)
+    assert motor.mejores(["tristeza"], 0) == []
+
+
+def test_sigue_igual_tras_agregar_y_actualizar_casos():
+    base = BaseDeCasos()
+    base.agregar_casos([
+        nuevo_caso(1, ["tristeza", "insomnio", "fatiga"]),
+        nuevo_caso(2, ["miedo", "palpitaciones"], "ansiedad"),
+    ])
+    motor = MotorRecuperacion(base)
+    consultas = [["tristeza", "insomio"], ["miedo"], ["fatiga", "apatia"], ["verguenza"]]
+    _comprobar(motor, base, consultas)
+
+    # Agregar al final indexa solo los nuevos (el vocabulario crece)
+    base.agregar_caso(nuevo_caso(3, ["fatiga", "apatía"], "agotamiento"))
+    base.agregar_casos([nuevo_caso(4, ["vergüenza", "miedo"], "fobia social")])
+    _comprobar(motor, base, consultas)
+
+    # Reemplazar un caso obliga a reconstruir el índice
+    base.actualizar_caso(nuevo_caso(2, ["insomnio"], "insomnio primario"))
+    _comprobar(motor, base, consultas)
+    assert [c.id_caso for c, _ in motor.mejores(["miedo"], 5)] == [4]
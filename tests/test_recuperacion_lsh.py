@@ -0,0 +1,98 @@
+# tests/test_recuperacion_lsh.py
+"""MinHash/LSH: firmas de la unión, candidatos por bandas, puntuación exacta y sincronización con la base."""
+import shutil
+
+import pytest
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, cargar_base
+from base_conocimiento.modelos import BaseDeCasos
+from conftest import nuevo_caso
+from motor_inferencia.recuperacion import obtener_motor
+from motor_inferencia.recuperacion_lsh import _PRIMO, MotorLSH, generar_consultas, shingles
+from motor_inferencia.representacion import normalizar_lista
+
+
+def _firma_directa(motor, sintomas):
+    """MinHash de la unión de los trigramas de todos los síntomas, sin pasar por las firmas por síntoma."""
+    union = set()
+    for sintoma in set(sintomas):
+        union |= shingles(sintoma) or {0}
+    return tuple(min((a * x + b) % _PRIMO for x in union) for a, b in motor._coeficientes)
+
+
+def _bandas_de_casos(motor):
+    """Bandas de la firma directa de cada caso (None si no tiene síntomas)."""
+    return [
+        list(motor._bandas_de(_firma_directa(motor, caso.sintomas_normalizados))) if caso.sintomas_normalizados else None
+        for caso in motor.base.casos
+    ]
+
+
+def _candidatos_directos(motor, bandas_casos, sintomas_usuario):
+    """Posiciones de los casos con alguna banda igual a la de la consulta, comparando firma con firma."""
+    consulta = normalizar_lista(sintomas_usuario)
+    if not consulta:
+        return {}
+    bandas = list(motor._bandas_de(_firma_directa(motor, consulta)))
+    choques = {}
+    for pos, bandas_caso in enumerate(bandas_casos):
+        comunes = sum(a == b for a, b in zip(bandas, bandas_caso or ()))
+        if comunes:
+            choques[pos] = comunes
+    return choques
+
+
+@pytest.fixture(scope="module")
+def base_real(tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp("lsh") / "casos.json")
+    shutil.copy(RUTA_ARCHIVO, ruta)
+    return cargar_base(ruta, usar_diario=False)
+
+
+def test_candidatos_y_puntuaciones_exactas(base_real):
+    motor = MotorLSH(base_real, bandas=16, filas=2, max_candidatos=None)
+    exhaustivo = obtener_motor(base_real).puntuar
+    bandas_casos = _bandas_de_casos(motor)
+    for consulta in generar_consultas(base_real, 25, semilla=25) + [[], ["zzzz"]]:
+        choques = _candidatos_directos(motor, bandas_casos, consulta)
+        assert motor.candidatos(consulta) == sorted(choques), consulta
+        exactas = exhaustivo(consulta)
+        recuperados = motor.recuperar(consulta)
+        puntuados = [(caso, score) for caso, score in recuperados if score > 0]
+        assert all(score == exactas[base_real.casos.index(caso)] for caso, score in puntuados)
+        assert motor.mejores(consulta, 3) == puntuados[:3]
+
+
+def test_max_candidatos_se_queda_con_los_de_mas_bandas_comunes(base_real):
+    motor = MotorLSH(base_real, bandas=16, filas=1, max_candidatos=5)
+    bandas_casos = _bandas_de_casos(motor)
+    for consulta in generar_consultas(base_real, 10, semilla=3):
+        choques = _candidatos_directos(motor, bandas_casos, consulta)
+        esperado = sorted(choques, key=lambda pos: (-choques[pos], pos))[:5]
+        assert motor.candidatos(consulta) == esperado, consulta
+
+
+def test_caso_identico_siempre_es_candidato_y_sincronizacion():
+    base = BaseDeCasos()
+    base.agregar_casos([
+        nuevo_caso(1, ["tristeza", "insomnio", "fatiga"]),
+        nuevo_caso(2, ["miedo", "palpitaciones"], "ansiedad"),
+    ])
+    motor = MotorLSH(base, bandas=8, filas=4, max_candidatos=None)
+    assert 0 in motor.candidatos(["Tristeza", "insomnio", "fatiga"])
+
+    base.agregar_caso(nuevo_caso(3, ["vergüenza", "miedo"], "fobia social"))
+    assert motor.candidatos(["verguenza", "miedo"]) == MotorLSH(base, 8, 4, None).candidatos(["verguenza", "miedo"])
+    assert 2 in motor.candidatos(["verguenza", "miedo"])
+
+    base.actualizar_caso(nuevo_caso(2, ["apatía"], "desmotivación"))
+    for consulta in (["miedo", "palpitaciones"], ["apatia"], ["verguenza", "miedo"]):
+        assert motor.candidatos(consulta) == MotorLSH(base, 8, 4, None).candidatos(consulta)
+    assert [c.id_caso for c, _ in motor.mejores(["apatia"], 3)] == [2]
+
+
+def test_parametros_invalidos():
+    with pytest.raises(ValueError):
+        MotorLSH(BaseDeCasos(), bandas=0)
+    with pytest.raises(ValueError):
+        MotorLSH(BaseDeCasos(), filas=0)
@@ -0,0 +1,108 @@
+# tests/test_recuperacion_vectorial.py
+"""Recuperación TF-IDF / BM25: la matriz dispersa da las mismas puntuaciones que el cálculo denso por caso."""
+import math
+import shutil
+
+import pytest
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, cargar_base
+from base_conocimiento.modelos import BaseDeCasos
+from conftest import nuevo_caso
+from motor_inferencia.recuperacion_lsh import generar_consultas
+from motor_inferencia.recuperacion_vectorial import BM25_B, BM25_K1, ESQUEMAS, MotorVectorial, terminos
+from motor_inferencia.representacion import normalizar_lista
+
+
+def _puntuaciones_densas(base, sintomas_usuario, esquema):
+    """Puntuación de cada caso recorriendo todos los términos, con las fórmulas del docstring de MotorVectorial."""
+    documentos = [terminos(sorted(set(caso.sintomas_normalizados))) for caso in base.casos]
+    consulta = terminos(sorted(set(normalizar_lista(sintomas_usuario))))
+    n = len(documentos)
+    df = {}
+    for documento in documentos:
+        for termino in documento:
+            df[termino] = df.get(termino, 0) + 1
+
+    if esquema == "tfidf":
+        def idf(termino):
+            return math.log((1 + n) / (1 + df.get(termino, 0))) + 1.0
+
+        def vector(frecuencias):
+            return {t: idf(t) * (1.0 + math.log(tf)) for t, tf in frecuencias.items()}
+
+        q = vector(consulta)
+        norma_q = math.sqrt(sum(v * v for v in q.values()))
+        resultado = []
+        for documento in documentos:
+            d = vector(documento)
+            norma_d = math.sqrt(sum(v * v for v in d.values())) or 1.0
+            producto = sum(peso * d.get(t, 0.0) for t, peso in q.items())
+            resultado.append(producto / (norma_q * norma_d) if norma_q else 0.0)
+        return resultado
+
+    def idf(termino):
+        frecuencia = df.get(termino, 0)
+        return math.log(1 + (n - frecuencia + 0.5) / (frecuencia + 0.5))
+
+    media = sum(sum(d.values()) for d in documentos) / n
+    maximo = sum(idf(t) * (BM25_K1 + 1) for t in consulta)
+    resultado = []
+    for documento in documentos:
+        longitud = sum(documento.values())
+        total = sum(
+            idf(t) * documento[t] * (BM25_K1 + 1)
+            / (documento[t] + BM25_K1 * (1 - BM25_B + BM25_B * longitud / media))
+            for t in consulta if t in documento
+        )
+        resultado.append(total / maximo if maximo else 0.0)
+    return resultado
+
+
+def _comprobar(motor, base, consultas):
+    for consulta in consultas:
+        densas = _puntuaciones_densas(base, consulta, motor.esquema)
+        dispersas = motor.puntuar(consulta)
+        for pos, esperado in enumerate(densas):
+            assert dispersas.get(pos, 0.0) == pytest.approx(min(esperado, 1.0), abs=1e-9), (consulta, pos)
+        assert all(0.0 < valor <= 1.0 for valor in dispersas.values())
+        ordenados = motor.recuperar(consulta)
+        assert [score for _, score in ordenados] == sorted((score for _, score in ordenados), reverse=True)
+        assert motor.mejores(consulta, 5) == [par for par in ordenados if par[1] > 0][:5]
+
+
+@pytest.fixture(scope="module")
+def base_real(tmp_path_factory):
+    ruta = str(tmp_path_factory.mktemp("vectorial") / "casos.json")
+    shutil.copy(RUTA_ARCHIVO, ruta)
+    return cargar_base(ruta, usar_diario=False)
+
+
+@pytest.mark.parametrize("esquema", ESQUEMAS)
+def test_igual_que_el_calculo_denso_en_la_base_real(base_real, esquema):
+    motor = MotorVectorial(base_real, esquema)
+    consultas = generar_consultas(base_real, 30, semilla=24)
+    consultas += [["me siento muy triste y no duermo"], ["zzzz"], [], ["", None]]
+    _comprobar(motor, base_real, consultas)
+
+
+@pytest.mark.parametrize("esquema", ESQUEMAS)
+def test_la_matriz_se_reconstruye_al_cambiar_la_base(esquema):
+    base = BaseDeCasos()
+    base.agregar_casos([
+        nuevo_caso(1, ["tristeza", "insomnio", "fatiga"]),
+        nuevo_caso(2, ["miedo", "palpitaciones"], "ansiedad"),
+    ])
+    motor = MotorVectorial(base, esquema)
+    consultas = [["tristeza", "insomio"], ["miedo"], ["fatiga", "apatia"]]
+    _comprobar(motor, base, consultas)
+
+    # Los idf dependen de toda la base: un caso nuevo cambia las puntuaciones de los demás
+    base.agregar_caso(nuevo_caso(3, ["fatiga", "apatía"], "agotamiento"))
+    _comprobar(motor, base, consultas)
+    base.actualizar_caso(nuevo_caso(2, ["tristeza"], "duelo"))
+    _comprobar(motor, base, consultas)
+
+
+def test_esquema_desconocido():
+    with pytest.raises(ValueError):
+        MotorVectorial(BaseDeCasos(), "lsi")
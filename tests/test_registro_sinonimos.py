@@ -0,0 +1,65 @@
+# tests/test_registro_sinonimos.py
+"""Registro de sinónimos: una lectura por archivo, recarga cuando cambia en disco y fusión con prioridad."""
+import json
+import os
+
+import pytest
+
+from base_conocimiento.registro_sinonimos import RegistroSinonimos
+
+
+def _escribir(ruta, entradas, mtime_ns=None):
+    ruta.write_text(json.dumps(entradas, ensure_ascii=False), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(ruta, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def rutas(tmp_path):
+    original, enriquecido = tmp_path / "original.json", tmp_path / "enriquecido.json"
+    _escribir(original, {"triste": "tristeza", "sin sueño": "insomnio"}, 1_000_000_000)
+    _escribir(enriquecido, {"triste": "tristeza persistente"}, 1_000_000_000)
+    return original, enriquecido
+
+
+def test_fusion_con_prioridad_y_una_sola_construccion(rutas):
+    registro = RegistroSinonimos()
+    tabla = registro.obtener(rutas)
+    assert dict(tabla.entradas) == {"triste": "tristeza persistente", "sin sueño": "insomnio"}
+    assert registro.obtener(rutas) is tabla
+    construcciones = []
+    for _ in range(3):
+        tabla.derivado("indice", lambda t: construcciones.append(1) or len(t))
+    assert len(construcciones) == 1
+    with pytest.raises(TypeError):
+        tabla.entradas["nuevo"] = "x"
+
+
+def test_cambio_en_disco_reconstruye_la_tabla_y_sus_derivados(rutas):
+    original, _ = rutas
+    registro = RegistroSinonimos()
+    tabla = registro.obtener(rutas)
+    assert tabla.derivado("tamano", len) == 2
+
+    _escribir(original, {"triste": "tristeza", "sin sueño": "insomnio", "miedo": "ansiedad"}, 2_000_000_000)
+    nueva = registro.obtener(rutas)
+    assert nueva is not tabla
+    assert nueva.entradas["miedo"] == "ansiedad"
+    assert nueva.derivado("tamano", len) == 3
+    assert registro.obtener(rutas) is nueva
+
+
+def test_archivo_ausente_se_omite_y_recargar_fuerza_la_lectura(rutas, capsys):
+    original, enriquecido = rutas
+    registro = RegistroSinonimos()
+    enriquecido.unlink()
+    assert dict(registro.obtener(rutas).entradas) == {"triste": "tristeza", "sin sueño": "insomnio"}
+    original.unlink()
+    assert len(registro.obtener(rutas)) == 0
+    assert "No se encontró ningún archivo" in capsys.readouterr().out
+
+    _escribir(original, {"a": "b"}, 3_000_000_000)
+    tabla = registro.obtener(rutas)
+    registro.recargar()
+    assert registro.obtener(rutas) is not tabla
+    assert dict(registro.obtener(rutas).entradas) == {"a": "b"}
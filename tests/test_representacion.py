@@ -0,0 +1,37 @@
+# tests/test_representacion.py
+"""Núcleo de normalización: mismo resultado que la versión con unicodedata y re, y listas sin None ni vacíos."""
+import random
+import re
+import unicodedata
+
+from motor_inferencia.representacion import limpiar_cache, normalizar_lista, normalizar_texto, plegar_texto
+
+
+def _normalizar_original(texto):
+    """normalizar_texto tal como estaba antes de la tabla de traducción y las cachés."""
+    texto = ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+    return re.sub(r'\s+', ' ', texto.lower().strip())
+
+
+def test_cada_caracter_del_plano_basico():
+    limpiar_cache()
+    for codigo in range(0x10000):
+        if 0xD800 <= codigo < 0xE000:       # sustitutos sueltos: no son texto válido
+            continue
+        caracter = chr(codigo)
+        for texto in (caracter, f"A{caracter}b", f" {caracter} É "):
+            assert normalizar_texto(texto) == _normalizar_original(texto), hex(codigo)
+
+
+def test_frases_aleatorias_con_tildes_marcas_y_espacios():
+    rng = random.Random(23)
+    alfabeto = list("aeiounsAEIOUNS  \t\n") + list("áéíóúñüÁÉÍÓÚÑÜçÇ") + ["\u0301", "\u0308", "\u00a0", "\u3000", "ß", "İ", "ǅ", "ẞ", "Ω", "ﬁ"]
+    for _ in range(5000):
+        texto = ''.join(rng.choice(alfabeto) for _ in range(rng.randint(0, 20)))
+        assert normalizar_texto(texto) == _normalizar_original(texto), repr(texto)
+        assert plegar_texto(texto).split() == normalizar_texto(texto).split()
+
+
+def test_normalizar_lista_descarta_vacios_y_avisa_de_none(capsys):
+    assert normalizar_lista(["  Tristeza  Profunda ", "", "   ", None, 5, "Insómnio"]) == ["tristeza profunda", "insomnio"]
+    assert "None" in capsys.readouterr().out
@@ -0,0 +1,149 @@
+# tests/test_servicio_http.py
+"""Servicio HTTP: validación de entrada (400), ids repetidos (409), cuerpo excesivo (413) y rutas."""
+import asyncio
+import json
+import os
+import shutil
+
+import pytest
+
+from base_conocimiento.almacenamiento import RUTA_ARCHIVO, cargar_base, registrar_caso, ruta_diario
+from conftest import nuevo_caso
+from interfaz_usuario.servicio_http import MAX_CUERPO, ServicioInferencia
+
+
+def _crudo(metodo, ruta, datos=None, cuerpo=None, longitud=None):
+    if cuerpo is None:
+        cuerpo = b"" if datos is None else json.dumps(datos).encode("utf-8")
+    longitud = len(cuerpo) if longitud is None else longitud
+    return f"{metodo} {ruta} HTTP/1.1\r\nHost: prueba\r\nContent-Length: {longitud}\r\n\r\n".encode() + cuerpo
+
+
+def _conversar(base, ruta_casos, peticiones):
+    """Arranca el servicio en un puerto libre, envía cada petición cruda y devuelve [(estado, respuesta)]."""
+    async def principal():
+        servicio = ServicioInferencia(base, ruta_casos, hilos=2)
+        servidor = await asyncio.start_server(servicio.atender, "127.0.0.1", 0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        respuestas = []
+        try:
+            for crudo in peticiones:
+                lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+                escritor.write(crudo)
+                await escritor.drain()
+                datos = await lector.read()
+                escritor.close()
+                cabecera, _, cuerpo = datos.partition(b"\r\n\r\n")
+                estado = int(cabecera.split()[1])
+                respuestas.append((estado, json.loads(cuerpo) if cabecera.find(b"json") >= 0 else cuerpo))
+        finally:
+            servidor.close()
+            await servidor.wait_closed()
+            servicio.cerrar()
+        return respuestas
+
+    return asyncio.run(principal())
+
+
+@pytest.fixture
+def ruta_real(tmp_path):
+    """Copia temporal de la base de casos del proyecto (para que /analyze encuentre casos)."""
+    ruta = str(tmp_path / "casos.json")
+    shutil.copy(RUTA_ARCHIVO, ruta)
+    return ruta
+
+
+CASO_VALIDO = {"sintomas": ["tristeza"], "posible_causa": "duelo", "estrategias": ["acompañamiento"]}
+
+CASOS_INVALIDOS = [
+    dict(CASO_VALIDO, estrategias="abc"),
+    dict(CASO_VALIDO, estrategias=["a", 1]),
+    dict(CASO_VALIDO, autoevaluaciones_sugeridas="PHQ-9"),
+    dict(CASO_VALIDO, derivar_a={"a": 1}),
+    dict(CASO_VALIDO, id_caso=[1]),
+    dict(CASO_VALIDO, id_caso="7"),
+    dict(CASO_VALIDO, id_caso=True),
+    dict(CASO_VALIDO, id_caso=2.5),
+    dict(CASO_VALIDO, riesgo=3),
+    dict(CASO_VALIDO, resultado=["x"]),
+    dict(CASO_VALIDO, recomendacion_general={"x": 1}),
+    dict(CASO_VALIDO, sintomas=[]),
+    dict(CASO_VALIDO, sintomas="tristeza"),
+    dict(CASO_VALIDO, sintomas=["tristeza", None]),
+    dict(CASO_VALIDO, posible_causa=""),
+    dict(CASO_VALIDO, posible_causa=["duelo"]),
+    {k: v for k, v in CASO_VALIDO.items() if k != "posible_causa"},
+]
+
+ANALISIS_INVALIDOS = [
+    {},
+    {"texto": 5},
+    {"texto": "triste", "explicar": "false"},
+    {"texto": "triste", "explicar": 0},
+    {"texto": "triste", "explicar": None},
+    {"texto": "triste", "umbral": "nan"},
+    {"texto": "triste", "umbral": "inf"},
+    {"texto": "triste", "umbral": 1.5},
+    {"texto": "triste", "umbral": -0.1},
+    {"texto": "triste", "umbral": "alto"},
+    {"texto": "triste", "formato": "pdf"},
+    {"texto": "triste", "modo": "magia"},
+]
+
+
+def test_entradas_invalidas_responden_400_sin_escribir(ruta_casos):
+    base = cargar_base(ruta_casos)
+    peticiones = [_crudo("POST", "/cases", datos) for datos in CASOS_INVALIDOS]
+    peticiones += [_crudo("POST", "/analyze", datos) for datos in ANALISIS_INVALIDOS]
+    peticiones += [
+        _crudo("POST", "/cases", cuerpo=b"{no es json"),
+        _crudo("POST", "/cases", cuerpo=b"[1, 2]"),
+        _crudo("POST", "/cases", cuerpo=b"", longitud=-5),
+        _crudo("POST", "/cases", cuerpo=b"", longitud="abc"),
+    ]
+    respuestas = _conversar(base, ruta_casos, peticiones)
+    for crudo, (estado, respuesta) in zip(peticiones, respuestas):
+        assert estado == 400, (crudo, respuesta)
+        assert "error" in respuesta
+    assert not os.path.exists(ruta_diario(ruta_casos))
+    assert [c.id_caso for c in base.casos] == [1, 2, 3]
+
+
+def test_alta_valida_y_ids_repetidos_409(ruta_casos):
+    base = cargar_base(ruta_casos)
+    registrar_caso(nuevo_caso(50), ruta_casos)           # alta de otro proceso que esta base no conoce
+    respuestas = _conversar(base, ruta_casos, [
+        _crudo("POST", "/cases", CASO_VALIDO),
+        _crudo("POST", "/cases", dict(CASO_VALIDO, id_caso=1)),
+        _crudo("POST", "/cases", dict(CASO_VALIDO, id_caso=50)),
+        _crudo("POST", "/cases", dict(CASO_VALIDO, id_caso=60, derivar_a=None, riesgo=None)),
+    ])
+    assert [estado for estado, _ in respuestas] == [201, 409, 409, 201]
+    assert respuestas[0][1] == {"id_caso": 51}
+    assert [c.id_caso for c in base.casos] == [1, 2, 3, 51, 60]
+    assert base.buscar_por_id(51).estrategias == ("acompañamiento",)
+    assert [c.id_caso for c in cargar_base(ruta_casos).casos] == [1, 2, 3, 50, 51, 60]
+
+
+def test_cuerpo_demasiado_grande_413_y_rutas(ruta_casos):
+    base = cargar_base(ruta_casos)
+    respuestas = _conversar(base, ruta_casos, [
+        _crudo("POST", "/cases", cuerpo=b"", longitud=MAX_CUERPO + 1),
+        _crudo("GET", "/nada"),
+        _crudo("GET", "/analyze"),
+        _crudo("GET", "/health"),
+    ])
+    assert [estado for estado, _ in respuestas] == [413, 404, 405, 200]
+    assert respuestas[3][1]["casos"] == 3
+
+
+def test_analisis_respeta_explicar(ruta_real):
+    base = cargar_base(ruta_real)
+    texto = "tengo mucha ansiedad y miedo"
+    (estado_con, con), (estado_sin, sin) = _conversar(base, ruta_real, [
+        _crudo("POST", "/analyze", {"texto": texto, "explicar": True, "umbral": 0.6}),
+        _crudo("POST", "/analyze", {"texto": texto, "explicar": False, "umbral": 0.6}),
+    ])
+    assert (estado_con, estado_sin) == (200, 200)
+    assert con["caso"] is not None and con["explicacion"]
+    assert sin["caso"] is not None and "explicacion" not in sin